@@ -1,7 +1,4 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime
 
 # Page configuration
 st.set_page_config(
@@ -0,0 +1,121 @@
+import streamlit as st
+import sys
+import time
+from pathlib import Path
+
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils import data_processing
+from utils.drift import PSI_MAJOR, PSI_MODERATE, categorical_drift, feature_drift, load_live_profile
+from utils.feature_store import FeatureStore, build_reference_index
+from utils.model_registry import MAX_LIVE_VERSIONS, LiveModels
+from utils.pipeline import StreamlitPetitionPipeline
+
+WINDOWS = {'Last 24 hours': 1, 'Last 7 days': 7, 'Last 30 days': 30}
+
+@st.cache_resource
+def live_models():
+    """Deployed model versions, for the reference data and pipeline settings"""
+    return LiveModels(data_dir=data_processing.DATA_DIR)
+
+@st.cache_resource(max_entries=MAX_LIVE_VERSIONS)
+def load_reference(version, _model_artifacts):
+    """Sorted reference feature columns, from rows already in the feature store"""
+    if _model_artifacts['reference_data'] is None:
+        return None
+    store = FeatureStore(StreamlitPetitionPipeline.from_artifacts(_model_artifacts))
+    try:
+        return build_reference_index(store, _model_artifacts['reference_data'].to_dict('records'))
+    finally:
+        store.close()
+
+@st.cache_data(ttl=60)
+def load_profile(days):
+    """Live sketches merged over the window; segments are flushed every minute"""
+    return load_live_profile(since=time.time() - days * 86400)
+
+def create_psi_chart(rows):
+    """Top features by PSI with the moderate and major bands"""
+    import plotly.express as px
+    top = rows[:15][::-1]
+    fig = px.bar(
+        x=[row['psi'] for row in top],
+        y=[row['feature'] for row in top],
+        orientation='h',
+        color=[row['severity'] for row in top],
+        color_discrete_map={'stable': '#4ecdc4', 'moderate': '#ffa726', 'major': '#ff6b6b'},
+        title='Most Drifted Features (PSI)',
+        labels={'x': 'Population Stability Index', 'y': '', 'color': 'Severity'}
+    )
+    fig.add_vline(x=PSI_MODERATE, line_dash="dash", line_color="#ffa726")
+    fig.add_vline(x=PSI_MAJOR, line_dash="dash", line_color="#ff6b6b")
+    fig.update_layout(height=500)
+    return fig
+
+def drift_monitor_page():
+    """Live petition features compared with the reference data"""
+    st.header("Drift Monitor")
+    st.markdown("""
+    Are the petitions being analysed today like the ones the model learned from? Every petition
+    scored on the Petition Analyzer page is sketched here and compared, feature by feature, with
+    the reference petitions.
+    """)
+
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+    profile = load_profile(WINDOWS[window])
+    if profile is None:
+        st.info("No live petitions recorded in this window yet. Analysed petitions are flushed here every minute.")
+        return
+
+    try:
+        model_artifacts = live_models().get()
+    except Exception as e:
+        st.error(f"Error loading model artifacts: {e}")
+        return
+    reference = load_reference(model_artifacts['version'], model_artifacts)
+    if reference is None:
+        st.warning("Too few reference petitions in the feature store. "
+                   "Run `python -m utils.feature_store warm` from the streamlit_app directory.")
+        return
+
+    rows = feature_drift(reference, profile)
+    categorical_rows = categorical_drift(model_artifacts['reference_data'], profile)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Live Petitions", f"{profile['sketch'].count:,}")
+    col2.metric("Reference Petitions", f"{reference.n_rows:,}")
+    col3.metric("Major Drift", sum(row['severity'] == 'major' for row in rows),
+                help=f"Features with PSI of {PSI_MAJOR} or more")
+    col4.metric("Moderate Drift", sum(row['severity'] == 'moderate' for row in rows),
+                help=f"Features with PSI between {PSI_MODERATE} and {PSI_MAJOR}")
+
+    st.plotly_chart(create_psi_chart(rows), use_container_width=True)
+
+    model_only = st.checkbox("Model inputs only", value=True)
+    if model_only:
+        model_features = set(model_artifacts['features'])
+        rows = [row for row in rows if row['feature'] in model_features]
+    st.dataframe(rows, hide_index=True, use_container_width=True, column_config={
+        'psi': st.column_config.NumberColumn('PSI', format='%.3f'),
+        'ks': st.column_config.NumberColumn('KS', format='%.3f'),
+        'reference_median': st.column_config.NumberColumn('Reference median', format='%.3f'),
+        'live_median': st.column_config.NumberColumn('Live median', format='%.3f'),
+    })
+
+    if categorical_rows:
+        st.subheader("Categorical Fields")
+        st.dataframe(categorical_rows, hide_index=True, use_container_width=True)
+
+    with st.expander("How to read this page"):
+        st.markdown(f"""
+        - **PSI** (population stability index) compares the share of petitions in each reference
+          decile. Below {PSI_MODERATE} is stable, {PSI_MODERATE}–{PSI_MAJOR} is a moderate shift and
+          above {PSI_MAJOR} a major one.
+        - **KS** is the largest gap between the reference and live cumulative distributions (0 to 1).
+        - Live distributions come from quantile sketches, accurate to about half a percentile.
+        """)
+
+if __name__ == "__main__":
+    drift_monitor_page()
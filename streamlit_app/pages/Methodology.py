@@ -1,8 +1,92 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import sys
+from pathlib import Path
+
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils.visualization import cached_figure
+
+@cached_figure('methodology.victory_distribution')
+def create_victory_distribution_chart():
+    """Original victory distribution"""
+    import plotly.express as px
+    victory_data = {'Category': ['Unsuccessful', 'Victory'], 'Count': [96.1, 3.9]}
+    return px.pie(
+        values=victory_data['Count'], 
+        names=victory_data['Category'],
+        title="Original Victory Classification",
+        color_discrete_map={'Unsuccessful': '#ff6b6b', 'Victory': '#4ecdc4'}
+    )
+
+@cached_figure('methodology.success_definition')
+def create_success_definition_chart():
+    """Final multi-pathway success"""
+    import plotly.express as px
+    success_data = {'Category': ['Unsuccessful', 'Successful'], 'Count': [76.8, 23.2]}
+    return px.pie(
+        values=success_data['Count'], 
+        names=success_data['Category'],
+        title="Multi-Pathway Success Definition",
+        color_discrete_map={'Unsuccessful': '#ff6b6b', 'Successful': '#4ecdc4'}
+    )
+
+@cached_figure('methodology.model_performance')
+def create_model_performance_chart():
+    """Model performance comparison"""
+    import plotly.express as px
+    model_performance = {
+        'Model': ['Random Forest', 'Logistic Regression', 'Gradient Boosting'],
+        'Accuracy': [0.770, 0.669, 0.789],
+        'AUC-ROC': [0.684, 0.707, 0.690],
+        'Status': ['✅ Deployed', 'Baseline', 'Alternative']
+    }
+    
+    fig_performance = px.bar(
+        model_performance, 
+        x='Model', 
+        y='Accuracy',
+        title='Model Performance Comparison',
+        color='Status',
+        color_discrete_map={'✅ Deployed': '#4ecdc4', 'Baseline': '#ffa726', 'Alternative': '#42a5f5'}
+    )
+    fig_performance.add_hline(y=0.7, line_dash="dash", line_color="red", 
+                            annotation_text="SOW Target (70%)")
+    return fig_performance
+
+@cached_figure('methodology.feature_importance')
+def create_feature_importance_chart():
+    """Top 8 feature importance rankings"""
+    import plotly.express as px
+    top_features = {
+        'Feature': [
+            'content_comprehensiveness_score',
+            'description_html_tags',
+            'professional_sophistication_score',
+            'description_vocab_diversity',
+            'letter_body_length',
+            'description_action_count',
+            'authority_targeting_score',
+            'title_automated_readability'
+        ],
+        'Importance': [0.0594, 0.0490, 0.0374, 0.0369, 0.0348, 0.0339, 0.0261, 0.0258],
+        'Category': [
+            'Content', 'Structure', 'Professional', 'Complexity', 
+            'Structure', 'Language', 'Language', 'Complexity'
+        ]
+    }
+    
+    fig_importance = px.bar(
+        top_features, 
+        x='Importance', 
+        y='Feature',
+        color='Category',
+        orientation='h',
+        title='Top 8 Feature Importance Rankings'
+    )
+    fig_importance.update_layout(height=500)
+    return fig_importance
 
 def show_methodology():
     """
@@ -146,26 +230,10 @@ def show_methodology():
         col1, col2 = st.columns(2)
         
         with col1:
-            # Original victory distribution
-            victory_data = {'Category': ['Unsuccessful', 'Victory'], 'Count': [96.1, 3.9]}
-            fig_original = px.pie(
-                values=victory_data['Count'], 
-                names=victory_data['Category'],
-                title="Original Victory Classification",
-                color_discrete_map={'Unsuccessful': '#ff6b6b', 'Victory': '#4ecdc4'}
-            )
-            st.plotly_chart(fig_original, use_container_width=True)
+            st.plotly_chart(create_victory_distribution_chart(), use_container_width=True)
             
         with col2:
-            # Final multi-pathway success
-            success_data = {'Category': ['Unsuccessful', 'Successful'], 'Count': [76.8, 23.2]}
-            fig_final = px.pie(
-                values=success_data['Count'], 
-                names=success_data['Category'],
-                title="Multi-Pathway Success Definition",
-                color_discrete_map={'Unsuccessful': '#ff6b6b', 'Successful': '#4ecdc4'}
-            )
-            st.plotly_chart(fig_final, use_container_width=True)
+            st.plotly_chart(create_success_definition_chart(), use_container_width=True)
         
         st.markdown("#### Solution: Multi-Pathway Success Framework")
         
@@ -188,6 +256,7 @@ def show_methodology():
             ]
         }
         
+        import pandas as pd
         df_success = pd.DataFrame(success_components)
         st.dataframe(df_success, hide_index=True)
         
@@ -230,24 +299,7 @@ def show_methodology():
         
         with col2:
             # Model performance visualization
-            model_performance = {
-                'Model': ['Random Forest', 'Logistic Regression', 'Gradient Boosting'],
-                'Accuracy': [0.770, 0.669, 0.789],
-                'AUC-ROC': [0.684, 0.707, 0.690],
-                'Status': ['✅ Deployed', 'Baseline', 'Alternative']
-            }
-            
-            fig_performance = px.bar(
-                model_performance, 
-                x='Model', 
-                y='Accuracy',
-                title='Model Performance Comparison',
-                color='Status',
-                color_discrete_map={'✅ Deployed': '#4ecdc4', 'Baseline': '#ffa726', 'Alternative': '#42a5f5'}
-            )
-            fig_performance.add_hline(y=0.7, line_dash="dash", line_color="red", 
-                                    annotation_text="SOW Target (70%)")
-            st.plotly_chart(fig_performance, use_container_width=True)
+            st.plotly_chart(create_model_performance_chart(), use_container_width=True)
     
     # Technical Implementation
     st.markdown("## 🔧 Technical Implementation")
@@ -288,34 +340,7 @@ def show_methodology():
     st.markdown("## 📈 Key Findings & Feature Importance")
     
     # Mock feature importance data based on your results
-    top_features = {
-        'Feature': [
-            'content_comprehensiveness_score',
-            'description_html_tags',
-            'professional_sophistication_score',
-            'description_vocab_diversity',
-            'letter_body_length',
-            'description_action_count',
-            'authority_targeting_score',
-            'title_automated_readability'
-        ],
-        'Importance': [0.0594, 0.0490, 0.0374, 0.0369, 0.0348, 0.0339, 0.0261, 0.0258],
-        'Category': [
-            'Content', 'Structure', 'Professional', 'Complexity', 
-            'Structure', 'Language', 'Language', 'Complexity'
-        ]
-    }
-    
-    fig_importance = px.bar(
-        top_features, 
-        x='Importance', 
-        y='Feature',
-        color='Category',
-        orientation='h',
-        title='Top 8 Feature Importance Rankings'
-    )
-    fig_importance.update_layout(height=500)
-    st.plotly_chart(fig_importance, use_container_width=True)
+    st.plotly_chart(create_feature_importance_chart(), use_container_width=True)
     
     # Business Impact
     st.markdown("## 💼 Business Impact & Recommendations")
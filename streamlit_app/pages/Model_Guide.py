@@ -1,11 +1,15 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pickle
 import os
+import sys
+from pathlib import Path
+
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils.model_performance import performance_metrics as holdout_performance_metrics
+from utils.visualization import cached_figure
 
 def load_model_artifacts():
     """Load model performance data from saved files"""
@@ -33,8 +37,13 @@ def load_model_artifacts():
         return {}
 
 def get_actual_performance_metrics():
-    """Get actual model performance metrics from your notebook results"""
-    # Based on your notebook output - Random Forest results
+    """Get model performance metrics from the saved holdout predictions"""
+    # Bootstrapped from models/evaluation_predictions.npz when it has been
+    # exported (python -m utils.model_performance export)
+    metrics = holdout_performance_metrics()
+    if metrics is not None:
+        return metrics
+    # Fallback: notebook output - Random Forest results
     return {
         'accuracy': 0.770,  # Random Forest: 77.0% 
         'auc_roc': 0.684,   # Random Forest: AUC 0.684
@@ -51,6 +60,7 @@ def get_actual_performance_metrics():
 
 def get_actual_feature_importance():
     """Get actual feature importance from your notebook"""
+    import pandas as pd
     # From your notebook - top features by importance
     features_data = [
         ("Content Comprehensiveness Score", 0.0594, "Content", 
@@ -89,6 +99,7 @@ def get_actual_feature_importance():
 
 def create_confusion_matrix_data(metrics):
     """Create confusion matrix as DataFrame for better display"""
+    import pandas as pd
     
     # Calculate actual numbers from your test set
     total_test = metrics['test_samples']
@@ -96,11 +107,11 @@ def create_confusion_matrix_data(metrics):
     unsuccessful_actual = metrics['unsuccessful_actual']
     
     # Calculate confusion matrix values
-    tp = int(successful_actual * metrics['recall_successful'])  # True Positives
+    tp = round(successful_actual * metrics['recall_successful'])  # True Positives
     fn = successful_actual - tp  # False Negatives
     
     # Calculate based on precision
-    total_predicted_successful = int(tp / metrics['precision_successful']) if metrics['precision_successful'] > 0 else tp
+    total_predicted_successful = round(tp / metrics['precision_successful']) if metrics['precision_successful'] > 0 else tp
     fp = total_predicted_successful - tp  # False Positives
     tn = unsuccessful_actual - fp  # True Negatives
     
@@ -116,6 +127,7 @@ def create_confusion_matrix_data(metrics):
 
 def create_feature_importance_viz(df):
     """Create feature importance visualization"""
+    import plotly.express as px
     
     # Top 10 features
     top_features = df.head(10)
@@ -151,20 +163,26 @@ def create_feature_importance_viz(df):
     
     return fig
 
+@cached_figure('model_guide.feature_importance')
+def create_feature_importance_chart():
+    """Feature importance chart for the notebook's importance table"""
+    return create_feature_importance_viz(get_actual_feature_importance())
+
 def model_performance_tab():
     """
     Model Performance & Interpretation tab for MobilizeNow messaging optimization
     """
+    import pandas as pd
+    
+    # Load actual performance data
+    performance_metrics = get_actual_performance_metrics()
     
     st.header(" Model Performance & Interpretation")
-    st.markdown("""
+    st.markdown(f"""
     This section helps you understand how our AI model performs and what drives petition success predictions.
-    Based on analysis of **3,081 Change.org petitions** with **77% accuracy**.
+    Based on analysis of **3,081 Change.org petitions** with **{performance_metrics['accuracy']:.0%} accuracy**.
     """)
     
-    # Load actual performance data
-    performance_metrics = get_actual_performance_metrics()
-    
     # Performance Overview Section
     st.subheader(" Model Performance Overview")
     
@@ -253,7 +271,7 @@ def model_performance_tab():
     feature_importance_data = get_actual_feature_importance()
     
     # Create feature importance visualization
-    fig_importance = create_feature_importance_viz(feature_importance_data)
+    fig_importance = create_feature_importance_chart()
     st.plotly_chart(fig_importance, use_container_width=True)
     
     # Explain top features in business terms
@@ -1,9 +1,14 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
-import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils.visualization import cached_figure
 def show_roadmap():
     """
     Display the Implementation Roadmap with interactive timeline and enhanced aesthetics
@@ -23,11 +28,8 @@ def show_roadmap():
     with tab1:
         st.markdown("### 🗓️ Interactive Project Timeline")
         
-        # Create timeline data
-        timeline_data = create_timeline_data()
-        
-        # Create interactive Gantt chart
-        fig = create_gantt_chart(timeline_data)
+        # Create interactive Gantt chart (cached per start date)
+        fig = create_gantt_chart(datetime.now().date())
         st.plotly_chart(fig, use_container_width=True)
         
         # Phase overview cards
@@ -113,11 +115,12 @@ def show_roadmap():
             if st.button("📥 View Full Roadmap Document", use_container_width=True):
                 display_full_roadmap()
 
-def create_timeline_data():
+def create_timeline_data(start_date=None):
     """Create timeline data for the Gantt chart"""
     
     # Calculate dates (assuming project starts now)
-    start_date = datetime.now().date()
+    if start_date is None:
+        start_date = datetime.now().date()
     
     phases = [
         {
@@ -145,12 +148,15 @@ def create_timeline_data():
     
     return phases
 
-def create_gantt_chart(timeline_data):
-    """Create an interactive Gantt chart"""
+@cached_figure('roadmap.gantt')
+def create_gantt_chart(start_date):
+    """Create an interactive Gantt chart for a project starting on start_date"""
+    import pandas as pd
+    import plotly.express as px
     
     # Convert to DataFrame for easier handling
     df_data = []
-    for phase in timeline_data:
+    for phase in create_timeline_data(start_date):
         df_data.append({
             'Task': phase['Phase'],
             'Start': phase['Start'],
@@ -1,43 +1,54 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import pickle
 import os
+import sys
+from pathlib import Path
+
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils.insights import MULTIPLIERS, get_petition_insights, ratio_changes
+from utils.visualization import cached_figure
 
 def load_data():
-    """Load processed data and model artifacts"""
+    """Load data insights and model artifacts"""
     try:
-        # Load processed data
-        data_path = os.path.join("streamlit_app", "data", "processed_petition_data.csv")
-        df = pd.read_csv(data_path)
+        # Benchmarks computed from the processed data, cached by data hash
+        insights = get_petition_insights()
         
         # Load model artifacts
-        model_path = os.path.join("streamlit_app", "models", "best_model.pkl")
+        model_path = os.path.join(APP_DIR, "models", "best_model.pkl")
         with open(model_path, 'rb') as f:
             model = pickle.load(f)
             
-        features_path = os.path.join("streamlit_app", "models", "model_features.pkl")
+        features_path = os.path.join(APP_DIR, "models", "model_features.pkl")
         with open(features_path, 'rb') as f:
             feature_names = pickle.load(f)
             
-        return df, model, feature_names
+        return insights, model, feature_names
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None, None, None
 
-def create_success_metrics_viz(df):
+@cached_figure('messaging_insights.success_metrics')
+def create_success_metrics_viz(data_hash):
     """Create visualization showing success rate improvements"""
+    import plotly.express as px
     
-    # Key metrics from your analysis
+    # Success multipliers computed from the data, with bootstrap intervals
+    ratios = get_petition_insights()['ratios']
     metrics_data = {
-        'Metric': ['Content Length', 'Professional Formatting', 'Title Complexity', 'Strategic Language'],
-        'Success_Multiplier': [1.65, 2.03, 1.19, 1.18],
-        'Improvement_Percentage': [65, 103, 19, 18],
-        'Category': ['Content', 'Structure', 'Complexity', 'Language']
+        'Metric': [label for _, label, _ in MULTIPLIERS],
+        'Success_Multiplier': [round(ratios[name]['value'], 2) for name, _, _ in MULTIPLIERS],
+        'Improvement_Percentage': [round((ratios[name]['value'] - 1) * 100) for name, _, _ in MULTIPLIERS],
+        'Category': [category for _, _, category in MULTIPLIERS]
     }
+    ci = [ratios[name]['ci'] for name, _, _ in MULTIPLIERS]
+    if all(ci):
+        metrics_data['CI_Plus'] = [(high - ratios[name]['value']) * 100 for (name, _, _), (_, high) in zip(MULTIPLIERS, ci)]
+        metrics_data['CI_Minus'] = [(ratios[name]['value'] - low) * 100 for (name, _, _), (low, _) in zip(MULTIPLIERS, ci)]
     
     metrics_df = pd.DataFrame(metrics_data)
     
@@ -45,6 +56,8 @@ def create_success_metrics_viz(df):
         metrics_df, 
         x='Metric', 
         y='Improvement_Percentage',
+        error_y='CI_Plus' if 'CI_Plus' in metrics_df else None,
+        error_y_minus='CI_Minus' if 'CI_Minus' in metrics_df else None,
         color='Category',
         title="📈 Success Rate Improvements by Strategic Element",
         labels={'Improvement_Percentage': 'Improvement (%)', 'Metric': 'Strategic Element'},
@@ -67,7 +80,7 @@ def create_success_metrics_viz(df):
     for i, row in metrics_df.iterrows():
         fig.add_annotation(
             x=row['Metric'],
-            y=row['Improvement_Percentage'] + 5,
+            y=row['Improvement_Percentage'] + row.get('CI_Plus', 0) + 5,
             text=f"{row['Success_Multiplier']}x",
             showarrow=False,
             font=dict(size=12, color="black", family="Arial Black")
@@ -75,15 +88,19 @@ def create_success_metrics_viz(df):
     
     return fig
 
-def create_length_analysis_viz(df):
+@cached_figure('messaging_insights.length_analysis')
+def create_length_analysis_viz(data_hash):
     """Create visualization showing optimal content lengths"""
+    import plotly.graph_objects as go
     
-    # Sample data based on your analysis
+    # Median lengths of successful vs unsuccessful petitions in the data
+    medians = get_petition_insights()['medians']
+    columns = ['title_length', 'description_length', 'letter_body_length', 'targeting_description_length']
     length_data = {
         'Content_Type': ['Title', 'Description', 'Letter Body', 'Target Description'],
-        'Successful_Median': [83, 1511, 66, 51],
-        'Unsuccessful_Median': [70, 914, 48, 35],
-        'Optimal_Range': ['80+ chars', '1500+ chars', '60+ chars', '50+ chars']
+        'Successful_Median': [medians[col]['successful'] for col in columns],
+        'Unsuccessful_Median': [medians[col]['unsuccessful'] for col in columns],
+        'Optimal_Range': [f"{medians[col]['successful']:,.0f}+ chars" for col in columns]
     }
     
     length_df = pd.DataFrame(length_data)
@@ -122,6 +139,7 @@ def create_length_analysis_viz(df):
 
 def create_feature_importance_viz(model, feature_names):
     """Create feature importance visualization"""
+    import plotly.express as px
     try:
         if hasattr(model, 'feature_importances_'):
             importance_df = pd.DataFrame({
@@ -172,15 +190,18 @@ def show_messaging_insights():
     """Main function to display messaging insights"""
     
     st.title("🎯 Messaging Insights & Best Practices")
-    st.markdown("*Evidence-based recommendations from analysis of 3,081 Change.org petitions*")
     
     # Load data
-    df, model, feature_names = load_data()
+    insights, model, feature_names = load_data()
     
-    if df is None:
+    if insights is None:
         st.error("Unable to load data. Please check your data files.")
         return
     
+    ratios = insights['ratios']
+    medians = insights['medians']
+    st.markdown(f"*Evidence-based recommendations from analysis of {insights['n_petitions']:,} Change.org petitions*")
+    
     # Key Findings Summary
     st.header(" Key Findings")
     
@@ -196,14 +217,14 @@ def show_messaging_insights():
     with col2:
         st.metric(
             "Content Length Advantage", 
-            "1.65x", 
+            f"{ratios['content_length']['value']:.2f}x", 
             "longer descriptions"
         )
     
     with col3:
         st.metric(
             "Formatting Advantage", 
-            "2.03x", 
+            f"{ratios['professional_formatting']['value']:.2f}x", 
             "more HTML tags"
         )
     
@@ -218,14 +239,14 @@ def show_messaging_insights():
     st.header(" Success Rate Improvements")
     st.markdown("**Professional sophistication outperforms simplified messaging across all categories:**")
     
-    fig1 = create_success_metrics_viz(df)
+    fig1 = create_success_metrics_viz(insights['data_hash'])
     st.plotly_chart(fig1, use_container_width=True)
     
     # Content Length Analysis
     st.header("📏 Optimal Content Lengths")
     st.markdown("**Successful petitions consistently use longer, more detailed content:**")
     
-    fig2 = create_length_analysis_viz(df)
+    fig2 = create_length_analysis_viz(insights['data_hash'])
     st.plotly_chart(fig2, use_container_width=True)
     
     # Feature Importance
@@ -373,8 +394,17 @@ def show_messaging_insights():
     
     benchmark_data = {
         'Element': ['Title Length', 'Description Length', 'HTML Tags', 'Readability Level', 'Urgency Keywords'],
-        'Successful Benchmark': ['83+ characters', '1,511+ characters', '25+ tags', 'Grade 10.7+', '2+ keywords'],
-        'Impact': ['1.19x advantage', '1.65x advantage', '2.03x advantage', 'Higher credibility', 'Higher engagement']
+        'Successful Benchmark': [
+            f"{medians['title_length']['successful']:,.0f}+ characters",
+            f"{medians['description_length']['successful']:,.0f}+ characters",
+            '25+ tags', 'Grade 10.7+', '2+ keywords'
+        ],
+        'Impact': [
+            f"{ratios['title_complexity']['value']:.2f}x advantage",
+            f"{ratios['content_length']['value']:.2f}x advantage",
+            f"{ratios['professional_formatting']['value']:.2f}x advantage",
+            'Higher credibility', 'Higher engagement'
+        ]
     }
     
     benchmark_df = pd.DataFrame(benchmark_data)
@@ -407,7 +437,12 @@ def show_messaging_insights():
 
     # Footer
     st.markdown("---")
-    st.caption("📊 Analysis based on 3,081 Change.org petitions | 🎯 77% prediction accuracy | 📈 Up to 352% success improvement")
+    st.caption(f"📊 Analysis based on {insights['n_petitions']:,} Change.org petitions | 🎯 77% prediction accuracy | 📈 Up to 352% success improvement")
+    changes = ratio_changes(insights)
+    if changes:
+        st.caption("ℹ️ Benchmarks are recomputed from the petition data and differ from the original analysis: "
+                   + ", ".join(f"{name.replace('_', ' ')} {value:.2f}x (was {original:.2f}x)"
+                               for name, value, original in changes))
 
 
 
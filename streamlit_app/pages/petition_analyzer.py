@@ -1,39 +1,29 @@
 
-import os 
+import json
+import sys
+import time
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-import re
 from pathlib import Path
 import warnings
 
+# Make the shared utils package importable when this page is run directly
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+from utils import data_processing
+from utils.audit_log import AuditLog
+from utils.drift import DriftMonitor
+from utils.feature_store import FeatureStore, build_reference_index
+from utils import metrics as scoring_metrics
+from utils.model_registry import MAX_LIVE_VERSIONS, SHADOW_POINTER_FILE, LiveModels
+from utils.pipeline import StreamlitPetitionPipeline, load_nltk, load_textstat
+from utils.request_profiling import profile_call, profile_report, profiling_allowed, stats_bytes
+from utils.scoring import predict_success, generate_detailed_feedback
+from utils.shadow import ShadowScorer
+from utils.timing import ENABLED as STAGE_TIMING, NULL_TIMER, StageStats, StageTimer
+
 
 warnings.filterwarnings('ignore')
-# Text processing imports
-try:
-    import nltk
-    from nltk.sentiment import SentimentIntensityAnalyzer
-    from nltk.tokenize import word_tokenize, sent_tokenize
-    # Download required NLTK data
-    try:
-        nltk.data.find('vader_lexicon')
-    except LookupError:
-        nltk.download('vader_lexicon', quiet=True)
-    try:
-        nltk.data.find('punkt')
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-    try:
-        nltk.data.find('stopwords')
-    except LookupError:
-        nltk.download('stopwords', quiet=True)
-except ImportError:
-    st.error("NLTK not installed. Please install with: pip install nltk")
-try:
-    from textstat import flesch_reading_ease, flesch_kincaid_grade, gunning_fog, automated_readability_index
-except ImportError:
-    st.error("Textstat not installed. Please install with: pip install textstat")
 # ============================================================================
 # PAGE CONFIGURATION & STYLING
 # ============================================================================
@@ -190,368 +180,70 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 # ============================================================================
-# PETITION PROCESSING PIPELINE
-# ============================================================================
-class StreamlitPetitionPipeline:
-    """Streamlit-optimized petition processing pipeline"""
-    def __init__(self):
-        self.sia = SentimentIntensityAnalyzer() if 'nltk' in globals() else None
-        self.setup_keywords()
-    def setup_keywords(self):
-        """Define keyword categories for analysis"""
-        self.urgency_keywords = [
-            'urgent', 'immediate', 'immediately', 'now', 'today', 'emergency', 'crisis',
-            'deadline', 'time running out', "before it's too late", 'last chance',
-            'act now', 'breaking', 'critical', 'asap', 'quickly', 'rapidly', 'soon'
-        ]
-        self.action_keywords = [
-            'stop', 'save', 'protect', 'demand', 'fight', 'defend', 'prevent',
-            'ban', 'end', 'cancel', 'reverse', 'change', 'fix', 'solve',
-            'help', 'support', 'join', 'sign', 'act', 'take action', 'make',
-            'force', 'require', 'ensure', 'guarantee', 'implement', 'establish'
-        ]
-        self.power_words = [
-            'justice', 'freedom', 'rights', 'equality', 'fair', 'unfair', 'wrong',
-            'illegal', 'violation', 'abuse', 'corruption', 'scandal', 'outrage',
-            'discrimination', 'injustice', 'betrayal', 'exploitation', 'oppression'
-        ]
-        self.authority_keywords = [
-            'government', 'minister', 'ministry', 'department', 'authority', 'official',
-            'court', 'judge', 'police', 'administration', 'commissioner', 'director',
-            'secretary', 'chief', 'president', 'prime minister', 'governor', 'congress'
-        ]
-        self.cta_patterns = [
-            r'\bsign\s+this\b', r'\bsign\s+now\b', r'\bjoin\s+us\b', r'\bhelp\s+us\b',
-            r'\btake\s+action\b', r'\bact\s+now\b', r'\bmake\s+a\s+difference\b',
-            r'\bdemand\s+action\b', r'\bstop\s+this\b', r'\bforce\s+them\b'
-        ]
-    def clean_html(self, text):
-        """Remove HTML tags and clean text"""
-        if pd.isna(text) or text is None:
-            return ""
-        clean = re.sub('<.*?>', '', str(text))
-        return ' '.join(clean.split())
-    def count_html_tags(self, text):
-        """Count HTML tags in text"""
-        if pd.isna(text) or text is None:
-            return 0
-        return len(re.findall('<.*?>', str(text)))
-    def count_keywords(self, text, keywords):
-        """Count keyword occurrences"""
-        if pd.isna(text) or text is None:
-            return 0
-        clean_text = self.clean_html(text).lower()
-        count = 0
-        for keyword in keywords:
-            count += clean_text.count(keyword.lower())
-        return count
-    def get_sentiment_scores(self, text):
-        """Get sentiment scores"""
-        if pd.isna(text) or text is None or not self.sia:
-            return {'compound': 0, 'pos': 0, 'neg': 0, 'neu': 0}
-        clean_text = self.clean_html(text)
-        return self.sia.polarity_scores(clean_text)
-    def calculate_readability(self, text):
-        """Calculate readability metrics"""
-        if pd.isna(text) or len(str(text).strip()) < 10:
-            return {
-                'flesch_ease': 0, 'flesch_kincaid': 0, 'gunning_fog': 0,
-                'automated_readability': 0, 'avg_sentence_length': 0,
-                'avg_word_length': 0, 'vocab_diversity': 0, 'caps_ratio': 0
-            }
-        clean_text = self.clean_html(text)
-        try:
-            if 'textstat' in globals():
-                flesch_ease = flesch_reading_ease(clean_text)
-                flesch_kincaid = flesch_kincaid_grade(clean_text)
-                gunning_fog_score = gunning_fog(clean_text)
-                automated_readability = automated_readability_index(clean_text)
-            else:
-                flesch_ease = flesch_kincaid = gunning_fog_score = automated_readability = 0
-        except:
-            flesch_ease = flesch_kincaid = gunning_fog_score = automated_readability = 0
-        # Additional metrics
-        try:
-            if 'nltk' in globals():
-                sentences = sent_tokenize(clean_text)
-                words = word_tokenize(clean_text)
-            else:
-                sentences = clean_text.split('.')
-                words = clean_text.split()
-            
-            avg_sentence_length = len(words) / len(sentences) if sentences else 0
-            avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
-            unique_words = set(word.lower() for word in words if word.isalpha())
-            vocab_diversity = len(unique_words) / len(words) if words else 0
-            caps_words = sum(1 for word in words if word.isupper() and len(word) > 1)
-            caps_ratio = caps_words / len(words) if words else 0
-        except:
-            avg_sentence_length = avg_word_length = vocab_diversity = caps_ratio = 0
-        return {
-            'flesch_ease': flesch_ease,
-            'flesch_kincaid': flesch_kincaid,
-            'gunning_fog': gunning_fog_score,
-            'automated_readability': automated_readability,
-            'avg_sentence_length': avg_sentence_length,
-            'avg_word_length': avg_word_length,
-            'vocab_diversity': vocab_diversity,
-            'caps_ratio': caps_ratio
-        }
-    def extract_features(self, petition_data):
-        """Extract all features from petition data"""
-        features = {}
-        text_columns = ['title', 'description', 'letter_body', 'targeting_description']
-        # Process each text column
-        for col in text_columns:
-            if col in petition_data:
-                text = petition_data[col]
-                # Basic text features
-                features[f'{col}_length'] = len(str(text)) if pd.notna(text) else 0
-                features[f'{col}_clean_length'] = len(self.clean_html(text))
-                features[f'{col}_word_count'] = len(self.clean_html(text).split()) if self.clean_html(text) else 0
-                # HTML features
-                if col == 'description':
-                    features[f'{col}_html_tags'] = self.count_html_tags(text)
-                # Keyword counts
-                features[f'{col}_urgency_count'] = self.count_keywords(text, self.urgency_keywords)
-                features[f'{col}_action_count'] = self.count_keywords(text, self.action_keywords)
-                features[f'{col}_power_count'] = self.count_keywords(text, self.power_words)
-                features[f'{col}_authority_count'] = self.count_keywords(text, self.authority_keywords)
-                # Boolean keyword features
-                features[f'{col}_has_urgency'] = int(features[f'{col}_urgency_count'] > 0)
-                features[f'{col}_has_action'] = int(features[f'{col}_action_count'] > 0)
-                # CTA detection
-                cta_count = sum(len(re.findall(pattern, str(text).lower())) for pattern in self.cta_patterns) if pd.notna(text) else 0
-                features[f'{col}_cta_count'] = cta_count
-                features[f'{col}_has_cta'] = int(cta_count > 0)
-                # Numbers and statistics
-                features[f'{col}_numbers_count'] = len(re.findall(r'\d+', str(text))) if pd.notna(text) else 0
-                features[f'{col}_has_statistics'] = int(bool(re.search(r'\d+%|\d+\s*(percent|million|thousand|billion)', str(text), re.IGNORECASE)) if pd.notna(text) else False)
-                # Text structure
-                features[f'{col}_paragraph_count'] = len([p for p in str(text).split('\n') if p.strip()]) if pd.notna(text) else 0
-                features[f'{col}_question_count'] = str(text).count('?') if pd.notna(text) else 0
-                # Sentiment features
-                sentiment = self.get_sentiment_scores(text)
-                features[f'{col}_sentiment_compound'] = sentiment['compound']
-                features[f'{col}_sentiment_positive'] = sentiment['pos']
-                features[f'{col}_sentiment_negative'] = sentiment['neg']
-                features[f'{col}_emotional_intensity'] = sentiment['pos'] + sentiment['neg']
-                # Readability features
-                readability = self.calculate_readability(text)
-                for metric, value in readability.items():
-                    features[f'{col}_{metric}'] = value
-        # Strategic composite features
-        features['content_comprehensiveness_score'] = (
-            features.get('title_clean_length', 0) +
-            features.get('description_clean_length', 0) +
-            features.get('letter_body_clean_length', 0)
-        )
-        # Professional sophistication score
-        desc_complexity = features.get('description_flesch_kincaid', 0)
-        desc_length = features.get('description_clean_length', 0)
-        html_formatting = features.get('description_html_tags', 0)
-        title_complexity_norm = min(features.get('title_flesch_kincaid', 0) / 20, 1)
-        desc_length_norm = min(desc_length / 2000, 1)
-        html_tags_norm = min(html_formatting / 25, 1)
-        features['professional_sophistication_score'] = (
-            title_complexity_norm * 0.4 + desc_length_norm * 0.3 + html_tags_norm * 0.3
-        )
-        # Strategic urgency score
-        urgency_total = features.get('title_urgency_count', 0) + features.get('description_urgency_count', 0)
-        action_total = features.get('title_action_count', 0) + features.get('description_action_count', 0)
-        sentiment_score = max(0, features.get('title_sentiment_compound', 0) + 1) / 2
-        features['strategic_urgency_score'] = min((urgency_total + action_total) / 10 * 0.7 + sentiment_score * 0.3, 1)
-        # Authority targeting score
-        features['authority_targeting_score'] = (
-            features.get('title_authority_count', 0) +
-            features.get('description_authority_count', 0) +
-            features.get('targeting_description_word_count', 0) / 10
-        )
-        # Message coherence score (simplified)
-        features['message_coherence_score'] = 0.5
-        return features
-# ============================================================================
 # MODEL LOADING FUNCTIONS
 # ============================================================================
 
-@st.cache_data
+@st.cache_resource
+def live_models():
+    """Deployed model versions, shared by every session"""
+    return LiveModels(data_dir=data_processing.DATA_DIR)
+
+@st.cache_resource
+def shadow_scorer():
+    """Background scorer for the registry's shadow candidate, if one is set"""
+    return ShadowScorer(LiveModels(fallback_dir=None, pointer=SHADOW_POINTER_FILE))
+
+@st.cache_resource
+def drift_monitor():
+    """Sketches of the petitions this process analyses, for the Drift Monitor page"""
+    return DriftMonitor()
+
+@st.cache_resource
+def audit_log():
+    """Append-only log of every analysis this process serves"""
+    return AuditLog()
+
+@st.cache_resource
+def metrics():
+    """Prometheus metrics of this process, if enabled, exported to a file and optionally over HTTP"""
+    if not scoring_metrics.ENABLED:
+        return None
+    registry = scoring_metrics.Metrics()
+    registry.add_collector(scoring_metrics.live_models_samples(live_models(), 'current'))
+    registry.add_collector(scoring_metrics.live_models_samples(shadow_scorer().candidates, 'shadow'))
+    registry.add_collector(scoring_metrics.feature_store_samples)
+    scoring_metrics.start_file_exporter(registry)
+    if scoring_metrics.PORT:
+        scoring_metrics.start_http_exporter(registry)
+    return registry
+
+@st.cache_resource
+def stage_stats():
+    """Rolling per-stage timings of timed analyses, shared by every session"""
+    return StageStats()
+
 def load_model_artifacts():
-    """Load all model artifacts with caching"""
-    artifacts = {}
+    """Artifacts of the currently deployed model version"""
     try:
-        # Get the directory where this script is located, then go up one level to streamlit_app
-        script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        # Load trained model
-        model_path = os.path.join(script_dir, 'models', 'best_model.pkl')
-        with open(model_path, 'rb') as f:
-            artifacts['model'] = pickle.load(f)
-        
-        # Load feature names
-        features_path = os.path.join(script_dir, 'models', 'model_features.pkl')
-        with open(features_path, 'rb') as f:
-            artifacts['features'] = pickle.load(f)
-        
-        # Load categorical encoders
-        encoders_path = os.path.join(script_dir, 'models', 'categorical_encoders.pkl')
-        with open(encoders_path, 'rb') as f:
-            artifacts['encoders'] = pickle.load(f)
-        
-        # Try to load reference data
-        try:
-            data_path = os.path.join(script_dir, 'data', 'processed_petition_data.xlsx')
-            artifacts['reference_data'] = pd.read_excel(data_path)
-        except FileNotFoundError:
-            # Try CSV as fallback
-            try:
-                data_path = os.path.join(script_dir, 'data', 'processed_petition_data.csv')
-                artifacts['reference_data'] = pd.read_csv(data_path)
-            except FileNotFoundError:
-                artifacts['reference_data'] = None
-        
-        return artifacts
-        
+        return live_models().get()
     except FileNotFoundError as e:
         st.error(f"Model files not found: {e}")
         return None
     except Exception as e:
         st.error(f"Error loading model artifacts: {e}")
         return None
-    
 
-def predict_success(petition_data, model_artifacts, pipeline):
-    """Predict petition success probability"""
-    if not model_artifacts:
-        return demo_prediction(petition_data, pipeline)
+@st.cache_resource(max_entries=MAX_LIVE_VERSIONS)
+def load_reference_index(version, _model_artifacts, _pipeline):
+    """Percentile index over the reference petitions already in the feature store"""
+    if not _model_artifacts or _model_artifacts['reference_data'] is None:
+        return None
+    store = FeatureStore(_pipeline)
     try:
-        features = pipeline.extract_features(petition_data)
-        
-        # Create feature vector
-        feature_vector = []
-        for feature_name in model_artifacts['features']:
-            feature_vector.append(features.get(feature_name, 0))
-        # Make prediction
-        feature_array = np.array(feature_vector).reshape(1, -1)
-        probability = model_artifacts['model'].predict_proba(feature_array)[0, 1]
-        prediction = model_artifacts['model'].predict(feature_array)[0]
-        return probability, prediction, features
-    except Exception as e:
-        st.error(f"Prediction error: {str(e)}")
-        return demo_prediction(petition_data, pipeline)
-def demo_prediction(petition_data, pipeline):
-    """Demo prediction when model is not available"""
-    features = pipeline.extract_features(petition_data)
-    # Simple scoring system
-    score = 0.0
-    # Content length (40% weight)
-    content_score = features.get('content_comprehensiveness_score', 0)
-    if content_score >= 2000:
-        score += 0.4
-    elif content_score >= 1000:
-        score += 0.25
-    elif content_score >= 500:
-        score += 0.15
-    # HTML formatting (20% weight)
-    html_tags = features.get('description_html_tags', 0)
-    score += min(html_tags / 25, 1) * 0.20
-    # Strategic language (25% weight)
-    urgency_count = features.get('title_urgency_count', 0) + features.get('description_urgency_count', 0)
-    action_count = features.get('title_action_count', 0) + features.get('description_action_count', 0)
-    strategic_score = min((urgency_count + action_count) / 8, 1)
-    score += strategic_score * 0.25
-    # Professional sophistication (15% weight)
-    prof_score = features.get('professional_sophistication_score', 0)
-    score += prof_score * 0.15
-    probability = min(score, 0.95)
-    prediction = 1 if probability >= 0.5 else 0
-    return probability, prediction, features
-# ============================================================================
-# FEEDBACK GENERATION
-# ============================================================================
-def generate_detailed_feedback(petition_data, features, probability, prediction):
-    """Generate comprehensive feedback and recommendations"""
-    
-    feedback = {
-        'probability': probability,
-        'prediction': prediction,
-        'grade': '',
-        'strengths': [],
-        'improvements': [],
-        'specific_recommendations': [],
-        'metrics': {}
-    }
-    # Overall grade and styling
-    if probability >= 0.8:
-        feedback['grade'] = "🏆 EXCELLENT"
-        feedback['grade_class'] = "success-excellent"
-        feedback['overall'] = "Your petition has exceptional success potential!"
-    elif probability >= 0.7:
-        feedback['grade'] = "🎯 VERY GOOD"
-        feedback['grade_class'] = "success-good"
-        feedback['overall'] = "Your petition has strong success potential with minor optimizations."
-    elif probability >= 0.6:
-        feedback['grade'] = "✅ GOOD"
-        feedback['grade_class'] = "success-good"
-        feedback['overall'] = "Your petition shows good potential with some improvements needed."
-    elif probability >= 0.5:
-        feedback['grade'] = "📈 MODERATE"
-        feedback['grade_class'] = "success-moderate"
-        feedback['overall'] = "Your petition has moderate potential - several improvements recommended."
-    elif probability >= 0.4:
-        feedback['grade'] = "⚠️ NEEDS WORK"
-        feedback['grade_class'] = "success-moderate"
-        feedback['overall'] = "Your petition needs significant improvements to succeed."
-    else:
-        feedback['grade'] = "🔧 MAJOR REVISION NEEDED"
-        feedback['grade_class'] = "success-poor"
-        feedback['overall'] = "Your petition requires major restructuring for success."
-    # Analyze specific metrics
-    content_score = features.get('content_comprehensiveness_score', 0)
-    html_tags = features.get('description_html_tags', 0)
-    urgency_count = features.get('title_urgency_count', 0) + features.get('description_urgency_count', 0)
-    action_count = features.get('title_action_count', 0) + features.get('description_action_count', 0)
-    prof_score = features.get('professional_sophistication_score', 0)
-    # Content analysis
-    if content_score >= 2000:
-        feedback['strengths'].append("✅ Excellent content comprehensiveness")
-    elif content_score >= 1000:
-        feedback['strengths'].append("✅ Good content length")
-    else:
-        feedback['improvements'].append("📝 Increase content comprehensiveness")
-        feedback['specific_recommendations'].append(
-            f"Expand total content to 2000+ characters (current: {content_score:.0f})"
-        )
-    # HTML formatting
-    if html_tags >= 15:
-        feedback['strengths'].append("✅ Professional HTML formatting")
-    else:
-        feedback['improvements'].append("🎨 Improve formatting and structure")
-        feedback['specific_recommendations'].append(
-            f"Add HTML formatting: <b>bold</b>, <strong>emphasis</strong>, <h3>headers</h3> (current: {html_tags} tags)"
-        )
-    # Strategic language
-    if urgency_count >= 2:
-        feedback['strengths'].append("✅ Strong urgency language")
-    else:
-        feedback['specific_recommendations'].append(
-            "Add urgency keywords: 'immediate', 'urgent', 'critical', 'emergency'"
-        )
-    if action_count >= 3:
-        feedback['strengths'].append("✅ Strong action-oriented language")
-    else:
-        feedback['specific_recommendations'].append(
-            "Include more action words: 'demand', 'stop', 'implement', 'enforce'"
-        )
-    # Store metrics for display
-    feedback['metrics'] = {
-        'Content Length': f"{content_score:.0f} characters",
-        'HTML Tags': f"{html_tags}",
-        'Urgency Words': f"{urgency_count}",
-        'Action Words': f"{action_count}",
-        'Professional Score': f"{prof_score:.2f}",
-        'Success Probability': f"{probability:.1%}"
-    }
-    return feedback
+        # Stored rows only: building the index never runs extraction
+        return build_reference_index(store, _model_artifacts['reference_data'].to_dict('records'))
+    finally:
+        store.close()
 # ============================================================================
 # STREAMLIT UI COMPONENTS
 # ============================================================================
@@ -721,12 +413,18 @@ def main():
     # Display header
     display_header()
     
-    # Initialize pipeline
-    pipeline = StreamlitPetitionPipeline()
-    
     # Try to load model artifacts
     model_artifacts = load_model_artifacts()
     
+    # Text analysis libraries are imported on first use
+    if load_nltk() is None:
+        st.error("NLTK not installed. Please install with: pip install nltk")
+    if load_textstat() is None:
+        st.error("Textstat not installed. Please install with: pip install textstat")
+    
+    # Initialize pipeline
+    pipeline = StreamlitPetitionPipeline.from_artifacts(model_artifacts)
+    
     # Status indicator
     if model_artifacts:
         st.success("✅ Model loaded successfully! Full analysis available.")
@@ -827,6 +525,11 @@ def main():
                 value=sample_data.get('has_location', True),
                 help="Check if your petition targets a specific geographic area"
             )
+            time_stages = st.checkbox(
+                "⏱️ Time Analysis Stages",
+                value=STAGE_TIMING,
+                help="Show how long each analysis stage takes under Advanced Metrics"
+            )
         
         # Submit button
         submitted = st.form_submit_button("🔍 Analyze Petition", type="primary")
@@ -851,10 +554,41 @@ def main():
         with st.spinner("🔄 Analyzing your petition... Please wait."):
             try:
                 # Make prediction
-                probability, prediction, features = predict_success(petition_data, model_artifacts, pipeline)
+                errors = []
+                def on_error(e):
+                    errors.append(e)
+                    st.error(f"Prediction error: {str(e)}")
+                process_metrics = metrics()
+                timer = StageTimer() if time_stages or process_metrics is not None else NULL_TIMER
+                profile_stats = None
+                start = time.perf_counter()
+                if profiling_allowed(st.query_params.get('profile')):
+                    (probability, prediction, features), profile_stats = profile_call(
+                        predict_success, petition_data, model_artifacts, pipeline, on_error=on_error,
+                        shadow=shadow_scorer(), timer=timer
+                    )
+                else:
+                    probability, prediction, features = predict_success(
+                        petition_data, model_artifacts, pipeline, on_error=on_error,
+                        shadow=shadow_scorer(), timer=timer
+                    )
+                latency_ms = (time.perf_counter() - start) * 1000
+                # A failed model falls back to the demo score; log it as such
+                audit_log().record(petition_data, features, None if errors else model_artifacts,
+                                   probability, prediction, latency_ms)
+                drift_monitor().update(features, petition_data)
+                timer.lap('monitoring')
                 
                 # Generate feedback
                 feedback = generate_detailed_feedback(petition_data, features, probability, prediction)
+                timer.lap('feedback')
+                if time_stages:
+                    stage_stats().add(timer)
+                if process_metrics is not None:
+                    process_metrics.record_analysis(
+                        None if errors else model_artifacts, latency_ms / 1000, timer,
+                        outcome='fallback' if errors else 'ok'
+                    )
                 
                 # Display results
                 st.markdown("## 📊 Analysis Results")
@@ -887,6 +621,52 @@ def main():
                         
                         for metric, value in language_metrics.items():
                             st.markdown(f"**{metric}:** {value}")
+                    
+                    reference_index = (
+                        load_reference_index(model_artifacts['version'], model_artifacts, pipeline)
+                        if model_artifacts else None
+                    )
+                    if reference_index is not None:
+                        st.markdown("#### Compared to Reference Petitions")
+                        percentiles = reference_index.percentiles(features, [
+                            'content_comprehensiveness_score', 'description_html_tags',
+                            'professional_sophistication_score', 'strategic_urgency_score'
+                        ])
+                        labels = {
+                            'content_comprehensiveness_score': 'Total Content Length',
+                            'description_html_tags': 'HTML Tags',
+                            'professional_sophistication_score': 'Professional Score',
+                            'strategic_urgency_score': 'Strategic Urgency'
+                        }
+                        for name, percentile in percentiles.items():
+                            st.markdown(f"**{labels[name]}:** higher than {percentile:.0f}% of {reference_index.n_rows:,} petitions")
+
+                    if time_stages:
+                        st.markdown("#### Stage Timing")
+                        record = timer.record()
+                        st.markdown(f"**This analysis:** {record['total_ms']:.1f} ms")
+                        st.bar_chart(record['stages'], horizontal=True, x_label="ms")
+                        stats = stage_stats()
+                        st.markdown(f"**Recent timed analyses** (last {stats.window:,} per stage)")
+                        st.dataframe(stats.summary(), hide_index=True, use_container_width=True, column_config={
+                            'mean_ms': st.column_config.NumberColumn('Mean ms', format='%.2f'),
+                            'p50_ms': st.column_config.NumberColumn('p50 ms', format='%.2f'),
+                            'p95_ms': st.column_config.NumberColumn('p95 ms', format='%.2f'),
+                        })
+                        st.download_button(
+                            "Download timing histograms (JSON)", json.dumps(stats.export(), indent=2),
+                            file_name="stage_timings.json", mime="application/json"
+                        )
+
+                if profile_stats is not None:
+                    with st.expander("🧪 Request Profile", expanded=True):
+                        report = profile_report(profile_stats)
+                        st.code(report, language=None)
+                        col1, col2 = st.columns(2)
+                        col1.download_button("Download report (txt)", report, file_name="petition_profile.txt",
+                                             mime="text/plain")
+                        col2.download_button("Download raw profile (.prof)", stats_bytes(profile_stats),
+                                             file_name="petition_profile.prof", mime="application/octet-stream")
                 
             except Exception as e:
                 st.error(f"❌ Analysis error: {str(e)}")
@@ -0,0 +1,85 @@
+"""
+Shared test setup
+Puts the app directory on sys.path, as the pages do, so tests import the
+utils package the way the app does, and builds small model bundles for the
+tests that load one. Run from the streamlit_app directory:
+    python -m pytest -q
+"""
+
+import json
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+# Model inputs of the small bundles built for the tests
+BUNDLE_FEATURES = ['description_clean_length', 'description_html_tags', 'title_word_count',
+                   'original_locale_encoded']
+LOCALES = ('en-US', 'en-GB', 'en-IN')
+
+
+def labelled_petitions(n, seed=0):
+    """Petitions whose outcome follows description length and formatting, with noise"""
+    rng = np.random.default_rng(seed)
+    petitions = []
+    for i in range(n):
+        success = int(rng.random() < 0.4)
+        words = int(rng.integers(20, 60) + 60 * success * rng.random())
+        paragraphs = int(rng.integers(1, 3) + 2 * success)
+        petitions.append({
+            'petition_id': f'{seed}-{i}',
+            'title': ' '.join(['Save'] + ['our'] * int(rng.integers(1, 6)) + ['park']),
+            'description': ''.join(f"<p>{'text ' * (words // paragraphs)}</p>" for _ in range(paragraphs)),
+            'original_locale': LOCALES[int(rng.integers(0, len(LOCALES)))],
+            'has_location': bool(rng.random() < 0.5),
+            'target_success': success,
+        })
+    return petitions
+
+
+@pytest.fixture(scope='session')
+def bundle_model():
+    """Encoders and a small gradient boosting model fitted on extracted features"""
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.preprocessing import LabelEncoder
+
+    from utils.feature_engineering import CategoricalLookup, FeatureSchema
+    from utils.pipeline import StreamlitPetitionPipeline
+
+    petitions = labelled_petitions(120)
+    encoders = {
+        'original_locale': LabelEncoder().fit(list(LOCALES)),
+        'has_location': LabelEncoder().fit(['False', 'True']),
+    }
+    schema = FeatureSchema.for_model(BUNDLE_FEATURES)
+    pipeline = StreamlitPetitionPipeline(categorical_lookup=CategoricalLookup(encoders), schema=schema)
+    X = pipeline.extract_feature_matrix(petitions)[:, schema.positions(BUNDLE_FEATURES)]
+    y = np.array([petition['target_success'] for petition in petitions])
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0).fit(X, y)
+    return model, encoders
+
+
+@pytest.fixture
+def make_bundle(tmp_path, bundle_model):
+    """Write a bundle the app can load; returns its directory"""
+    from utils.data_processing import MANIFEST_FILE, MODEL_FILE
+
+    model, encoders = bundle_model
+
+    def make(name='bundle', model=model, manifest=None):
+        directory = tmp_path / name
+        directory.mkdir(parents=True)
+        for file_name, value in ((MODEL_FILE, model), ('model_features.pkl', BUNDLE_FEATURES),
+                                 ('categorical_encoders.pkl', encoders)):
+            with open(directory / file_name, 'wb') as f:
+                pickle.dump(value, f)
+        manifest = {'version': 1, 'keyword_matching': 'substring', **(manifest or {})}
+        (directory / MANIFEST_FILE).write_text(json.dumps(manifest))
+        return directory
+    return make
@@ -0,0 +1,107 @@
+"""Audit log: block format, truncated files and the background writer"""
+
+import io
+import time
+
+import numpy as np
+import pytest
+
+from utils.audit_log import (
+    BLOCK_HEADER, BLOCK_MAGIC, DEMO_VERSION, FILE_SUFFIX, AuditLog, _read_blocks, encode_block, load_audit_log,
+    main, read_audit_log
+)
+from utils.feature_engineering import FeatureRecord, FeatureSchema
+from utils.feature_store import text_hash
+
+PETITION = {'title': 'Fix the bridge', 'description': '<p>It is broken</p>', 'original_locale': 'en-US'}
+
+
+def items(n, names=('a', 'b'), version='v1', start=1000.0):
+    return [
+        (start + i, dict(PETITION, title=f'Petition {i}'), names, np.arange(len(names), dtype=float) + i,
+         version, i / n, i % 2, 1.5)
+        for i in range(n)
+    ]
+
+
+def test_block_is_a_header_and_a_savez_payload():
+    block = encode_block(('a', 'b'), items(3))
+    magic, length = BLOCK_HEADER.unpack(block[:BLOCK_HEADER.size])
+    assert magic == BLOCK_MAGIC and length == len(block) - BLOCK_HEADER.size
+
+    with np.load(io.BytesIO(block[BLOCK_HEADER.size:])) as payload:
+        assert payload['features'].shape == (3, 2)
+        assert payload['feature_names'].tolist() == ['a', 'b']
+        assert payload['model_version'].tolist() == ['v1'] * 3
+        assert payload['prediction'].tolist() == [0, 1, 0]
+        assert payload['input_hash'][0].decode() == text_hash(dict(PETITION, title='Petition 0'))
+
+
+@pytest.mark.parametrize('cut', [4, BLOCK_HEADER.size, BLOCK_HEADER.size + 10, -1])
+def test_read_blocks_stops_at_a_truncated_block(tmp_path, cut):
+    path = tmp_path / f'log{FILE_SUFFIX}'
+    last = encode_block(('a',), items(2, names=('a',)))
+    path.write_bytes(encode_block(('a', 'b'), items(3)) + encode_block((), items(1, names=())) + last[:cut])
+
+    blocks = list(_read_blocks(path))
+
+    assert [len(block['timestamp']) for block in blocks] == [3, 1]
+    assert blocks[1]['features'].shape == (1, 0)
+
+
+def test_read_blocks_stops_at_a_bad_magic(tmp_path):
+    path = tmp_path / f'log{FILE_SUFFIX}'
+    good = encode_block(('a',), items(2, names=('a',)))
+    path.write_bytes(good + b'XXXX' + good[4:])
+    assert len(list(_read_blocks(path))) == 1
+
+
+def test_writer_groups_schemas_and_reads_back(tmp_path):
+    schema = FeatureSchema.for_model()
+    log = AuditLog(tmp_path, flush_seconds=0.05)
+    values = schema.new_row()
+    values[schema.index['title_word_count']] = 3
+    log.record(PETITION, FeatureRecord(schema, values), {'version': 'v2'}, 0.75, 1, 12.0)
+    log.record(PETITION, None, None, 0.25, 0, 3.0)
+    log.close()
+
+    assert log.written == 2
+    assert log.path.name.endswith(FILE_SUFFIX)
+    assert len(list(_read_blocks(log.path))) == 2
+    frame = load_audit_log(tmp_path)
+    assert frame['model_version'].tolist() == ['v2', DEMO_VERSION]
+    assert frame['probability'].tolist() == [0.75, 0.25]
+    assert frame['input_hash'].tolist() == [text_hash(PETITION)] * 2
+    assert frame.loc[0, 'title_word_count'] == 3
+    assert np.isnan(frame.loc[1, 'title_word_count'])
+    assert list(load_audit_log(tmp_path, features=False).columns) == [
+        'timestamp', 'input_hash', 'model_version', 'probability', 'prediction', 'latency_ms'
+    ]
+
+
+def test_writer_rotates_by_size(tmp_path):
+    log = AuditLog(tmp_path, batch_size=1, flush_seconds=0.05, rotate_bytes=1)
+    for _ in range(3):
+        log.record(PETITION, None, {'version': 'v1'}, 0.5, 1, 1.0)
+    log.close()
+    assert len(list(tmp_path.glob(f'*{FILE_SUFFIX}'))) == 3
+    assert len(load_audit_log(tmp_path)) == 3
+
+
+def test_time_bounds_filter_rows(tmp_path):
+    path = tmp_path / f'log{FILE_SUFFIX}'
+    now = time.time()
+    path.write_bytes(encode_block(('a', 'b'), items(10, start=now - 5)))
+
+    assert len(load_audit_log(tmp_path, since=now - 2)) == 7
+    assert len(load_audit_log(tmp_path, since=now - 5, until=now - 2)) == 3
+    assert load_audit_log(tmp_path, until=now - 100) is None
+    assert list(read_audit_log(tmp_path / 'missing')) == []
+
+
+def test_cli_summary(tmp_path, capsys):
+    assert main(['--dir', str(tmp_path)]) == 1
+    (tmp_path / f'log{FILE_SUFFIX}').write_bytes(encode_block(('a', 'b'), items(4, start=time.time())))
+    assert main(['--dir', str(tmp_path)]) == 0
+    out = capsys.readouterr().out
+    assert 'v1' in out and 'analyses' in out
@@ -0,0 +1,160 @@
+"""Drift monitoring: quantile sketch, live segments and drift statistics"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import drift
+from utils.drift import (
+    OTHER_CATEGORY, SKETCH_K, DriftMonitor, QuantileSketch, categorical_drift, feature_drift, load_live_profile, psi,
+    severity
+)
+from utils.feature_engineering import FeatureRecord, FeatureSchema
+from utils.feature_store import ReferencePercentiles
+
+NAMES = ['description_clean_length', 'title_word_count']
+
+
+def sketch_of(rows, k=64, seed=0):
+    sketch = QuantileSketch(rows.shape[1], k=k, seed=seed)
+    for row in rows:
+        sketch.update(row)
+    return sketch
+
+
+def quantile(sketch, position, q):
+    values, shares = sketch.column(position)
+    return values[min(np.searchsorted(shares, q), len(values) - 1)]
+
+
+def test_sketch_quantiles_track_the_exact_ones():
+    rows = np.random.default_rng(0).normal(size=(5000, 2)) * [1, 10]
+    sketch = sketch_of(rows, k=SKETCH_K)
+
+    assert sketch.count == 5000
+    # Each level holds fewer than k rows
+    assert all(len(items) < SKETCH_K for items in sketch.levels)
+    assert len(sketch.levels) <= np.log2(5000 / SKETCH_K) + 1
+    for position in (0, 1):
+        for q in (0.1, 0.5, 0.9):
+            rank = np.mean(rows[:, position] <= quantile(sketch, position, q))
+            assert rank == pytest.approx(q, abs=0.02)
+
+
+def test_merge_adds_counts_and_keeps_quantiles():
+    rng = np.random.default_rng(1)
+    low, high = rng.uniform(0, 1, size=(3000, 1)), rng.uniform(1, 2, size=(1037, 1))
+    merged = sketch_of(low, seed=0)
+    other = sketch_of(high, seed=1)
+    assert other.fill > 0
+
+    merged.merge(other)
+
+    assert merged.count == 3000 + 1037
+    assert other.count == 1037
+    both = np.concatenate([low, high])[:, 0]
+    for q in (0.25, 0.5, 0.75, 0.9):
+        assert np.mean(both <= quantile(merged, 0, q)) == pytest.approx(q, abs=0.03)
+
+
+def test_merge_into_a_sketch_with_fewer_levels():
+    rows = np.arange(300, dtype=float).reshape(-1, 1)
+    other = sketch_of(rows)
+    # Levels emptied by compaction sit below the filled ones
+    assert any(len(items) == 0 for items in other.levels)
+    merged = QuantileSketch(1, k=64)
+    merged.merge(other)
+    assert merged.count == 300
+    assert quantile(merged, 0, 0.5) == pytest.approx(150, abs=15)
+
+
+def test_state_round_trip():
+    sketch = sketch_of(np.random.default_rng(2).normal(size=(700, 2)))
+    restored = QuantileSketch.from_state(sketch.state())
+    assert restored.count == sketch.count
+    for position in (0, 1):
+        np.testing.assert_array_equal(restored.column(position)[0], sketch.column(position)[0])
+        np.testing.assert_array_equal(restored.column(position)[1], sketch.column(position)[1])
+
+
+def feature_record(schema, description_length, title_words):
+    row = schema.new_row()
+    row[schema.positions(NAMES)] = [description_length, title_words]
+    return FeatureRecord(schema, row)
+
+
+def test_monitor_segments_merge_into_a_live_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(drift, 'MAX_CATEGORIES', 2)
+    schema = FeatureSchema.for_model()
+    monitors = [DriftMonitor(tmp_path, names=NAMES, flush_seconds=3600) for _ in range(2)]
+    for i in range(30):
+        petition = {'original_locale': ('en-US', 'en-GB', 'fr-FR')[i % 3], 'has_location': True}
+        monitors[i % 2].update(feature_record(schema, 100 + i, 5), petition)
+    for monitor in monitors:
+        monitor.path = tmp_path / f'{id(monitor)}.npz'
+        monitor.flush()
+    (tmp_path / 'broken.npz').write_bytes(b'not an archive')
+
+    profile = load_live_profile(tmp_path)
+
+    assert profile['segments'] == 2
+    assert profile['names'] == NAMES
+    assert profile['sketch'].count == 30
+    np.testing.assert_array_equal(profile['sketch'].column(0)[0], np.arange(100, 130))
+    # Past MAX_CATEGORIES distinct values per segment, the rest share one bucket:
+    # en-GB in the even rows' segment, fr-FR in the odd rows'
+    assert profile['categories']['original_locale'] == {
+        'en-US': 10, 'fr-FR': 5, 'en-GB': 5, OTHER_CATEGORY: 10
+    }
+    assert profile['categories']['has_location'] == {'True': 30}
+
+
+def test_segments_with_other_features_are_skipped(tmp_path):
+    schema = FeatureSchema.for_model()
+    newest = DriftMonitor(tmp_path, names=NAMES, flush_seconds=3600)
+    older = DriftMonitor(tmp_path, names=NAMES[:1], flush_seconds=3600)
+    older.path = tmp_path / 'older.npz'
+    older.update(feature_record(schema, 1, 1), {})
+    older.flush()
+    newest.path = tmp_path / 'newest.npz'
+    newest.update(feature_record(schema, 2, 2), {})
+    newest.flush()
+    # Make sure the order by modification time is unambiguous
+    older_time = (tmp_path / 'newest.npz').stat().st_mtime - 10
+    os.utime(tmp_path / 'older.npz', (older_time, older_time))
+
+    profile = load_live_profile(tmp_path)
+    assert profile['names'] == NAMES and profile['segments'] == 1
+    assert load_live_profile(tmp_path / 'missing') is None
+
+
+def test_feature_drift_separates_stable_and_shifted_features():
+    rng = np.random.default_rng(3)
+    reference = ReferencePercentiles(rng.normal(size=(2000, 2)), NAMES)
+    live = rng.normal(size=(2000, 2)) + [0, 2]
+    profile = {'names': NAMES, 'sketch': sketch_of(live)}
+
+    rows = {row['feature']: row for row in feature_drift(reference, profile)}
+
+    assert rows['description_clean_length']['severity'] == 'stable'
+    assert rows['description_clean_length']['ks'] < 0.1
+    assert rows['title_word_count']['severity'] == 'major'
+    assert rows['title_word_count']['ks'] > 0.5
+    assert rows['title_word_count']['live_median'] == pytest.approx(2, abs=0.2)
+    assert [row['feature'] for row in feature_drift(reference, profile)][0] == 'title_word_count'
+
+
+def test_psi_and_categorical_drift():
+    shares = np.array([0.2, 0.3, 0.5])
+    assert psi(shares, shares) == 0
+    assert psi(shares, np.array([0.5, 0.3, 0.2])) > 0.25
+    assert [severity(value) for value in (0.05, 0.1, 0.3)] == ['stable', 'moderate', 'major']
+
+    reference_data = pd.DataFrame({'original_locale': ['en-US'] * 80 + ['en-GB'] * 20})
+    profile = {'categories': {'original_locale': {'en-US': 20, 'en-GB': 80}, 'has_location': {'True': 5}}}
+    (row,) = categorical_drift(reference_data, profile)
+    assert row['field'] == 'original_locale' and row['severity'] == 'major'
+    assert row['live_top_value'] == 'en-GB'
+    assert row['live_top_share'] == 0.8 and row['reference_top_share'] == 0.2
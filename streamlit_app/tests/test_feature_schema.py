@@ -0,0 +1,43 @@
+"""Array-backed feature rows and their schema"""
+
+import numpy as np
+
+from utils.feature_engineering import FeatureRecord, FeatureSchema, pipeline_feature_names
+from utils.pipeline import StreamlitPetitionPipeline
+
+PETITIONS = [
+    {'title': 'Stop the closure now', 'description': '<p>Sign this petition.</p><p>40% of us rely on it</p>',
+     'letter_body': 'Please act', 'original_locale': 'en-US', 'has_location': True},
+    {'title': 'Save the park', 'description': None, 'original_locale': 'en-GB'},
+]
+
+
+def test_for_model_appends_model_only_features_once():
+    names = pipeline_feature_names()
+    schema = FeatureSchema.for_model([names[0], 'model_only_feature'])
+    assert schema.names[:len(names)] == names
+    assert schema.names[-1] == 'model_only_feature'
+    assert len(schema) == len(names) + 1
+    assert schema.positions(['model_only_feature', names[0]]).tolist() == [len(names), 0]
+
+
+def test_record_reads_integers_and_floats():
+    schema = FeatureSchema.for_model()
+    record = FeatureRecord(schema)
+    record['description_html_tags'] = 3
+    record['title_sentiment_compound'] = 0.25
+    assert record['description_html_tags'] == 3 and isinstance(record['description_html_tags'], int)
+    assert record['title_sentiment_compound'] == 0.25
+    assert record.get('not_a_feature', -1) == -1
+    assert 'title_sentiment_compound' in record
+    assert list(record.keys()) == list(schema.names)
+    assert record.select(schema.positions(['description_html_tags'])).shape == (1, 1)
+
+
+def test_batch_matrix_matches_single_extraction():
+    pipeline = StreamlitPetitionPipeline(keyword_matching='token')
+    matrix = pipeline.extract_feature_matrix(PETITIONS)
+    assert matrix.shape == (len(PETITIONS), len(pipeline.schema))
+    for row, petition in zip(matrix, PETITIONS):
+        record = pipeline.extract_features(petition)
+        assert np.allclose(row, record.values)
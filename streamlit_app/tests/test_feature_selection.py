@@ -0,0 +1,54 @@
+"""Cost-weighted feature family selection"""
+
+import numpy as np
+import pytest
+
+from utils.feature_engineering import family_feature_names
+from utils.feature_selection import format_selection, grouped_permutation_importance, select_features
+from utils.pipeline import StreamlitPetitionPipeline
+
+INFORMATIVE = 'description.sentiment'
+NOISE = 'description.readability'
+NAMES = ['description_clean_length'] + list(family_feature_names(INFORMATIVE)) + list(family_feature_names(NOISE))
+PARAMS = {'n_estimators': 30, 'max_depth': 2, 'random_state': 0}
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, len(NAMES)))
+    signal = X[:, 1] + X[:, 2] + 0.5 * X[:, 0]
+    y = (signal + rng.normal(scale=0.5, size=400) > 0).astype(int)
+    return X, y
+
+
+def test_permutation_importance_ranks_groups(data):
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    X, y = data
+    model = GradientBoostingClassifier(**PARAMS).fit(X, y)
+    groups = {INFORMATIVE: [1, 2, 3, 4], NOISE: [5, 6, 7, 8]}
+    importance = grouped_permutation_importance(model, X, y, groups)
+    assert importance[INFORMATIVE] > 0.1
+    assert abs(importance[NOISE]) < importance[INFORMATIVE] / 5
+
+
+def test_drops_costly_noise_and_keeps_signal(data):
+    X, y = data
+    costs = {INFORMATIVE: 1.0, NOISE: 20.0}
+    report = select_features(X, y, NAMES, costs, PARAMS, tolerance=0.01, log=lambda _: None)
+    assert report['dropped_families'] == [NOISE]
+    assert set(report['features']) == set(NAMES) - set(family_feature_names(NOISE))
+    assert report['auc_lost'] <= 0.01
+    assert report['family_ms_saved'] == 20.0
+    assert NOISE in format_selection(report)
+
+
+def test_pipeline_validates_disabled_families():
+    with pytest.raises(ValueError):
+        StreamlitPetitionPipeline(disabled_families=['description.unknown'])
+    with pytest.raises(ValueError):
+        StreamlitPetitionPipeline(disabled_families=['title.readability'])
+    pipeline = StreamlitPetitionPipeline(disabled_families=[INFORMATIVE])
+    features = pipeline.extract_features({'title': 'x', 'description': 'A truly wonderful, joyful day'})
+    assert features['description_sentiment_positive'] == 0
@@ -0,0 +1,108 @@
+"""SQLite feature store: round trips, namespaces and categorical re-encoding"""
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from utils import feature_store
+from utils.feature_engineering import CategoricalLookup, FeatureSchema
+from utils.feature_store import FeatureStore, ReferencePercentiles, text_hash
+from utils.pipeline import StreamlitPetitionPipeline
+
+FEATURES = ['description_clean_length', 'title_urgency_count', 'original_locale_encoded']
+PETITIONS = [
+    {'title': 'Act now', 'description': '<p>Urgent: sign today</p>', 'original_locale': 'en-US'},
+    {'title': 'Save the park', 'description': 'We know the end is near', 'original_locale': 'en-GB'},
+    {'title': 'Act now', 'description': '<p>Urgent: sign today</p>', 'original_locale': 'en-US'},
+]
+
+
+def make_pipeline(keyword_matching='token', locales=('en-GB', 'en-US'), **kwargs):
+    lookup = CategoricalLookup({'original_locale': LabelEncoder().fit(list(locales))})
+    return StreamlitPetitionPipeline(keyword_matching=keyword_matching, categorical_lookup=lookup,
+                                     schema=FeatureSchema.for_model(FEATURES), **kwargs)
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return make_pipeline()
+
+
+def test_text_hash():
+    petition = PETITIONS[0]
+    assert text_hash(petition) == text_hash(dict(petition, has_location=True))
+    assert text_hash(petition) != text_hash(dict(petition, original_locale='en-IN'))
+    assert text_hash({'title': ''}) != text_hash({})
+
+
+def test_round_trip_extracts_each_text_once(tmp_path, pipeline):
+    path = tmp_path / 'features.sqlite'
+    store = FeatureStore(pipeline, path)
+    first = store.extract_feature_matrix(PETITIONS)
+    assert (store.hits, store.misses) == (1, 2)
+    store.close()
+
+    store = FeatureStore(pipeline, path)
+    try:
+        second = store.extract_feature_matrix(PETITIONS)
+        assert (store.hits, store.misses) == (3, 0)
+        assert len(store) == 2
+    finally:
+        store.close()
+    assert np.array_equal(first, second)
+    assert np.array_equal(first, pipeline.extract_feature_matrix(PETITIONS))
+
+
+@pytest.mark.parametrize('other', [
+    lambda monkeypatch: make_pipeline(keyword_matching='substring'),
+    lambda monkeypatch: make_pipeline(locale_variants=True),
+    lambda monkeypatch: make_pipeline(disabled_families=['description.readability']),
+    lambda monkeypatch: monkeypatch.setattr(feature_store, 'missing_nlp_data', lambda: ()) or make_pipeline(),
+])
+def test_settings_get_their_own_namespace(tmp_path, monkeypatch, pipeline, other):
+    path = tmp_path / 'features.sqlite'
+    store = FeatureStore(pipeline, path)
+    store.extract_feature_matrix(PETITIONS)
+    store.close()
+    other_pipeline = other(monkeypatch)
+    other_store = FeatureStore(other_pipeline, path)
+    try:
+        assert other_store.namespace != store.namespace
+        assert len(other_store) == 0
+    finally:
+        other_store.close()
+
+
+def test_categoricals_use_the_reading_pipeline_encoders(tmp_path, pipeline):
+    path = tmp_path / 'features.sqlite'
+    store = FeatureStore(pipeline, path)
+    store.extract_feature_matrix(PETITIONS)
+    store.close()
+    # A new encoder with an extra class shifts the codes but not the schema
+    reencoded = make_pipeline(locales=('en-AU', 'en-GB', 'en-US'))
+    store = FeatureStore(reencoded, path)
+    try:
+        matrix = store.extract_feature_matrix(PETITIONS)
+        assert store.misses == 0
+    finally:
+        store.close()
+    column = reencoded.schema.index['original_locale_encoded']
+    assert matrix[:, column].tolist() == [2, 1, 2]
+
+
+def test_unstored_rows_are_nan_without_extraction(tmp_path, pipeline):
+    store = FeatureStore(pipeline, tmp_path / 'features.sqlite')
+    try:
+        matrix = store.extract_feature_matrix(PETITIONS[:2], compute_missing=False)
+        assert np.isnan(matrix[:, 0]).all()
+        assert len(store) == 0
+    finally:
+        store.close()
+
+
+def test_reference_percentiles_count_ties_half():
+    index = ReferencePercentiles(np.array([[1.0], [2.0], [2.0], [4.0]]), ['x'])
+    assert index.percentile('x', 2.0) == 50.0
+    assert index.percentile('x', 0.0) == 0.0
+    assert index.percentile('x', 5.0) == 100.0
+    assert index.percentiles({'x': 4.0, 'y': 1.0}, ['x', 'y']) == {'x': 87.5}
@@ -0,0 +1,58 @@
+"""Per-process cache of static Plotly figures"""
+
+import pytest
+
+from utils import visualization
+from utils.visualization import cached_figure, cached_figure_count, clear_figure_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_figure_cache()
+    yield
+    clear_figure_cache()
+
+
+def test_builds_once_per_arguments():
+    calls = []
+
+    @cached_figure('test.figure')
+    def build(kind, scale=1):
+        calls.append((kind, scale))
+        return object()
+
+    first = build('bar')
+    assert build('bar') is first
+    assert build('bar', scale=2) is not first
+    assert build('line') is not first
+    assert calls == [('bar', 1), ('bar', 2), ('line', 1)]
+    assert cached_figure_count() == 3
+
+
+def test_version_is_part_of_the_key():
+    @cached_figure('test.versioned', version='a')
+    def old():
+        return object()
+
+    @cached_figure('test.versioned', version='b')
+    def new():
+        return object()
+
+    assert old() is not new()
+
+
+def test_oldest_figure_is_evicted(monkeypatch):
+    monkeypatch.setattr(visualization, 'MAX_CACHED_FIGURES', 2)
+    calls = []
+
+    @cached_figure('test.bounded')
+    def build(n):
+        calls.append(n)
+        return object()
+
+    build(1)
+    build(2)
+    build(3)
+    assert cached_figure_count() == 2
+    build(1)
+    assert calls == [1, 2, 3, 1]
@@ -0,0 +1,58 @@
+"""scan_html against the regex helpers it replaced in petition_analyzer"""
+
+import re
+
+import pytest
+
+from utils.feature_engineering import scan_html
+
+
+def legacy_clean_html(text):
+    clean = re.sub('<.*?>', '', str(text))
+    return ' '.join(clean.split())
+
+
+def legacy_count_html_tags(text):
+    return len(re.findall('<.*?>', str(text)))
+
+
+def legacy_paragraph_count(text):
+    return len([p for p in str(text).split('\n') if p.strip()])
+
+
+SAMPLES = [
+    'plain text without markup',
+    '<p>First paragraph</p><p>Second <strong>bold</strong> one</p>',
+    '<h3>Why</h3>\n<ul><li>one</li><li>two</li></ul>\n<p>After the list</p>',
+    'line one\n\n  \nline two<br>still two\n<br/>',
+    '<p>unclosed <b>tag <i>nesting</p>',
+    'a < b and c > d, <not a tag',
+    '<P CLASS="x">Upper case tags</P>',
+    '\n\n',
+    '',
+]
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_matches_legacy_helpers(text):
+    scan = scan_html(text)
+    assert scan['clean_text'] == legacy_clean_html(text)
+    assert scan['tag_count'] == legacy_count_html_tags(text)
+    assert scan['line_count'] == legacy_paragraph_count(text)
+
+
+@pytest.mark.parametrize('value', [None, float('nan')])
+def test_missing_text_is_empty(value):
+    scan = scan_html(value)
+    assert scan['clean_text'] == ''
+    assert scan['tag_count'] == 0
+    assert scan['paragraph_count'] == 0
+
+
+def test_structure_counts():
+    scan = scan_html('<h3>Why</h3><ul><li>one</li><li>two</li></ul><p>After</p><ol><li>x</li></ol>')
+    assert scan['tag_histogram']['li'] == 3
+    assert scan['tag_histogram']['p'] == 1
+    assert scan['list_count'] == 2
+    # The heading and the paragraph; list items are not paragraphs
+    assert scan['paragraph_count'] == 2
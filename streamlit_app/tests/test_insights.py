@@ -0,0 +1,102 @@
+"""Success benchmarks computed from petition data"""
+
+import csv
+
+import numpy as np
+import pytest
+
+from utils import insights
+from utils.insights import (
+    STATIC_INSIGHTS, InsightsEngine, get_petition_insights, ingest_petitions, loaded_petition_insights,
+    ratio_changes
+)
+
+
+def petition(i, success):
+    return {
+        'petition_id': i,
+        'title': 'T' * (20 + 10 * success + i % 3),
+        'description': '<p>' + 'word ' * (50 + 50 * success + i) + '</p>' * (1 + success),
+        'letter_body': 'Please help',
+        'target_success': int(success),
+    }
+
+
+PETITIONS = [petition(i, i % 4 == 0) for i in range(40)]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    with open(tmp_path / 'processed_petition_data.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(PETITIONS[0]))
+        writer.writeheader()
+        writer.writerows(PETITIONS)
+    yield tmp_path
+    insights._engines.pop(str(tmp_path), None)
+    insights._ingested.pop(str(tmp_path), None)
+
+
+def test_ratios_match_group_statistics():
+    engine = InsightsEngine(n_boot=200)
+    assert engine.ingest(PETITIONS + [dict(PETITIONS[0], target_success=None)]) == len(PETITIONS)
+    summary = engine.summary(with_ci=False)
+    success = np.array([p['target_success'] == 1 for p in PETITIONS])
+    lengths = np.array([len(p['description']) for p in PETITIONS])
+    assert summary['n_petitions'] == 40 and summary['n_successful'] == 10
+    assert summary['baseline_success_rate'] == pytest.approx(0.25)
+    assert summary['ratios']['content_length']['value'] == pytest.approx(
+        np.median(lengths[success]) / np.median(lengths[~success]))
+    tags = np.array([2 + s for s in success])
+    assert summary['ratios']['professional_formatting']['value'] == pytest.approx(
+        tags[success].mean() / tags[~success].mean())
+
+
+def test_incremental_ingest_matches_one_batch():
+    whole = InsightsEngine(n_boot=100)
+    whole.ingest(PETITIONS)
+    split = InsightsEngine(n_boot=100)
+    split.ingest(PETITIONS[:25])
+    before = split.data_hash
+    split.ingest(PETITIONS[25:])
+    assert split.data_hash != before
+    for group in ('medians', 'means'):
+        assert split.summary(with_ci=False)[group] == whole.summary(with_ci=False)[group]
+
+
+def test_bootstrap_interval_brackets_estimate():
+    engine = InsightsEngine(n_boot=300)
+    engine.ingest(PETITIONS)
+    summary = engine.summary()
+    low, high = summary['baseline_ci']
+    assert low <= summary['baseline_success_rate'] <= high
+    low, high = summary['ratios']['content_length']['ci']
+    assert low <= summary['ratios']['content_length']['value'] <= high
+    assert engine.summary() is summary
+
+
+def test_shared_engine_and_warm_only_accessor(data_dir):
+    assert loaded_petition_insights(data_dir) is STATIC_INSIGHTS
+    summary = get_petition_insights(with_ci=False, data_dir=data_dir)
+    assert summary['n_petitions'] == len(PETITIONS)
+    assert loaded_petition_insights(data_dir) == summary
+
+
+def test_ingested_petitions_survive_a_rebuild(data_dir):
+    get_petition_insights(with_ci=False, data_dir=data_dir)
+    new = [petition(100 + i, True) for i in range(3)]
+    # Petitions already in the file are skipped after a rebuild
+    assert ingest_petitions(new + [PETITIONS[0]], data_dir=data_dir) == 4
+    path = data_dir / 'processed_petition_data.csv'
+    path.write_text(path.read_text() + '\n')
+    summary = get_petition_insights(with_ci=False, data_dir=data_dir)
+    assert summary['n_petitions'] == len(PETITIONS) + 3
+
+
+def test_missing_data_falls_back_to_static(tmp_path):
+    assert get_petition_insights(data_dir=tmp_path) is STATIC_INSIGHTS
+
+
+def test_ratio_changes():
+    assert ratio_changes(STATIC_INSIGHTS) == []
+    changed = {'ratios': dict(STATIC_INSIGHTS['ratios'], urgency_keywords={'value': 1.49, 'ci': None})}
+    assert ratio_changes(changed) == [('urgency_keywords', 1.49, 1.26)]
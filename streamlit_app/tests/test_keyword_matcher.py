@@ -0,0 +1,47 @@
+"""Whole-word keyword matching and the n-gram phrase table"""
+
+from utils.feature_engineering import KeywordMatcher, tokenize
+
+
+MATCHER = KeywordMatcher({
+    'urgency': ['now', 'urgent', 'end'],
+    'action': ['sign this petition', 'take action', 'sign'],
+    'empty': [],
+})
+
+
+def test_tokenize_keeps_contractions_and_percent():
+    assert tokenize("Don’t wait: 40% of well-known cases!") == [
+        "don't", 'wait', '40', '%', 'of', 'well-known', 'cases'
+    ]
+
+
+def test_whole_words_only():
+    counts = MATCHER.count('I know you attend, act NOW, it is urgent.')
+    assert counts['urgency'] == 2
+
+
+def test_phrases_and_overlapping_unigrams():
+    # 'sign' matches on its own and inside the phrase
+    counts = MATCHER.count('Please sign this petition and take action. Sign!')
+    assert counts['action'] == 4
+
+
+def test_phrase_needs_every_token():
+    assert MATCHER.count('sign this')['action'] == 1
+    assert MATCHER.count('take a stand')['action'] == 0
+
+
+def test_distinct_counts_each_keyword_once():
+    counts = MATCHER.count('now now now urgent', distinct=True)
+    assert counts['urgency'] == 2
+
+
+def test_missing_text_counts_zero():
+    assert MATCHER.count(None) == {'urgency': 0, 'action': 0, 'empty': 0}
+    assert MATCHER.count(float('nan'))['urgency'] == 0
+
+
+def test_tables_are_frozen():
+    assert isinstance(MATCHER.keywords, tuple)
+    assert all(isinstance(ids, tuple) for ids in MATCHER._unigrams.values())
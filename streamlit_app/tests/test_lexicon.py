@@ -0,0 +1,81 @@
+"""Lexicon parsing, the shared file and hot reload"""
+
+import json
+
+import pytest
+
+from utils import lexicon as lexicon_module
+from utils.lexicon import get_lexicon, parse_lexicon
+
+
+def write_lexicon(path, categories, **extra):
+    path.write_text(json.dumps({'version': '1', 'categories': categories, **extra}))
+
+
+@pytest.fixture
+def reload_every_call(monkeypatch):
+    monkeypatch.setattr(lexicon_module, 'RELOAD_CHECK_INTERVAL', 0.0)
+
+
+def test_shared_file_has_analyzer_categories():
+    lexicon = get_lexicon()
+    for category in ('urgency', 'action', 'power', 'authority'):
+        assert lexicon.keywords(category)
+    assert lexicon.matcher.categories == tuple(lexicon.categories)
+
+
+def test_lexicon_is_immutable():
+    lexicon = parse_lexicon(b'{"categories": {"urgency": ["now"]}}')
+    with pytest.raises(AttributeError):
+        lexicon.version = '2'
+    with pytest.raises(TypeError):
+        lexicon.categories['urgency'] = ('later',)
+
+
+@pytest.mark.parametrize('raw', [b'{}', b'{"categories": {}}', b'{"categories": {"urgency": "now"}}'])
+def test_parse_rejects_invalid_categories(raw):
+    with pytest.raises(ValueError):
+        parse_lexicon(raw)
+
+
+def test_hot_reload_on_change(tmp_path, reload_every_call):
+    path = tmp_path / 'lexicon.json'
+    write_lexicon(path, {'urgency': ['now']})
+    first = get_lexicon(path)
+    assert get_lexicon(path) is first
+
+    write_lexicon(path, {'urgency': ['now', 'immediately']})
+    second = get_lexicon(path)
+    assert second is not first
+    assert second.keywords('urgency') == ('now', 'immediately')
+    assert second.version_hash != first.version_hash
+
+
+def test_broken_file_keeps_last_good_lexicon(tmp_path, reload_every_call):
+    path = tmp_path / 'lexicon.json'
+    write_lexicon(path, {'urgency': ['now']})
+    good = get_lexicon(path)
+
+    path.write_text('{"categories": [')
+    assert get_lexicon(path) is good
+    path.unlink()
+    assert get_lexicon(path) is good
+
+
+def test_first_load_of_missing_file_raises(tmp_path):
+    with pytest.raises(OSError):
+        get_lexicon(tmp_path / 'missing.json')
+
+
+def test_messaging_analyzer_follows_reload(tmp_path, monkeypatch, reload_every_call):
+    from utils.messaging_utils import MessagingAnalyzer
+
+    path = tmp_path / 'lexicon.json'
+    monkeypatch.setattr(lexicon_module, 'LEXICON_PATH', path)
+    write_lexicon(path, {'urgency': ['now'], 'action': [], 'power': [], 'authority': []})
+    analyzer = MessagingAnalyzer()
+    assert analyzer.keyword_matcher.count('act immediately')['urgency'] == 0
+
+    write_lexicon(path, {'urgency': ['now', 'immediately'], 'action': [], 'power': [], 'authority': []})
+    assert analyzer.keyword_matcher.count('act immediately')['urgency'] == 1
+    assert analyzer.urgency_keywords == ['now', 'immediately']
@@ -0,0 +1,68 @@
+"""Locale keyword variants and the saved categorical encoders"""
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from utils.feature_engineering import CategoricalLookup
+from utils.lexicon import parse_lexicon
+from utils.pipeline import StreamlitPetitionPipeline
+
+RAW = b'''{
+    "categories": {"authority": ["minister"], "action": ["organize"]},
+    "statistics_units": ["percent"],
+    "locales": {"en-IN": {"categories": {"authority": ["collector", "minister"]},
+                          "statistics_units": ["lakh"]}}
+}'''
+
+EN_IN_PETITION = {
+    'title': 'Help',
+    'description': 'We ask the district collector and the MLA: 5 lakh people affected',
+    'original_locale': 'en-IN',
+}
+
+
+def test_for_locale_adds_variants_once():
+    lexicon = parse_lexicon(RAW)
+    localized = lexicon.for_locale('en-IN')
+    assert localized.keywords('authority') == ('minister', 'collector')
+    assert localized.keywords('action') == ('organize',)
+    assert localized.statistics_pattern.search('5 lakh')
+    assert not lexicon.statistics_pattern.search('5 lakh')
+    assert localized.version_hash == f'{lexicon.version_hash}:en-IN'
+
+
+def test_for_locale_is_cached_and_falls_back_to_base():
+    lexicon = parse_lexicon(RAW)
+    assert lexicon.for_locale('en-IN') is lexicon.for_locale('en-IN')
+    assert lexicon.for_locale('fr-FR') is lexicon
+    assert lexicon.for_locale(None) is lexicon
+    # A locale lexicon does not stack another locale's variants
+    localized = lexicon.for_locale('en-IN')
+    assert localized.for_locale('en-IN') is localized
+
+
+@pytest.mark.parametrize('locale_variants, authority, statistics', [(False, 0, 0), (True, 3, 1)])
+def test_pipeline_applies_variants_only_when_enabled(locale_variants, authority, statistics):
+    pipeline = StreamlitPetitionPipeline(keyword_matching='token', locale_variants=locale_variants)
+    features = pipeline.extract_features(EN_IN_PETITION)
+    assert features['description_authority_count'] == authority
+    assert features['description_has_statistics'] == statistics
+
+
+def test_categorical_lookup_matches_label_encoder():
+    values = ['en-US', 'en-GB', 'en-IN', 'en-US']
+    encoder = LabelEncoder().fit(values)
+    lookup = CategoricalLookup({'original_locale': encoder})
+    assert lookup.encode('original_locale', 'en-GB') == encoder.transform(['en-GB'])[0]
+    codes = lookup.encode_batch('original_locale', ['en-IN', 'fr-FR', 'en-US'])
+    assert codes.tolist() == [encoder.transform(['en-IN'])[0], CategoricalLookup.UNKNOWN_CODE,
+                              encoder.transform(['en-US'])[0]]
+    assert codes.dtype.kind == 'i'
+
+
+def test_categorical_lookup_uses_string_form():
+    encoder = LabelEncoder().fit(['True', 'False'])
+    lookup = CategoricalLookup({'has_location': encoder})
+    assert lookup.encode('has_location', True) == encoder.transform(['True'])[0]
+    assert np.array_equal(lookup.encode_batch('has_location', [False, True]), encoder.transform(['False', 'True']))
@@ -0,0 +1,131 @@
+"""Scoring metrics: histograms, the text exposition format and the exporters"""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.metrics import (
+    CONTENT_TYPE, PREFIX, Histogram, Metrics, _labels, feature_store_samples, live_models_samples,
+    start_http_exporter, write_metrics
+)
+from utils.model_registry import LiveModels, ModelRegistry
+from utils.timing import StageTimer
+
+
+def samples(text):
+    """Sample lines of a rendered exposition, as {series: value}"""
+    return {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in text.splitlines() if line and not line.startswith('#')
+    }
+
+
+def test_histogram_buckets_are_cumulative_with_inclusive_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    lines = histogram.lines('latency', {'version': 'v1'})
+
+    assert lines == [
+        'latency_bucket{version="v1",le="0.1"} 2',
+        'latency_bucket{version="v1",le="1.0"} 3',
+        'latency_bucket{version="v1",le="+Inf"} 4',
+        'latency_sum{version="v1"} 3.65',
+        'latency_count{version="v1"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    assert _labels({}) == ''
+    assert _labels({'a': 'x"y', 'b': 'back\\slash\nline'}) == r'{a="x\"y",b="back\\slash\nline"}'
+
+
+def test_render_counts_analyses_per_version_and_outcome():
+    metrics = Metrics()
+    timer = StageTimer()
+    timer.scope = 'title'
+    timer.lap('html')
+    metrics.record_analysis({'version': 'v2'}, 0.02, timer)
+    metrics.record_analysis({'version': 'v2'}, 0.2, outcome='fallback')
+    metrics.record_analysis(None, 0.001)
+
+    values = samples(metrics.render())
+
+    assert values[f'{PREFIX}analyses_total{{version="v2",outcome="ok"}}'] == 1
+    assert values[f'{PREFIX}analyses_total{{version="v2",outcome="fallback"}}'] == 1
+    assert values[f'{PREFIX}analyses_total{{version="demo",outcome="ok"}}'] == 1
+    assert values[f'{PREFIX}analysis_duration_seconds_count{{version="v2"}}'] == 2
+    assert values[f'{PREFIX}analysis_duration_seconds_bucket{{version="v2",le="0.025"}}'] == 1
+    assert values[f'{PREFIX}stage_duration_seconds_count{{stage="title.html"}}'] == 1
+    assert f'{PREFIX}stage_duration_seconds_count{{stage="predict"}}' not in values
+    assert values['process_resident_memory_bytes'] > 0
+
+
+def test_collector_samples_of_one_metric_stay_contiguous():
+    metrics = Metrics()
+    metrics.add_collector(lambda: [('shared_total', 'counter', "Shared", {'source': 'a'}, 1)])
+    metrics.add_collector(lambda: [('other', 'gauge', "Other", {}, 2)])
+    metrics.add_collector(lambda: [('shared_total', 'counter', "Shared", {'source': 'b'}, 3)])
+
+    def broken():
+        raise RuntimeError("collector failed")
+
+    metrics.add_collector(broken)
+    lines = metrics.render().splitlines()
+
+    start = lines.index('# HELP shared_total Shared')
+    assert lines[start:start + 4] == [
+        '# HELP shared_total Shared', '# TYPE shared_total counter',
+        'shared_total{source="a"} 1.0', 'shared_total{source="b"} 3.0',
+    ]
+    assert lines.count('# TYPE shared_total counter') == 1
+    assert 'other 2.0' in lines
+
+
+def test_live_models_and_feature_store_collectors(tmp_path, make_bundle):
+    registry = ModelRegistry(tmp_path / 'registry')
+    registry.activate(registry.publish(make_bundle()))
+    live = LiveModels(registry, fallback_dir=None)
+    live.get()
+    metrics = Metrics()
+    metrics.add_collector(live_models_samples(live))
+    metrics.add_collector(feature_store_samples)
+
+    values = samples(metrics.render())
+
+    assert values[f'{PREFIX}artifact_loads_total{{pointer="current"}}'] == 1
+    assert values[f'{PREFIX}artifact_requests_total{{pointer="current"}}'] == 1
+    assert values[f'{PREFIX}model_info{{pointer="current",version="v1",model_file="best_model.pkl"}}'] == 1
+    assert f'{PREFIX}feature_cache_lookups_total{{result="hit"}}' in values
+
+
+def test_textfile_exporter_writes_atomically(tmp_path):
+    metrics = Metrics()
+    metrics.record_analysis(None, 0.01)
+    path = tmp_path / 'logs' / 'metrics.prom'
+
+    write_metrics(metrics, path)
+
+    written = samples(path.read_text())
+    assert written[f'{PREFIX}analyses_total{{version="demo",outcome="ok"}}'] == 1
+    assert set(written) == set(samples(metrics.render()))
+    assert [p.name for p in path.parent.iterdir()] == ['metrics.prom']
+
+
+def test_http_exporter_serves_metrics():
+    metrics = Metrics()
+    metrics.record_analysis({'version': 'v1'}, 0.01)
+    server = start_http_exporter(metrics, port=0)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{base}/metrics?x=1', timeout=5) as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert f'{PREFIX}analyses_total{{version="v1",outcome="ok"}} 1' in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/other', timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,55 @@
+"""Tree-count and depth compaction under an AUC floor"""
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
+
+from utils.model_compaction import compact_model, format_report, prefix_aucs, truncate_trees
+
+
+@pytest.fixture(scope='module')
+def data():
+    X, y = make_classification(n_samples=400, n_features=8, n_informative=4, random_state=0)
+    return X[:300], y[:300], X[300:], y[300:]
+
+
+@pytest.fixture(scope='module')
+def model(data):
+    X_train, y_train, _, _ = data
+    return GradientBoostingClassifier(n_estimators=60, max_depth=4, random_state=0).fit(X_train, y_train)
+
+
+def test_truncation_matches_staged_predictions(data, model):
+    _, _, X_val, y_val = data
+    staged = list(model.staged_predict_proba(X_val))
+    compact = truncate_trees(model, 20)
+    assert np.allclose(compact.predict_proba(X_val), staged[19])
+    assert len(model.estimators_) == 60
+    assert prefix_aucs(model, X_val, y_val)[19] == pytest.approx(roc_auc_score(y_val, staged[19][:, 1]))
+
+
+def test_refit_with_fewer_trees_equals_prefix(data, model):
+    X_train, y_train, X_val, _ = data
+    refit = clone(model).set_params(n_estimators=20).fit(X_train, y_train)
+    assert np.allclose(refit.predict_proba(X_val), truncate_trees(model, 20).predict_proba(X_val))
+
+
+@pytest.mark.parametrize('tolerance', [0.0, 0.02])
+def test_chosen_model_stays_above_floor(data, model, tolerance):
+    X_train, y_train, X_val, y_val = data
+    compact, report = compact_model(model, X_train, y_train, X_val, y_val, tolerance=tolerance, log=lambda _: None)
+    chosen = report['chosen']
+    assert chosen['auc'] >= report['auc_floor'] - 1e-12
+    assert chosen['size_kb'] <= report['full']['size_kb']
+    assert roc_auc_score(y_val, compact.predict_proba(X_val)[:, 1]) == pytest.approx(chosen['auc'])
+    assert 'chosen' in format_report(report)
+
+
+def test_looser_tolerance_compacts_at_least_as_much(data, model):
+    X_train, y_train, X_val, y_val = data
+    _, tight = compact_model(model, X_train, y_train, X_val, y_val, tolerance=0.0, log=lambda _: None)
+    _, loose = compact_model(model, X_train, y_train, X_val, y_val, tolerance=0.05, log=lambda _: None)
+    assert loose['chosen']['size_kb'] <= tight['chosen']['size_kb']
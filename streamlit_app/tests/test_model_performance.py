@@ -0,0 +1,79 @@
+"""Vectorized bootstrap metrics and saved holdout predictions"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+
+from utils import pipeline
+from utils.model_performance import (
+    _weighted_auc, bootstrap_metrics, export_holdout_predictions, load_evaluation_predictions,
+    resample_counts, save_evaluation_predictions
+)
+
+
+@pytest.fixture(scope='module')
+def holdout():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 300)
+    # Rounded so that tied scores are exercised
+    y_score = np.round(np.clip(0.35 * y_true + rng.normal(0.35, 0.2, 300), 0, 1), 1)
+    return y_true, y_score
+
+
+def test_resample_counts_rows_are_resamples():
+    counts = resample_counts(np.random.default_rng(0), 50, 20)
+    assert counts.shape == (20, 50)
+    assert (counts.sum(axis=1) == 50).all()
+
+
+def test_unit_weight_auc_matches_sklearn(holdout):
+    y_true, y_score = holdout
+    auc = _weighted_auc(np.ones((1, len(y_true))), y_true.astype(bool), y_score)
+    assert auc[0] == pytest.approx(roc_auc_score(y_true, y_score))
+
+
+def test_weighted_auc_equals_auc_of_repeated_rows(holdout):
+    y_true, y_score = holdout
+    weights = resample_counts(np.random.default_rng(2), len(y_true), 5).astype(float)
+    aucs = _weighted_auc(weights, y_true.astype(bool), y_score)
+    for row, auc in zip(weights.astype(int), aucs):
+        assert auc == pytest.approx(roc_auc_score(np.repeat(y_true, row), np.repeat(y_score, row)))
+
+
+def test_point_estimates_match_sklearn(holdout):
+    y_true, y_score = holdout
+    y_pred = (y_score >= 0.5).astype(int)
+    results = bootstrap_metrics(y_true, y_score, n_bootstrap=200)
+    assert results['auc']['value'] == pytest.approx(roc_auc_score(y_true, y_score))
+    assert results['accuracy']['value'] == pytest.approx(accuracy_score(y_true, y_pred))
+    assert results['precision']['value'] == pytest.approx(precision_score(y_true, y_pred))
+    assert results['recall']['value'] == pytest.approx(recall_score(y_true, y_pred))
+    for result in results.values():
+        assert result['ci_lower'] <= result['value'] <= result['ci_upper']
+
+
+def test_intervals_are_reproducible_and_chunk_independent(holdout):
+    y_true, y_score = holdout
+    first = bootstrap_metrics(y_true, y_score, n_bootstrap=300, chunk_size=300)
+    second = bootstrap_metrics(y_true, y_score, n_bootstrap=300, chunk_size=300)
+    assert first == second
+    chunked = bootstrap_metrics(y_true, y_score, n_bootstrap=300, chunk_size=70)
+    assert chunked['auc']['ci_lower'] == pytest.approx(first['auc']['ci_lower'])
+
+
+def test_evaluation_predictions_round_trip(tmp_path, holdout):
+    y_true, y_score = holdout
+    path = save_evaluation_predictions(y_true, y_score, y_score >= 0.5, tmp_path / 'eval.npz',
+                                       model='Test', split_seed=42)
+    saved = load_evaluation_predictions(path)
+    assert np.array_equal(saved['y_true'], y_true)
+    assert np.allclose(saved['y_score'], y_score)
+    assert saved['metadata'] == {'model': 'Test', 'split_seed': 42}
+    assert load_evaluation_predictions(tmp_path / 'missing.npz') is None
+
+
+def test_export_refuses_without_nlp_data(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, 'missing_nlp_data', lambda: ('NLTK punkt tokenizer data',))
+    with pytest.raises(RuntimeError, match='punkt'):
+        export_holdout_predictions(tmp_path / 'eval.npz')
+    assert not (tmp_path / 'eval.npz').exists()
@@ -0,0 +1,110 @@
+"""Model registry: publishing, pointer swaps and live reloads"""
+
+import pytest
+
+from utils.data_processing import MODEL_FILE
+from utils.model_registry import (
+    FALLBACK_VERSION, MAX_LIVE_VERSIONS, SHADOW_POINTER_FILE, LiveModels, ModelRegistry, main
+)
+
+
+@pytest.fixture
+def registry(tmp_path, make_bundle):
+    """Registry with v1..v3 published, each bundle's manifest naming its version"""
+    registry = ModelRegistry(tmp_path / 'registry')
+    for i in (1, 2, 3):
+        registry.publish(make_bundle(f'bundle-{i}', manifest={'model': f'bundle-{i}'}))
+    return registry
+
+
+def test_publish_numbers_versions_without_leaving_staging_dirs(registry, tmp_path):
+    assert registry.versions() == ['v1', 'v2', 'v3']
+    assert sorted(path.name for path in registry.versions_dir.iterdir()) == ['v1', 'v2', 'v3']
+    with pytest.raises(FileNotFoundError, match=MODEL_FILE):
+        registry.publish(tmp_path)
+    assert registry.versions() == ['v1', 'v2', 'v3']
+
+
+def test_activate_and_clear_pointers(registry):
+    assert registry.current() is None
+    registry.activate('v2')
+    registry.activate('v3', SHADOW_POINTER_FILE)
+    assert registry.current() == 'v2'
+    assert registry.read_pointer(SHADOW_POINTER_FILE) == 'v3'
+    with pytest.raises(FileNotFoundError, match='v9'):
+        registry.activate('v9')
+    assert registry.current() == 'v2'
+    registry.clear(SHADOW_POINTER_FILE)
+    assert registry.read_pointer(SHADOW_POINTER_FILE) is None
+    assert not any(path.name.startswith('.') for path in registry.root.iterdir())
+
+
+def test_live_models_swaps_on_pointer_change(registry):
+    registry.activate('v1')
+    live = LiveModels(registry, fallback_dir=None)
+
+    first = live.get()
+    assert first['version'] == 'v1' and first['manifest']['model'] == 'bundle-1'
+    assert live.get() is first and live.loads == 1
+
+    registry.activate('v2')
+    second = live.get()
+    assert second['version'] == 'v2' and second['manifest']['model'] == 'bundle-2'
+    # A request still holding the old artifacts keeps a complete, unchanged set
+    assert first['version'] == 'v1' and first['model'] is not second['model']
+
+    # Rolling back to a version still in memory does not reload it
+    registry.activate('v1')
+    assert live.get() is first
+    assert live.loads == 2 and live.requests == 4
+
+
+def test_live_models_keeps_at_most_two_versions(registry):
+    live = LiveModels(registry, fallback_dir=None)
+    for version in ('v1', 'v2', 'v3'):
+        registry.activate(version)
+        assert live.get()['version'] == version
+    assert list(live.live) == ['v2', 'v3']
+    assert len(live.live) == MAX_LIVE_VERSIONS
+
+
+def test_live_models_keeps_serving_when_a_version_fails_to_load(registry):
+    registry.activate('v1')
+    live = LiveModels(registry, fallback_dir=None)
+    served = live.get()
+    (registry.path('v2') / MODEL_FILE).write_bytes(b'not a pickle')
+
+    registry.activate('v2')
+    assert live.get() is served
+    assert live.load_failures == 1
+    # The broken version is not retried until the pointer moves again
+    assert live.get() is served and live.load_failures == 1
+    registry.activate('v3')
+    assert live.get()['version'] == 'v3'
+
+
+def test_live_models_falls_back_without_a_pointer(registry, make_bundle):
+    fallback = make_bundle('models', manifest={'model': 'fallback'})
+    live = LiveModels(registry, fallback_dir=fallback)
+    assert live.get()['version'] == FALLBACK_VERSION
+
+    registry.activate('v3')
+    assert live.get()['version'] == 'v3'
+    registry.clear('CURRENT')
+    assert live.get()['manifest']['model'] == 'fallback'
+
+    assert LiveModels(ModelRegistry(registry.root / 'empty'), fallback_dir=None).get() is None
+
+
+def test_cli_publish_activate_and_list(tmp_path, make_bundle, capsys):
+    root = str(tmp_path / 'registry')
+    bundle = make_bundle(manifest={'model': 'GradientBoostingClassifier'})
+
+    assert main(['--root', root, 'publish', str(bundle), '--activate']) == 0
+    assert main(['--root', root, 'list']) == 0
+    out = capsys.readouterr().out
+    assert 'Published' in out and 'Serving v1' in out
+    assert '* v1' in out and 'GradientBoostingClassifier' in out
+
+    assert main(['--root', root, 'activate', 'v7']) == 1
+    assert capsys.readouterr().err.startswith('error: ')
@@ -0,0 +1,55 @@
+"""Halving search, one-pass cross-validation and the leaderboard"""
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+
+from utils import model_selection
+from utils.model_selection import (
+    EARLY_STOPPING_ROUNDS, format_leaderboard, measure_latency, model_size, run_selection, search_family
+)
+
+
+class SplitData:
+    """The parts of TrainingPipeline that run_selection reads"""
+
+    def __init__(self):
+        self.X, self.y = make_classification(n_samples=300, n_features=6, n_informative=3, random_state=0)
+
+    def model_matrix(self):
+        return self.X
+
+    def load(self):
+        return {'labels': self.y}
+
+    def split(self):
+        return train_test_split(np.arange(len(self.y)), test_size=0.2, random_state=42, stratify=self.y)
+
+
+def test_leaderboard_rows(tmp_path):
+    rows = run_selection(SplitData(), families=('logistic_regression',), out_dir=tmp_path, log=lambda _: None)
+    (row,) = rows
+    assert row['model'] == 'logistic_regression'
+    assert 0.5 < row['cv_auc'] <= 1 and 0.5 < row['holdout_auc'] <= 1
+    assert row['candidates'] >= len(model_selection.candidate_models()['logistic_regression'][1]
+                                    ['logisticregression__C'])
+    assert (tmp_path / 'logistic_regression.pkl').exists()
+    table = format_leaderboard(rows)
+    assert table.splitlines()[1].startswith('logistic_regression')
+
+
+def test_gradient_boosting_stops_early():
+    data = SplitData()
+    model = GradientBoostingClassifier(n_estimators=500, n_iter_no_change=EARLY_STOPPING_ROUNDS,
+                                       validation_fraction=0.1, random_state=0)
+    search = search_family(model, {'max_depth': [2]}, data.X, data.y)
+    assert search.best_estimator_.n_estimators_ < 500
+
+
+def test_cost_measurements():
+    data = SplitData()
+    model = GradientBoostingClassifier(n_estimators=5, random_state=0).fit(data.X, data.y)
+    latency = measure_latency(model, data.X, n_calls=10)
+    assert latency['latency_ms'] > 0 and latency['batch_us_per_row'] > 0
+    assert model_size(model) > model_size(GradientBoostingClassifier())
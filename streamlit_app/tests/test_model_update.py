@@ -0,0 +1,134 @@
+"""Incremental bundle updates: added trees, text model steps and publishing"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from conftest import labelled_petitions
+from utils.data_processing import MANIFEST_FILE, MODEL_FILE, load_model_artifacts
+from utils.model_update import (
+    CARRIED_FILES, MIN_UPDATE_RECORDS, UPDATE_TREE_PARAMS, add_trees, load_update_data, update_bundle,
+    update_text_model
+)
+from utils.text_model import train_text_model
+
+
+def toy_data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = (X[:, 0] + 0.5 * rng.normal(size=n) > 0).astype(int)
+    return X, y
+
+
+def write_petitions(path, petitions):
+    pd.DataFrame(petitions).to_csv(path, index=False)
+    return path
+
+
+def test_add_trees_continues_boosting_without_touching_the_original():
+    X, y = toy_data()
+    model = GradientBoostingClassifier(n_estimators=10, max_depth=2, random_state=0).fit(X, y)
+    first_stage = model.estimators_[0, 0].tree_.value.copy()
+    X_new, y_new = toy_data(seed=1)
+
+    updated = add_trees(model, X_new, y_new, n_trees=5)
+
+    assert len(model.estimators_) == 10
+    assert len(updated.estimators_) == 15
+    # Existing stages are kept as fitted; only the new ones see the new rows
+    np.testing.assert_array_equal(updated.estimators_[0, 0].tree_.value, first_stage)
+    assert updated.estimators_[10, 0].min_samples_leaf == UPDATE_TREE_PARAMS['min_samples_leaf']
+    params = updated.get_params()
+    assert params['warm_start'] is False
+    assert params['min_samples_leaf'] == model.get_params()['min_samples_leaf']
+
+
+def test_add_trees_grows_a_forest():
+    X, y = toy_data()
+    model = RandomForestClassifier(n_estimators=8, max_depth=3, random_state=0).fit(X, y)
+
+    updated = add_trees(model, *toy_data(seed=1), n_trees=4, tree_params={})
+
+    assert len(updated.estimators_) == 12
+    assert len(model.estimators_) == 8
+    for old, kept in zip(model.estimators_, updated.estimators_):
+        np.testing.assert_array_equal(kept.tree_.value, old.tree_.value)
+
+
+def test_add_trees_rejects_models_without_warm_start():
+    X, y = toy_data()
+    with pytest.raises(TypeError, match='LogisticRegression'):
+        add_trees(LogisticRegression().fit(X, y), X, y)
+
+
+def test_update_text_model_steps_a_copy(tmp_path):
+    petitions = labelled_petitions(60)
+    text_model = train_text_model(write_petitions(tmp_path / 'archive.csv', petitions), epochs=2,
+                                  log=lambda _: None)
+    coef = text_model['classifier'].coef_.copy()
+    new = labelled_petitions(30, seed=1)
+
+    updated = update_text_model(text_model, new, np.array([p['target_success'] for p in new]), epochs=2)
+
+    assert updated['n_trained'] == text_model['n_trained'] + 30
+    np.testing.assert_array_equal(text_model['classifier'].coef_, coef)
+    assert not np.array_equal(updated['classifier'].coef_, coef)
+
+
+def test_load_update_data_checks_columns_size_and_classes(tmp_path):
+    petitions = labelled_petitions(MIN_UPDATE_RECORDS + 5)
+
+    data = load_update_data(write_petitions(tmp_path / 'ok.csv', petitions))
+    assert len(data['records']) == len(data['labels']) == MIN_UPDATE_RECORDS + 5
+    assert 'target_success' not in data['records'][0]
+
+    no_title = [{k: v for k, v in p.items() if k != 'title'} for p in petitions]
+    with pytest.raises(ValueError, match='missing required columns: title'):
+        load_update_data(write_petitions(tmp_path / 'no_title.csv', no_title))
+    with pytest.raises(ValueError, match='at least'):
+        load_update_data(write_petitions(tmp_path / 'small.csv', petitions[:MIN_UPDATE_RECORDS - 1]))
+    one_class = [dict(p, target_success=1) for p in petitions]
+    with pytest.raises(ValueError, match='one outcome class'):
+        load_update_data(write_petitions(tmp_path / 'one_class.csv', one_class))
+
+
+def test_update_bundle_publishes_the_next_version(tmp_path, make_bundle):
+    metrics = {'auc': {'value': 0.8}}
+    models_dir = make_bundle(manifest={'metrics': metrics, 'model_params': {'n_estimators': 20}})
+    input_path = write_petitions(tmp_path / 'week.csv', labelled_petitions(60, seed=2))
+    out_dir = tmp_path / 'bundle-v2'
+
+    report = update_bundle(models_dir, input_path, out_dir=out_dir, new_trees=5, force=True,
+                           feature_store=None, log=lambda _: None)
+
+    assert report['accepted'] and report['version'] == 2
+    assert report['out_dir'] == str(out_dir)
+    assert report['n_update'] + report['n_holdout'] == 60
+    for name in CARRIED_FILES:
+        assert (out_dir / name).read_bytes() == (models_dir / name).read_bytes()
+    manifest = json.loads((out_dir / MANIFEST_FILE).read_text())
+    assert manifest['version'] == 2 and manifest['parent']['version'] == 1
+    assert manifest['model_params']['n_estimators'] == 25
+    # The training holdout's metrics are kept; the update's go with the update
+    assert manifest['metrics'] == metrics
+    update = manifest['updates'][-1]
+    assert update['holdout_auc_after'] == report['auc_after']
+    assert 'auc' in update['holdout_metrics']
+    artifacts = load_model_artifacts(out_dir, data_dir=None)
+    assert artifacts['model_file'] == MODEL_FILE
+    assert len(artifacts['model'].estimators_) == 25
+
+
+def test_update_bundle_rejects_a_worse_model(tmp_path, make_bundle):
+    models_dir = make_bundle()
+    input_path = write_petitions(tmp_path / 'week.csv', labelled_petitions(60, seed=2))
+
+    report = update_bundle(models_dir, input_path, out_dir=tmp_path / 'out', new_trees=5,
+                           tolerance=-1.0, feature_store=None, log=lambda _: None)
+
+    assert not report['accepted'] and report['out_dir'] is None
+    assert not (tmp_path / 'out').exists()
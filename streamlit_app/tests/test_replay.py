@@ -0,0 +1,108 @@
+"""Model replay: shared extraction, feature store reuse and the score report"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+
+from conftest import labelled_petitions
+from utils import replay as replay_module
+from utils.data_processing import load_model_artifacts
+from utils.pipeline import StreamlitPetitionPipeline
+from utils.replay import extract_matrix, load_petitions, main, replay, replay_summary
+
+
+@pytest.fixture
+def old(make_bundle):
+    return load_model_artifacts(make_bundle('old'), data_dir=None)
+
+
+@pytest.fixture
+def petitions():
+    petitions = labelled_petitions(12, seed=3)
+    # Same text as the first petition, different categorical field
+    petitions.append(dict(petitions[0], has_location=not petitions[0]['has_location'], petition_id='copy'))
+    return petitions
+
+
+def test_load_petitions_keeps_extraction_fields(tmp_path):
+    path = tmp_path / 'requests.csv'
+    pd.DataFrame(labelled_petitions(3)).assign(extra='x').to_csv(path, index=False)
+
+    records = load_petitions(path)
+
+    assert len(records) == 3
+    assert records[0]['source'] == 'requests.csv'
+    assert 'extra' not in records[0] and 'target_success' in records[0]
+    pd.DataFrame({'title': ['t']}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match='description'):
+        load_petitions(path)
+
+
+def test_extract_matrix_matches_the_pipeline(old, petitions):
+    expected = StreamlitPetitionPipeline.from_artifacts(old).extract_feature_matrix(petitions)
+    matrix = extract_matrix(old, petitions, store_path=None)
+    np.testing.assert_array_equal(matrix, expected)
+    # The duplicate text was extracted once but keeps its own categorical code
+    position = old['schema'].index['has_location_encoded']
+    assert matrix[-1, position] != matrix[0, position]
+
+
+def test_extract_matrix_reuses_stored_rows(old, petitions, tmp_path, monkeypatch):
+    store_path = tmp_path / 'features.sqlite'
+    first = extract_matrix(old, petitions, store_path=store_path)
+
+    def fail(self, petitions):
+        raise AssertionError("stored rows were extracted again")
+
+    monkeypatch.setattr(StreamlitPetitionPipeline, 'extract_feature_matrix', fail)
+    np.testing.assert_array_equal(extract_matrix(old, petitions, store_path=store_path), first)
+
+
+def test_parallel_extraction_matches_serial(old, petitions, monkeypatch):
+    monkeypatch.setattr(replay_module, 'CHUNK_SIZE', 4)
+    np.testing.assert_array_equal(
+        extract_matrix(old, petitions, workers=2, store_path=None),
+        extract_matrix(old, petitions, workers=1, store_path=None),
+    )
+
+
+def test_replay_of_the_same_bundle_moves_nothing(old, petitions):
+    report = replay(old, old, petitions, store_path=None)
+    summary = replay_summary(report)
+
+    assert len(report) == len(petitions)
+    assert (report['shift'] == 0).all()
+    assert summary['prediction_flips'] == summary['grade_changes'] == 0
+    assert summary['old_auc'] == summary['new_auc']
+    assert summary['labelled'] == len(petitions)
+
+
+def test_replay_scores_each_bundle_on_its_own_rows(old, petitions, make_bundle):
+    model = clone(old['model']).set_params(n_estimators=2).fit(
+        np.random.default_rng(0).normal(size=(40, 4)), np.arange(40) % 2
+    )
+    new = load_model_artifacts(make_bundle('new', model=model, manifest={'keyword_matching': 'token'}),
+                               data_dir=None)
+
+    report = replay(old, new, petitions, store_path=None)
+
+    matrix = StreamlitPetitionPipeline.from_artifacts(new).extract_feature_matrix(petitions)
+    expected = model.predict_proba(matrix[:, new['model_columns']])[:, 1]
+    np.testing.assert_allclose(report['new_probability'], expected)
+    np.testing.assert_allclose(report['shift'], report['new_probability'] - report['old_probability'])
+
+
+def test_cli_writes_the_report(make_bundle, tmp_path, capsys):
+    old_dir = make_bundle('cli-old')
+    input_path = tmp_path / 'requests.csv'
+    pd.DataFrame(labelled_petitions(6)).to_csv(input_path, index=False)
+    args = ['--old', str(old_dir), '--new', str(old_dir), '--input', str(input_path), '--no-reference',
+            '--workers', '1', '--store', 'none', '--out', str(tmp_path / 'out')]
+
+    assert main(args) == 0
+    assert 'Replayed 6 petitions' in capsys.readouterr().out
+    assert len(pd.read_csv(tmp_path / 'out' / 'replay.csv')) == 6
+
+    assert main(args[:4] + ['--input', str(tmp_path / 'missing.csv'), '--no-reference']) == 1
+    assert capsys.readouterr().err.startswith('error: ')
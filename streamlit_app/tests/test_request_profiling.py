@@ -0,0 +1,88 @@
+"""Request profiling: the token check, profiled calls and the report"""
+
+import pstats
+
+import pytest
+
+from utils import request_profiling
+from utils.pipeline import StreamlitPetitionPipeline
+from utils.request_profiling import (
+    TREE_ROOT, call_tree, main, profile_call, profile_report, profiling_allowed, stats_bytes
+)
+
+PETITION = {
+    'title': 'Save the riverside park',
+    'description': '<p>The council plans to sell the park. Sign now to stop the sale.</p>',
+    'original_locale': 'en-US',
+}
+
+
+def test_profiling_needs_a_configured_token(monkeypatch):
+    monkeypatch.setattr(request_profiling, 'PROFILE_TOKEN', '')
+    assert not profiling_allowed('')
+    assert not profiling_allowed(None)
+
+    monkeypatch.setattr(request_profiling, 'PROFILE_TOKEN', 's3cret')
+    assert profiling_allowed('s3cret')
+    assert not profiling_allowed('s3cre')
+    assert not profiling_allowed(None)
+    # Non-ASCII input is refused, not raised on
+    assert not profiling_allowed('s3crét')
+
+
+def test_profile_call_returns_the_result_and_stats():
+    def work(n, scale=1):
+        return sum(range(n)) * scale
+
+    result, stats = profile_call(work, 10, scale=2)
+
+    assert result == 90
+    assert any(func[2] == 'work' for func in stats.stats)
+
+
+@pytest.fixture(scope='module')
+def extraction_stats():
+    pipeline = StreamlitPetitionPipeline()
+    pipeline.extract_features(PETITION)
+    return profile_call(pipeline.extract_features, PETITION)[1]
+
+
+def test_call_tree_starts_at_extract_features(extraction_stats):
+    lines = call_tree(extraction_stats, min_share=0)
+
+    assert lines[0].split()[2:4] == ['100.0%', '1'] and TREE_ROOT in lines[0]
+    assert any('calculate_readability' in line for line in lines)
+    assert len(call_tree(extraction_stats, depth=1, min_share=0)) < len(lines)
+    assert len(call_tree(extraction_stats, min_share=0.5)) < len(lines)
+
+    _, other = profile_call(sum, [1, 2])
+    assert call_tree(other) == [f"{TREE_ROOT} was not called"]
+
+
+def test_report_and_prof_file(extraction_stats, tmp_path):
+    before = set(extraction_stats.stats)
+    report = profile_report(extraction_stats, top=5)
+
+    assert report.startswith("Call tree under StreamlitPetitionPipeline.extract_features")
+    assert "Top 5 functions by cumulative and by own time" in report
+    # The caller's stats keep their full paths
+    assert set(extraction_stats.stats) == before
+
+    path = tmp_path / 'profile.prof'
+    path.write_bytes(stats_bytes(extraction_stats))
+    assert set(pstats.Stats(str(path)).stats) == before
+
+
+def test_cli_profiles_one_analysis(make_bundle, tmp_path, capsys):
+    out_dir = tmp_path / 'profile'
+    args = ['--title', PETITION['title'], '--description', PETITION['description'],
+            '--models-dir', str(make_bundle()), '--top', '5', '--out', str(out_dir)]
+
+    assert main(args) == 0
+
+    out = capsys.readouterr().out
+    assert out.startswith('Probability ')
+    assert (out_dir / 'profile.txt').read_text().startswith('Call tree')
+    assert pstats.Stats(str(out_dir / 'profile.prof')).total_calls > 0
+    with pytest.raises(SystemExit):
+        main(['--models-dir', str(tmp_path)])
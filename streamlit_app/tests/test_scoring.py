@@ -0,0 +1,71 @@
+"""Streamlit-free scoring: imports, grades and the prediction path"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from utils.feature_engineering import FeatureSchema
+from utils.pipeline import StreamlitPetitionPipeline
+from utils.scoring import GRADES, grade_for, predict_success, score_matrix
+
+APP_DIR = Path(__file__).resolve().parent.parent
+FEATURES = ['description_clean_length', 'title_word_count', 'description_html_tags']
+PETITIONS = [
+    {'title': 'Stop the closure of our library now', 'description': '<p>' + 'Long text. ' * 80 + '</p>'},
+    {'title': 'Fix it', 'description': 'Short'},
+]
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return StreamlitPetitionPipeline(keyword_matching='token', schema=FeatureSchema.for_model(FEATURES))
+
+
+@pytest.fixture(scope='module')
+def artifacts(pipeline):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, len(FEATURES))) * [500, 5, 3] + [800, 8, 4]
+    model = LogisticRegression().fit(X, (X[:, 0] > 800).astype(int))
+    return {
+        'model': model,
+        'features': FEATURES,
+        'schema': pipeline.schema,
+        'model_columns': pipeline.schema.positions(FEATURES),
+        'text_model': None,
+    }
+
+
+def test_import_does_not_load_streamlit_or_pandas():
+    code = ("import sys, utils.scoring, utils.pipeline, utils.data_processing; "
+            "print(','.join(m for m in ('streamlit', 'pandas', 'sklearn') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+@pytest.mark.parametrize('probability, grade', [(0.95, GRADES[0][1]), (0.8, GRADES[0][1]), (0.65, GRADES[2][1]),
+                                                (0.1, GRADES[-1][1]), (-0.1, GRADES[-1][1])])
+def test_grade_for(probability, grade):
+    assert grade_for(probability)[0] == grade
+
+
+def test_predict_success_matches_batch_scoring(pipeline, artifacts):
+    X = pipeline.extract_feature_matrix(PETITIONS)[:, artifacts['model_columns']]
+    probabilities, predictions = score_matrix(artifacts, X, PETITIONS)
+    for petition, expected, expected_prediction in zip(PETITIONS, probabilities, predictions):
+        probability, prediction, features = predict_success(petition, artifacts, pipeline)
+        assert probability == pytest.approx(expected)
+        assert prediction == expected_prediction
+        assert features['title_word_count'] == len(petition['title'].split())
+
+
+def test_model_error_falls_back_to_demo_score(pipeline, artifacts):
+    errors = []
+    broken = dict(artifacts, model_columns=np.array([0, 1]))
+    probability, prediction, _ = predict_success(PETITIONS[0], broken, pipeline, on_error=errors.append)
+    assert len(errors) == 1
+    assert 0 <= probability <= 0.95
+    assert prediction == int(probability >= 0.5)
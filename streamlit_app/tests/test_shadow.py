@@ -0,0 +1,104 @@
+"""Shadow scoring: feature row reuse and the background score log"""
+
+import csv
+
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from conftest import labelled_petitions
+from utils.data_processing import load_model_artifacts
+from utils.feature_engineering import CategoricalLookup
+from utils.model_registry import SHADOW_POINTER_FILE, LiveModels, ModelRegistry
+from utils.pipeline import StreamlitPetitionPipeline
+from utils.scoring import predict_success
+from utils.shadow import LOG_FIELDS, ShadowScorer, candidate_columns, shadow_report
+
+
+@pytest.fixture
+def production(make_bundle):
+    return load_model_artifacts(make_bundle('production'), data_dir=None)
+
+
+def test_candidate_columns_reuse_a_compatible_row(production):
+    schema = production['schema']
+    assert list(candidate_columns(production, production, schema)) == list(production['model_columns'])
+
+    fewer = dict(production, features=production['features'][:2])
+    assert list(candidate_columns(production, fewer, schema)) == list(production['model_columns'][:2])
+
+
+def test_candidate_columns_refuse_rows_extracted_differently(production):
+    schema = production['schema']
+    assert candidate_columns(production, dict(production, keyword_matching='token'), schema) is None
+    assert candidate_columns(production, dict(production, locale_variants=True), schema) is None
+    assert candidate_columns(production, dict(production, features=['not_a_feature']), schema) is None
+
+    readability = dict(production, features=['description_flesch_ease'])
+    assert candidate_columns(production, readability, schema) is not None
+    skipping = dict(production, disabled_families=('description.readability',))
+    assert candidate_columns(skipping, readability, schema) is None
+
+    encoders = {
+        'original_locale': LabelEncoder().fit(['en-GB', 'en-US', 'fr-FR']),
+        'has_location': LabelEncoder().fit(['False', 'True']),
+    }
+    recoded = dict(production, categorical_lookup=CategoricalLookup(encoders))
+    assert candidate_columns(production, recoded, schema) is None
+
+
+def shadow_setup(tmp_path, make_bundle, candidate_manifest=None):
+    registry = ModelRegistry(tmp_path / 'registry')
+    registry.activate(registry.publish(make_bundle('v1')))
+    registry.activate(registry.publish(make_bundle('v2', manifest=candidate_manifest)), SHADOW_POINTER_FILE)
+    production = LiveModels(registry, fallback_dir=None).get()
+    scorer = ShadowScorer(LiveModels(registry, fallback_dir=None, pointer=SHADOW_POINTER_FILE),
+                          path=tmp_path / 'shadow.csv')
+    return production, scorer
+
+
+def test_shadow_scores_are_logged_next_to_production(tmp_path, make_bundle):
+    production, scorer = shadow_setup(tmp_path, make_bundle)
+    pipeline = StreamlitPetitionPipeline.from_artifacts(production)
+    petitions = labelled_petitions(5)
+
+    served = [predict_success(petition, production, pipeline, shadow=scorer)[0] for petition in petitions]
+    scorer.flush()
+
+    assert scorer.submitted == scorer.scored == 5 and scorer.dropped == 0
+    with open(tmp_path / 'shadow.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == LOG_FIELDS
+    assert [(row['production'], row['candidate']) for row in rows] == [('v1', 'v2')] * 5
+    # The same model on the same rows: identical scores, no disagreement
+    assert sorted(float(row['candidate_probability']) for row in rows) == pytest.approx(sorted(served), abs=1e-6)
+    assert all(row['disagree'] == '0' for row in rows)
+
+    report = shadow_report(tmp_path / 'shadow.csv')
+    assert report.loc[0, 'requests'] == 5
+    assert report.loc[0, 'disagreement_rate'] == 0
+
+
+def test_incompatible_candidate_is_not_scored(tmp_path, make_bundle):
+    production, scorer = shadow_setup(tmp_path, make_bundle, {'keyword_matching': 'token'})
+    pipeline = StreamlitPetitionPipeline.from_artifacts(production)
+
+    predict_success(labelled_petitions(1)[0], production, pipeline, shadow=scorer)
+    scorer.flush()
+
+    assert scorer.submitted == 1 and scorer.scored == 0
+    assert shadow_report(tmp_path / 'shadow.csv') is None
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, production):
+    class Blocked:
+        def get(self):
+            raise AssertionError("worker not started")
+
+    scorer = ShadowScorer(Blocked(), path=tmp_path / 'shadow.csv', queue_size=1)
+    # A started worker would drain the queue; hold it back to fill it
+    scorer._worker = object()
+    features = StreamlitPetitionPipeline.from_artifacts(production).extract_features(labelled_petitions(1)[0])
+
+    assert scorer.submit(features, {}, production, 0.5, 1, 1.0)
+    assert not scorer.submit(features, {}, production, 0.5, 1, 1.0)
+    assert (scorer.submitted, scorer.dropped) == (1, 1)
@@ -0,0 +1,61 @@
+"""Startup profiler parsing and the deferred page imports"""
+
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils.profiling import discover_pages, format_report, parse_importtime
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       150 |        150 |   _io
+import time:      2000 |       2500 |     pandas.core
+import time:      1000 |       3500 |   pandas
+import time:       500 |        500 | utils.lexicon
+not an importtime line
+"""
+
+
+def test_parse_importtime_sums_self_time_per_package():
+    profile = parse_importtime(IMPORTTIME)
+    assert profile['import_ms'] == pytest.approx(3.65)
+    assert profile['packages'] == pytest.approx({'_io': 0.15, 'pandas': 3.0, 'utils': 0.5})
+
+
+def test_format_report_lists_pages_and_top_imports():
+    profiles = {'Home': {'import_ms': 3.65, 'first_paint_ms': 500.0, 'total_ms': None,
+                         'packages': {'pandas': 3.0, 'utils': 0.5}}}
+    report = format_report(profiles, top=1)
+    assert 'Home' in report.splitlines()[1]
+    assert 'pandas' in report and 'utils ' not in report
+
+
+def test_discover_pages():
+    pages = discover_pages()
+    assert pages['Home'] == APP_DIR / 'Home.py'
+    assert 'petition_analyzer' in pages and 'Model_Guide' in pages
+
+
+def test_utils_defer_heavy_imports():
+    code = ("import sys, utils.messaging_utils, utils.messaging_utils2, utils.visualization, utils.insights; "
+            "print(','.join(m for m in ('streamlit', 'plotly', 'pandas') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+@pytest.mark.parametrize('page', ['Home.py', 'pages/Methodology.py', 'pages/Model_Guide.py',
+                                  'pages/Roadmap.py', 'pages/messaging_insights.py'])
+def test_pages_import_plotly_inside_functions(page):
+    tree = ast.parse((APP_DIR / page).read_text())
+    top_level = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            top_level.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            top_level.add(node.module.split('.')[0])
+    assert 'plotly' not in top_level
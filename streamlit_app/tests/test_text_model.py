@@ -0,0 +1,90 @@
+"""Out-of-core text model: chunked input, training and blending"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+from utils.scoring import score_features, score_matrix
+from utils.text_model import (
+    blend_curve, iter_chunks, petition_text, text_probabilities, text_probability, train_text_model
+)
+
+WORDS = {1: 'victory justice reform change', 0: 'weather lunch random filler'}
+
+
+def make_frame(n=60):
+    labels = [i % 2 for i in range(n)]
+    return pd.DataFrame({
+        'title': [f'Petition {i}' for i in range(n)],
+        'description': [f'<p>{WORDS[label]} {i}</p>' for i, label in enumerate(labels)],
+        'target_success': labels,
+    })
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    path = tmp_path_factory.mktemp('text') / 'archive.csv'
+    frame = make_frame()
+    frame.loc[len(frame)] = ['Unlabelled', 'no outcome yet', None]
+    frame.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope='module')
+def text_model(corpus):
+    return train_text_model(corpus, epochs=3, chunk_size=16, log=lambda _: None)
+
+
+def test_petition_text_strips_tags_and_skips_missing():
+    assert petition_text({'title': 'A', 'description': '<b>B</b>', 'letter_body': None}) == 'A  B '
+
+
+def test_csv_chunks_skip_unlabelled_rows(corpus):
+    chunks = list(iter_chunks(corpus, chunk_size=16))
+    assert [len(texts) for texts, _ in chunks] == [16, 16, 16, 12]
+    assert sum(labels.sum() for _, labels in chunks) == 30
+
+
+def test_xlsx_streams_the_same_rows(tmp_path):
+    path = tmp_path / 'archive.xlsx'
+    make_frame(20).to_excel(path, index=False)
+    texts = [text for chunk, _ in iter_chunks(path, chunk_size=8) for text in chunk]
+    assert texts == [petition_text(row) for row in make_frame(20).to_dict('records')]
+
+
+def test_training_excludes_given_texts(corpus):
+    excluded = [petition_text(row) for row in make_frame().to_dict('records')[:10]]
+    model = train_text_model(corpus, epochs=1, exclude=excluded, log=lambda _: None)
+    assert (model['n_trained'], model['n_excluded']) == (50, 10)
+
+
+def test_single_and_batch_probabilities_agree(text_model):
+    petitions = make_frame(6).to_dict('records')
+    batch = text_probabilities(text_model, petitions)
+    assert np.allclose([text_probability(text_model, p) for p in petitions], batch)
+    assert roc_auc_score([p['target_success'] for p in petitions], batch) == 1.0
+
+
+def test_blend_curve_endpoints(text_model):
+    petitions = make_frame(20).to_dict('records')
+    y_true = np.array([p['target_success'] for p in petitions])
+    tree_scores = np.linspace(0, 1, 20)
+    curve = blend_curve(text_model, petitions, y_true, tree_scores)
+    assert curve[0] == {'weight': 0.0, 'auc': pytest.approx(roc_auc_score(y_true, tree_scores))}
+    assert curve[-1]['auc'] == pytest.approx(roc_auc_score(y_true, text_probabilities(text_model, petitions)))
+
+
+def test_scoring_blends_text_model(text_model):
+    petitions = make_frame(8).to_dict('records')
+    X = np.arange(16, dtype=float).reshape(8, 2)
+    tree = LogisticRegression().fit(X, [p['target_success'] for p in petitions])
+    artifacts = {'model': tree, 'text_model': dict(text_model, blend_weight=0.4)}
+    expected = 0.6 * tree.predict_proba(X)[:, 1] + 0.4 * text_probabilities(text_model, petitions)
+    probabilities, predictions = score_matrix(artifacts, X, petitions)
+    assert np.allclose(probabilities, expected)
+    assert predictions.tolist() == (expected >= 0.5).astype(int).tolist()
+    probability, prediction = score_features(artifacts, X[:1], petitions[0])
+    assert probability == pytest.approx(expected[0])
+    assert prediction == int(expected[0] >= 0.5)
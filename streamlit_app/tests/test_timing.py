@@ -0,0 +1,125 @@
+"""Stage timing: timer laps, pipeline instrumentation and rolling histograms"""
+
+import json
+
+import pytest
+
+from utils import timing
+from utils.pipeline import StreamlitPetitionPipeline
+from utils.timing import BUCKET_BOUNDS_MS, NULL_TIMER, RollingHistogram, StageStats, StageTimer, stage_name
+
+PETITION = {
+    'title': 'Hi',
+    'description': '<p>Please act now to repair the footbridge before winter.</p><ul><li>Safety</li></ul>',
+    'original_locale': 'en-US',
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(timing.time, 'perf_counter', clock)
+    return clock
+
+
+def test_laps_accumulate_per_scope_and_skip_leaves_time_uncharged(clock):
+    timer = StageTimer()
+    clock.now += 0.002
+    timer.lap('predict')
+    timer.scope = 'title'
+    clock.now += 0.001
+    timer.lap('html')
+    clock.now += 0.003
+    timer.lap('html')
+    clock.now += 5
+    timer.skip()
+    timer.scope = None
+    clock.now += 0.004
+    timer.lap('predict')
+
+    assert timer.laps == {(None, 'predict'): pytest.approx(0.006), ('title', 'html'): pytest.approx(0.004)}
+    assert timer.total == pytest.approx(5.01)
+    record = timer.record()
+    assert record['stages'] == {'predict': 6.0, 'title.html': 4.0}
+    assert record['total_ms'] == 5010.0
+    assert stage_name(('description', 'sentiment')) == 'description.sentiment'
+
+
+def test_null_timer_accepts_the_same_calls():
+    NULL_TIMER.scope = 'title'
+    NULL_TIMER.lap('html')
+    NULL_TIMER.skip()
+    NULL_TIMER.scope = None
+
+
+def test_extraction_laps_cover_every_stage_and_the_whole_time():
+    pipeline = StreamlitPetitionPipeline(disabled_families=('description.sentiment',))
+    timer = StageTimer()
+
+    pipeline.extract_features(PETITION, timer=timer)
+
+    stages = set(timer.laps)
+    for column in ('title', 'description'):
+        assert {(column, 'html'), (column, 'keywords'), (column, 'readability'), (column, 'tokens')} <= stages
+    assert ('title', 'sentiment') in stages
+    assert ('description', 'sentiment') not in stages
+    assert {(None, 'categorical'), (None, 'composites')} <= stages
+    assert not any(scope == 'letter_body' for scope, _ in stages)
+    assert sum(timer.laps.values()) == pytest.approx(timer.total)
+
+
+def test_short_text_still_laps_readability_and_tokens(clock):
+    pipeline = StreamlitPetitionPipeline()
+    timer = StageTimer()
+    timer.scope = 'title'
+
+    clock.now += 0.001
+    assert pipeline.calculate_readability('Hi', timer=timer)['flesch_ease'] == 0
+
+    # The short-text check is charged to readability, not the caller's next stage
+    assert timer.laps == {('title', 'readability'): pytest.approx(0.001), ('title', 'tokens'): 0.0}
+
+
+def test_rolling_histogram_evicts_the_oldest_observation():
+    histogram = RollingHistogram(window=3)
+    for ms in (0.005, 1.0, 1.0, 10 ** 6):
+        histogram.add(ms)
+
+    assert histogram.counts.sum() == 3
+    assert histogram.counts[0] == 0
+    assert histogram.counts[-1] == 1
+    assert histogram.counts[BUCKET_BOUNDS_MS.index(1.28)] == 2
+    assert histogram.total_count == 4
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.mean() == pytest.approx((2 + 10 ** 6) / 3)
+    assert RollingHistogram().quantile(0.95) == RollingHistogram().mean() == 0.0
+
+
+def test_stage_stats_summary_and_export(clock):
+    stats = StageStats(window=10)
+    for ms in (1, 3):
+        timer = StageTimer()
+        timer.scope = 'description'
+        clock.now += ms / 1000
+        timer.lap('sentiment')
+        timer.scope = None
+        clock.now += 0.0005
+        timer.lap('predict')
+        stats.add(timer, log=False)
+
+    summary = stats.summary()
+    assert [row['stage'] for row in summary] == ['total', 'description.sentiment', 'predict']
+    assert summary[0]['analyses'] == 2 and summary[0]['mean_ms'] == pytest.approx(2.5)
+    assert summary[1]['p50_ms'] == pytest.approx(2.0)
+    exported = json.loads(json.dumps(stats.export()))
+    assert exported['stages']['predict']['total_count'] == 2
+    assert sum(exported['total']['counts']) == 2
+    assert len(exported['total']['counts']) == len(exported['bucket_bounds_ms']) + 1
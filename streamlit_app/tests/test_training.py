@@ -0,0 +1,111 @@
+"""Staged training pipeline: keys, cache, validation and stage reuse"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import training
+from utils.data_processing import load_manifest
+from utils.training import StageCache, TrainingPipeline, stage_key, validate_dataset
+
+FEATURES = ['description_clean_length', 'description_html_tags', 'title_word_count', 'original_locale_encoded']
+
+
+def make_frame(n=training.MIN_RECORDS):
+    rng = np.random.default_rng(0)
+    success = rng.integers(0, 2, n)
+    return pd.DataFrame({
+        'petition_id': np.arange(n),
+        'title': [f'Petition {i} ' + 'save ' * (1 + s * 3) for i, s in enumerate(success)],
+        'description': ['<p>' + 'text ' * (20 + 60 * s + i % 7) + '</p>' for i, s in enumerate(success)],
+        'original_locale': rng.choice(['en-US', 'en-GB'], n),
+        'target_success': success,
+    })
+
+
+@pytest.fixture
+def pipeline_factory(tmp_path, monkeypatch):
+    # The staged mechanics do not depend on the readability features
+    monkeypatch.setattr(training, 'missing_nlp_data', lambda: ())
+    make_frame().to_csv(tmp_path / 'input.csv', index=False)
+    with open(tmp_path / 'features.pkl', 'wb') as f:
+        pickle.dump(FEATURES, f)
+    logs = []
+
+    def make(**kwargs):
+        settings = dict(
+            input_path=tmp_path / 'input.csv', features_path=tmp_path / 'features.pkl',
+            model_params={'n_estimators': 10, 'max_depth': 2}, n_bootstrap=50,
+            cache=StageCache(tmp_path / 'cache'), feature_store=None, log=logs.append
+        )
+        return TrainingPipeline(**dict(settings, **kwargs))
+    make.logs = logs
+    return make
+
+
+def test_stage_key_depends_on_every_input():
+    key = stage_key('train', 'features-key', {'max_depth': 6})
+    assert key == stage_key('train', 'features-key', {'max_depth': 6})
+    assert key != stage_key('train', 'features-key', {'max_depth': 4})
+    assert key != stage_key('evaluate', 'features-key', {'max_depth': 6})
+
+
+def test_stage_cache_round_trip(tmp_path):
+    cache = StageCache(tmp_path)
+    assert cache.get('load', 'abc') is None
+    cache.put('load', 'abc', {'labels': [1, 0]})
+    assert cache.get('load', 'abc') == {'labels': [1, 0]}
+    cache.path('load', 'bad').write_bytes(b'not a pickle')
+    assert cache.get('load', 'bad') is None
+    disabled = StageCache(tmp_path, enabled=False)
+    assert disabled.get('load', 'abc') is None
+
+
+def test_validate_dataset():
+    assert validate_dataset(make_frame()) == []
+    issues = validate_dataset(make_frame(10).assign(target_success=[0, 1, 2] + [0] * 7))
+    assert any('at least' in issue for issue in issues)
+    assert any('binary' in issue for issue in issues)
+    assert any('Missing required columns' in issue for issue in validate_dataset(make_frame().drop(columns='title')))
+
+
+def test_features_refuse_without_nlp_data(pipeline_factory, monkeypatch):
+    monkeypatch.setattr(training, 'missing_nlp_data', lambda: ('NLTK punkt tokenizer data',))
+    with pytest.raises(RuntimeError, match='punkt'):
+        pipeline_factory().features()
+
+
+def test_stages_are_reused_until_an_input_changes(pipeline_factory):
+    first = pipeline_factory()
+    evaluation = first.evaluate()
+    assert set(evaluation['metrics']) == set(training.EVALUATION_METRICS)
+    assert len(evaluation['y_true']) == 20
+
+    again = pipeline_factory()
+    again.evaluate()
+    assert again.stage_keys == first.stage_keys
+    assert all('cached' in line for line in pipeline_factory.logs[-4:])
+
+    deeper = pipeline_factory(model_params={'n_estimators': 10, 'max_depth': 3})
+    deeper.train()
+    assert deeper.stage_keys['features'] == first.stage_keys['features']
+    assert deeper.stage_keys['train'] != first.stage_keys['train']
+
+
+def test_validation_split_partitions_training_rows(pipeline_factory):
+    pipeline = pipeline_factory()
+    train_index, test_index = pipeline.split()
+    fit_index, val_index = pipeline.validation_split()
+    assert sorted(np.concatenate([fit_index, val_index])) == sorted(train_index)
+    assert not set(val_index) & set(test_index)
+
+
+def test_export_writes_bundle_manifest(pipeline_factory, tmp_path):
+    out_dir = pipeline_factory(locale_variants=True).export(tmp_path / 'bundle')
+    manifest = load_manifest(out_dir)
+    assert manifest['locale_variants'] is True
+    assert manifest['model_params']['max_depth'] == 2
+    assert (out_dir / training.MODEL_FILE).exists()
+    assert (out_dir / 'evaluation_predictions.npz').exists()
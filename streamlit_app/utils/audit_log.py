@@ -0,0 +1,262 @@
+"""
+Audit Log
+Append-only record of every petition analysis: input hash, feature row,
+model version, probability, prediction and latency. The request path only
+queues the analysis; a background thread writes batches as compressed
+columnar blocks, and files rotate by size or age. read_audit_log streams the
+blocks back as DataFrames.
+
+File format: a sequence of blocks, each an 8-byte header (magic, payload
+length) followed by an np.savez_compressed payload with one array per
+column. A block cut short by a crash ends the file for readers; every
+complete block before it stays readable.
+
+Usage, from the streamlit_app directory:
+    python -m utils.audit_log                 # summary of the last 7 days
+    python -m utils.audit_log --days 1
+"""
+
+import argparse
+import atexit
+import io
+import logging
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR
+from .feature_engineering import FeatureRecord
+from .feature_store import text_hash
+
+logger = logging.getLogger(__name__)
+
+AUDIT_DIR = APP_DIR / 'logs' / 'audit'
+FILE_SUFFIX = '.audit'
+BLOCK_MAGIC = b'PAL1'
+BLOCK_HEADER = struct.Struct('>4sI')
+
+# Analyses per block; a partial batch is written after FLUSH_SECONDS
+BATCH_SIZE = 256
+FLUSH_SECONDS = 5
+# A file is closed and a new one started past either limit
+ROTATE_BYTES = 64 * 1024 * 1024
+ROTATE_SECONDS = 24 * 3600
+# Model version recorded for heuristic demo predictions
+DEMO_VERSION = 'demo'
+
+_STOP = object()
+
+
+class AuditLog:
+    """
+    Background writer of analysis records
+
+    record() copies the feature row onto an unbounded queue and returns, so
+    the request path never waits on disk. One writer thread per process
+    appends to its own files, named after host, process and start time.
+    """
+
+    def __init__(self, directory: Union[str, Path] = AUDIT_DIR, batch_size: int = BATCH_SIZE,
+                 flush_seconds: float = FLUSH_SECONDS, rotate_bytes: int = ROTATE_BYTES,
+                 rotate_seconds: float = ROTATE_SECONDS):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.written = 0
+        self.path: Optional[Path] = None
+        self._opened_at = 0.0
+        self._files = 0
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def record(self, petition_data: Mapping[str, Any], features: Optional[FeatureRecord],
+               model_artifacts: Optional[Mapping[str, Any]], probability: float, prediction: int,
+               latency_ms: float) -> None:
+        """Queue one analysis; never blocks or raises"""
+        try:
+            if self._writer is None:
+                self._start()
+            version = model_artifacts.get('version', '') if model_artifacts else DEMO_VERSION
+            self.queue.put((
+                time.time(), petition_data, features.schema.names if features is not None else (),
+                features.values.copy() if features is not None else np.empty(0),
+                version, float(probability), int(prediction), float(latency_ms)
+            ))
+        except Exception as e:
+            logger.warning("Audit record failed: %s", e)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Write everything queued and stop the writer thread"""
+        if self._writer is not None and self._writer.is_alive():
+            self.queue.put(_STOP)
+            self._writer.join(timeout)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.warning("Audit log write of %d records failed: %s", len(batch), e)
+
+    def _file(self) -> Path:
+        """Current file, rotated when it is too big or too old"""
+        if (self.path is None or time.time() - self._opened_at >= self.rotate_seconds
+                or (self.path.exists() and self.path.stat().st_size >= self.rotate_bytes)):
+            self._opened_at = time.time()
+            self._files += 1
+            stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(self._opened_at))
+            self.path = self.directory / f'{socket.gethostname()}-{os.getpid()}-{stamp}-{self._files}{FILE_SUFFIX}'
+        return self.path
+
+    def _write(self, batch: List[tuple]) -> None:
+        # Rows extracted with different schemas go in separate blocks
+        groups: Dict[tuple, List[tuple]] = {}
+        for item in batch:
+            groups.setdefault(tuple(item[2]), []).append(item)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._file(), 'ab') as f:
+            for names, items in groups.items():
+                f.write(encode_block(names, items))
+        self.written += len(batch)
+
+
+def encode_block(names: Sequence[str], items: Sequence[tuple]) -> bytes:
+    """One block of analyses sharing a feature schema"""
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        timestamp=np.array([item[0] for item in items], dtype=np.float64),
+        input_hash=np.array([text_hash(item[1]) for item in items], dtype='S64'),
+        model_version=np.array([item[4] for item in items], dtype=str),
+        probability=np.array([item[5] for item in items], dtype=np.float64),
+        prediction=np.array([item[6] for item in items], dtype=np.int8),
+        latency_ms=np.array([item[7] for item in items], dtype=np.float32),
+        feature_names=np.array(names, dtype=str),
+        features=np.stack([item[3] for item in items]) if names else np.empty((len(items), 0)),
+    )
+    payload = buffer.getvalue()
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload)) + payload
+
+
+def _read_blocks(path: Path) -> Iterator[Dict[str, np.ndarray]]:
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, length = BLOCK_HEADER.unpack(header)
+            payload = f.read(length)
+            if magic != BLOCK_MAGIC or len(payload) < length:
+                logger.warning("%s ends in an incomplete block; stopping there", path)
+                return
+            with np.load(io.BytesIO(payload)) as block:
+                yield {key: block[key] for key in block.files}
+
+
+def read_audit_log(directory: Union[str, Path] = AUDIT_DIR, since: Optional[float] = None,
+                   until: Optional[float] = None, features: bool = True) -> Iterator[Any]:
+    """
+    Stream logged analyses as DataFrames, one per block, oldest file first
+
+    Args:
+        since, until: Unix time bounds on the analysis timestamp
+        features: Include one column per feature
+
+    Yields:
+        DataFrames with timestamp, input_hash, model_version, probability,
+        prediction and latency_ms, then the feature columns
+    """
+    import pandas as pd
+
+    for path in sorted(sorted(Path(directory).glob(f'*{FILE_SUFFIX}')), key=lambda path: path.stat().st_mtime):
+        if since is not None and path.stat().st_mtime < since:
+            continue
+        for block in _read_blocks(path):
+            keep = np.ones(len(block['timestamp']), dtype=bool)
+            if since is not None:
+                keep &= block['timestamp'] >= since
+            if until is not None:
+                keep &= block['timestamp'] < until
+            if not keep.any():
+                continue
+            frame = pd.DataFrame({
+                'timestamp': pd.to_datetime(block['timestamp'][keep], unit='s', utc=True),
+                'input_hash': np.char.decode(block['input_hash'][keep], 'ascii'),
+                'model_version': block['model_version'][keep],
+                'probability': block['probability'][keep],
+                'prediction': block['prediction'][keep],
+                'latency_ms': block['latency_ms'][keep],
+            })
+            if features and len(block['feature_names']):
+                frame = pd.concat([
+                    frame, pd.DataFrame(block['features'][keep], columns=block['feature_names'].tolist())
+                ], axis=1)
+            yield frame
+
+
+def load_audit_log(directory: Union[str, Path] = AUDIT_DIR, since: Optional[float] = None,
+                   until: Optional[float] = None, features: bool = True):
+    """All logged analyses in one DataFrame, or None if there are none"""
+    import pandas as pd
+
+    frames = list(read_audit_log(directory, since, until, features))
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarise the prediction audit log")
+    parser.add_argument('--dir', default=str(AUDIT_DIR), help="Audit log directory")
+    parser.add_argument('--days', type=float, default=7)
+    args = parser.parse_args(argv)
+
+    log = load_audit_log(args.dir, since=time.time() - args.days * 86400, features=False)
+    if log is None:
+        print(f"No analyses logged in {args.dir} in the last {args.days:g} days")
+        return 1
+    summary = log.groupby('model_version').agg(
+        analyses=('probability', 'size'),
+        distinct_inputs=('input_hash', 'nunique'),
+        mean_probability=('probability', 'mean'),
+        positive_rate=('prediction', 'mean'),
+        p50_ms=('latency_ms', 'median'),
+        p95_ms=('latency_ms', lambda values: values.quantile(0.95)),
+        first=('timestamp', 'min'),
+        last=('timestamp', 'max'),
+    )
+    print(summary.to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,101 @@
-import pandas as pd
+"""
+Data Processing Utilities
+Loading of the saved model artifacts and reference data, without Streamlit.
+pandas is only imported when the reference data is requested.
+"""
+
+import json
 import pickle
-import streamlit as st
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .feature_engineering import CategoricalLookup, FeatureSchema
+
+APP_DIR = Path(__file__).resolve().parent.parent
+MODELS_DIR = APP_DIR / 'models'
+DATA_DIR = APP_DIR / 'data'
+# Written next to the model by the training pipeline's export stage
+MANIFEST_FILE = 'bundle.json'
+MODEL_FILE = 'best_model.pkl'
+# Written by utils.model_compaction; served instead of best_model.pkl when present
+COMPACT_MODEL_FILE = 'compact_model.pkl'
+# Written by utils.text_model; blended into predictions when present
+TEXT_MODEL_FILE = 'text_model.pkl'
+
+
+def _load_pickle(path: Path) -> Any:
+    with open(path, 'rb') as f:
+        return pickle.load(f)
 
-@st.cache_data
-def load_model_artifacts():
-    """Load all model artifacts with caching"""
-    artifacts = {}
 
+def load_manifest(models_dir: Union[str, Path] = MODELS_DIR) -> Dict[str, Any]:
+    """Bundle manifest describing how the model was trained; empty if absent"""
     try:
-        # Load trained model
-        with open('models/best_model.pkl', 'rb') as f:
-            artifacts['model'] = pickle.load(f)
+        with open(Path(models_dir) / MANIFEST_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
-        # Load feature names
-        with open('models/model_features.pkl', 'rb') as f:
-            artifacts['features'] = pickle.load(f)
 
-        # Load categorical encoders
-        with open('models/categorical_encoders.pkl', 'rb') as f:
-            artifacts['encoders'] = pickle.load(f)
+def load_reference_data(data_dir: Union[str, Path] = DATA_DIR):
+    """
+    Load the processed petition data used as reference
 
-        # Try to load reference data
+    Returns:
+        DataFrame, or None if neither the xlsx nor the csv export exists
+    """
+    import pandas as pd
+
+    data_dir = Path(data_dir)
+    try:
+        return pd.read_excel(data_dir / 'processed_petition_data.xlsx')
+    except FileNotFoundError:
+        # Try CSV as fallback
         try:
-            artifacts['reference_data'] = pd.read_excel('data/processed_petition_data.xlsx')
+            return pd.read_csv(data_dir / 'processed_petition_data.csv')
         except FileNotFoundError:
-            artifacts['reference_data'] = None
+            return None
+
 
-        return artifacts
+def load_model_artifacts(models_dir: Union[str, Path] = MODELS_DIR,
+                         data_dir: Optional[Union[str, Path]] = DATA_DIR) -> Dict[str, Any]:
+    """
+    Load the trained model, its feature list and categorical encoders
 
-    except FileNotFoundError as e:
-        return None
\ No newline at end of file
+    Args:
+        models_dir: Directory holding best_model.pkl (or compact_model.pkl),
+            model_features.pkl and categorical_encoders.pkl, and optionally
+            text_model.pkl
+        data_dir: Directory holding the processed reference data, or None to
+            skip loading it
+
+    Returns:
+        Artifact dict, with the seconds loading took as load_seconds; raises
+        FileNotFoundError if a model file is missing
+    """
+    start = time.perf_counter()
+    models_dir = Path(models_dir)
+    artifacts = {}
+    artifacts['model_file'] = COMPACT_MODEL_FILE if (models_dir / COMPACT_MODEL_FILE).exists() else MODEL_FILE
+    # Unpickling the model is what imports sklearn
+    artifacts['model'] = _load_pickle(models_dir / artifacts['model_file'])
+    artifacts['features'] = _load_pickle(models_dir / 'model_features.pkl')
+    artifacts['encoders'] = _load_pickle(models_dir / 'categorical_encoders.pkl')
+    # Precomputed lookup tables so encoding is a dict hit per petition
+    artifacts['categorical_lookup'] = CategoricalLookup(artifacts['encoders'])
+    # Feature layout and the model's input columns within it, resolved once
+    artifacts['schema'] = FeatureSchema.for_model(artifacts['features'])
+    artifacts['model_columns'] = artifacts['schema'].positions(artifacts['features'])
+    # Serving must extract features the way the model was trained
+    artifacts['manifest'] = load_manifest(models_dir)
+    artifacts['keyword_matching'] = artifacts['manifest'].get('keyword_matching', 'substring')
+    # Bundles without a manifest predate locale variants
+    artifacts['locale_variants'] = artifacts['manifest'].get('locale_variants', False)
+    # Feature families dropped by feature selection; the pipeline skips them
+    artifacts['disabled_families'] = artifacts['manifest'].get('disabled_families', [])
+    text_model_path = models_dir / TEXT_MODEL_FILE
+    artifacts['text_model'] = _load_pickle(text_model_path) if text_model_path.exists() else None
+    artifacts['reference_data'] = load_reference_data(data_dir) if data_dir is not None else None
+    artifacts['load_seconds'] = time.perf_counter() - start
+    return artifacts
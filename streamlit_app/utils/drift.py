@@ -0,0 +1,409 @@
+"""
+Drift Monitoring
+Tracks whether live petitions look like the reference data. Every analysed
+feature row goes into a column-parallel quantile sketch and the raw
+categorical fields into bounded counters; both are flushed to disk in the
+background and rolled into a new segment daily. The Drift Monitor page merges
+the segments and compares them with the reference petitions' features in the
+feature store, per feature, by PSI and the KS statistic.
+
+Usage, from the streamlit_app directory:
+    python -m utils.drift                 # drift report over the last 7 days
+    python -m utils.drift --days 1
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR
+from .feature_engineering import CATEGORICAL_FEATURES, FeatureRecord, pipeline_feature_names
+
+logger = logging.getLogger(__name__)
+
+DRIFT_DIR = APP_DIR / 'logs' / 'drift'
+
+# Rows per compactor level; quantile error shrinks roughly as 1/SKETCH_K
+SKETCH_K = 256
+FLUSH_SECONDS = 60
+# A monitor starts a new segment file this often, so pages can pick a window
+SEGMENT_SECONDS = 24 * 3600
+RETENTION_DAYS = 30
+# Distinct values counted per categorical field; the rest share one bucket
+MAX_CATEGORIES = 50
+OTHER_CATEGORY = '(other)'
+CATEGORICAL_FIELDS = tuple(name[:-len('_encoded')] for name in CATEGORICAL_FEATURES)
+
+PSI_BINS = 10
+# Conventional PSI bands: below 0.1 stable, 0.1 to 0.25 moderate, above major
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+# Floor for empty bins, which would otherwise make PSI infinite
+PSI_EPSILON = 1e-4
+
+
+def monitored_features() -> Tuple[str, ...]:
+    """Pipeline features tracked by the sketch; categorical ones are counted raw instead"""
+    return tuple(name for name in pipeline_feature_names() if name not in CATEGORICAL_FEATURES)
+
+
+# ============================================================================
+# QUANTILE SKETCH
+# ============================================================================
+class QuantileSketch:
+    """
+    Mergeable quantile sketch of every column of a stream of rows
+
+    A KLL-style compactor stack run on all columns at once: rows collect in a
+    buffer of k, and a full level is sorted column by column and every other
+    value (from a random offset) is promoted to the next level at double
+    weight. Memory grows with log2(n / k) levels of at most k rows; an update
+    is one row copy, with a sort every k updates.
+    """
+
+    def __init__(self, n_columns: int, k: int = SKETCH_K, seed: Optional[int] = None):
+        self.n_columns = n_columns
+        self.k = k
+        self.count = 0
+        self.buffer = np.empty((k, n_columns))
+        self.fill = 0
+        # levels[i] holds values of weight 2 ** (i + 1)
+        self.levels: List[np.ndarray] = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, row: np.ndarray) -> None:
+        self.buffer[self.fill] = row
+        self.fill += 1
+        self.count += 1
+        if self.fill == self.k:
+            self._add(0, self._compact(self.buffer))
+            self.fill = 0
+
+    def _compact(self, items: np.ndarray) -> np.ndarray:
+        return np.sort(items, axis=0)[self._rng.integers(2)::2]
+
+    def _add(self, level: int, items: np.ndarray) -> None:
+        # A merged sketch may bring levels above empty ones this sketch lacks
+        while level >= len(self.levels):
+            self.levels.append(np.empty((0, self.n_columns)))
+        merged = np.concatenate([self.levels[level], items])
+        if len(merged) >= self.k:
+            self.levels[level] = np.empty((0, self.n_columns))
+            self._add(level + 1, self._compact(merged))
+        else:
+            self.levels[level] = merged
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Fold another sketch of the same columns into this one"""
+        for row in other.buffer[:other.fill]:
+            self.update(row)
+        for level, items in enumerate(other.levels):
+            if len(items):
+                self._add(level, items)
+        self.count += other.count - other.fill
+
+    def column(self, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted retained values of one column and their cumulative weight share"""
+        values = np.concatenate([self.buffer[:self.fill, position]] + [items[:, position] for items in self.levels])
+        weights = np.concatenate(
+            [np.ones(self.fill)] + [np.full(len(items), 2.0 ** (level + 1)) for level, items in enumerate(self.levels)]
+        )
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        return values[order], cumulative / cumulative[-1] if len(cumulative) else cumulative
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays for np.savez; copies, so the sketch can keep updating"""
+        state = {'count': np.array(self.count), 'k': np.array(self.k), 'buffer': self.buffer[:self.fill].copy()}
+        state.update({f'level_{level}': items.copy() for level, items in enumerate(self.levels)})
+        return state
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, np.ndarray]) -> 'QuantileSketch':
+        buffer = state['buffer']
+        sketch = cls(buffer.shape[1], int(state['k']))
+        sketch.buffer[:len(buffer)] = buffer
+        sketch.fill = len(buffer)
+        n_levels = sum(1 for key in state if key.startswith('level_'))
+        sketch.levels = [state[f'level_{level}'] for level in range(n_levels)]
+        sketch.count = int(state['count'])
+        return sketch
+
+
+# ============================================================================
+# LIVE MONITOR
+# ============================================================================
+class DriftMonitor:
+    """
+    Sketches of the petitions analysed by this process
+
+    update() adds a few microseconds per request; a daemon thread, started on
+    first use, writes the state to this process's current segment file every
+    `flush_seconds` and on exit.
+    """
+
+    def __init__(self, directory: Union[str, Path] = DRIFT_DIR, names: Optional[Sequence[str]] = None,
+                 flush_seconds: float = FLUSH_SECONDS, segment_seconds: float = SEGMENT_SECONDS):
+        self.directory = Path(directory)
+        self.names = list(names if names is not None else monitored_features())
+        self.flush_seconds = flush_seconds
+        self.segment_seconds = segment_seconds
+        self._positions: Dict[Any, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._start_segment()
+
+    def _start_segment(self) -> None:
+        self.started_at = time.time()
+        self.sketch = QuantileSketch(len(self.names))
+        self.categories: Dict[str, Counter] = {field: Counter() for field in CATEGORICAL_FIELDS}
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(self.started_at))
+        self.path = self.directory / f'{socket.gethostname()}-{os.getpid()}-{stamp}.npz'
+        self._dirty = False
+
+    def update(self, features: FeatureRecord, petition_data: Mapping[str, Any]) -> None:
+        """Add one analysed petition; never raises"""
+        try:
+            positions = self._positions.get(features.schema)
+            if positions is None:
+                positions = self._positions[features.schema] = features.schema.positions(self.names)
+            row = features.values[positions]
+            with self._lock:
+                self.sketch.update(row)
+                for field, counter in self.categories.items():
+                    value = str(petition_data.get(field))
+                    if value not in counter and len(counter) >= MAX_CATEGORIES:
+                        value = OTHER_CATEGORY
+                    counter[value] += 1
+                self._dirty = True
+            if self._flusher is None:
+                self._start_flusher()
+        except Exception as e:
+            logger.warning("Drift monitor update failed: %s", e)
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name='drift-flush', daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Drift monitor flush failed: %s", e)
+
+    def flush(self) -> None:
+        """Write the current segment if it changed, and roll over to a new one when due"""
+        with self._lock:
+            if not self._dirty:
+                return
+            state = self.sketch.state()
+            state['names'] = np.array(self.names)
+            state['categories'] = np.array(json.dumps(self.categories))
+            state['started_at'] = np.array(self.started_at)
+            state['updated_at'] = np.array(time.time())
+            path = self.path
+            self._dirty = False
+            if time.time() - self.started_at >= self.segment_seconds:
+                self._start_segment()
+                rolled = True
+            else:
+                rolled = False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **state)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if rolled:
+            prune_segments(self.directory)
+
+
+def prune_segments(directory: Union[str, Path] = DRIFT_DIR, retention_days: float = RETENTION_DAYS) -> None:
+    """Delete segment files not updated within the retention period"""
+    cutoff = time.time() - retention_days * 86400
+    for path in Path(directory).glob('*.npz'):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+
+def load_live_profile(directory: Union[str, Path] = DRIFT_DIR,
+                      since: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Merge the segment files updated since a Unix time (all by default)
+
+    Returns:
+        Dict with the merged sketch, its feature names, summed categorical
+        counts and the number of segments, or None if there are none.
+        Segments tracking a different feature list than the newest are skipped.
+    """
+    paths = sorted(Path(directory).glob('*.npz'), key=lambda path: path.stat().st_mtime, reverse=True)
+    profile = None
+    for path in paths:
+        if since is not None and path.stat().st_mtime < since:
+            continue
+        try:
+            with np.load(path) as saved:
+                state = {key: saved[key] for key in saved.files}
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable drift segment %s: %s", path, e)
+            continue
+        names = state['names'].tolist()
+        categories = json.loads(state['categories'].item())
+        sketch = QuantileSketch.from_state(state)
+        if profile is None:
+            profile = {'names': names, 'sketch': sketch, 'categories': {}, 'segments': 0}
+        elif names != profile['names']:
+            continue
+        else:
+            profile['sketch'].merge(sketch)
+        for field, counts in categories.items():
+            profile['categories'].setdefault(field, Counter()).update(counts)
+        profile['segments'] += 1
+    return profile
+
+
+# ============================================================================
+# DRIFT STATISTICS
+# ============================================================================
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two distributions over the same bins"""
+    expected = np.clip(expected, PSI_EPSILON, None)
+    actual = np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def severity(value: float) -> str:
+    if value >= PSI_MAJOR:
+        return 'major'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+def _cdf(values: np.ndarray, shares: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Weighted share of values at or below each point"""
+    positions = np.searchsorted(values, points, side='right')
+    return np.where(positions > 0, shares[np.maximum(positions - 1, 0)], 0.0)
+
+
+def feature_drift(reference, profile: Mapping[str, Any], bins: int = PSI_BINS) -> List[Dict[str, Any]]:
+    """
+    PSI and KS statistic per sketched feature
+
+    PSI uses bins at the reference deciles; KS is the largest gap between the
+    reference and live CDFs over both sets of values.
+
+    Args:
+        reference: ReferencePercentiles of the reference petitions
+        profile: Live profile from load_live_profile
+
+    Returns:
+        One dict per feature present on both sides, most drifted first
+    """
+    sketch = profile['sketch']
+    rows = []
+    for position, name in enumerate(profile['names']):
+        if name not in reference.index:
+            continue
+        ref = reference.sorted[:, reference.index[name]]
+        live, shares = sketch.column(position)
+        if not len(live):
+            continue
+        ref_shares = np.arange(1, len(ref) + 1) / len(ref)
+        edges = np.unique(np.quantile(ref, np.linspace(0, 1, bins + 1)[1:-1]))
+        ref_bins = np.diff(np.concatenate([[0.0], _cdf(ref, ref_shares, edges), [1.0]]))
+        live_bins = np.diff(np.concatenate([[0.0], _cdf(live, shares, edges), [1.0]]))
+        points = np.concatenate([ref, live])
+        ks = float(np.max(np.abs(_cdf(ref, ref_shares, points) - _cdf(live, shares, points))))
+        value = psi(ref_bins, live_bins)
+        rows.append({
+            'feature': name,
+            'psi': value,
+            'ks': ks,
+            'severity': severity(value),
+            'reference_median': float(np.median(ref)),
+            'live_median': float(live[min(np.searchsorted(shares, 0.5), len(live) - 1)]),
+        })
+    return sorted(rows, key=lambda row: row['psi'], reverse=True)
+
+
+def categorical_drift(reference_data, profile: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """PSI per raw categorical field between the reference data and the live counts"""
+    rows = []
+    for field, counts in profile['categories'].items():
+        if reference_data is None or field not in reference_data.columns or not counts:
+            continue
+        reference_counts = reference_data[field].astype(str).value_counts()
+        keys = sorted(set(reference_counts.index) | set(counts))
+        expected = np.array([reference_counts.get(key, 0) for key in keys], dtype=float)
+        actual = np.array([counts.get(key, 0) for key in keys], dtype=float)
+        value = psi(expected / expected.sum(), actual / actual.sum())
+        top = max(counts, key=counts.get)
+        rows.append({
+            'field': field,
+            'psi': value,
+            'severity': severity(value),
+            'live_top_value': top,
+            'live_top_share': counts[top] / sum(counts.values()),
+            'reference_top_share': float(reference_counts.get(top, 0) / reference_counts.sum()),
+        })
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .data_processing import load_model_artifacts
+    from .feature_store import FeatureStore, build_reference_index
+    from .pipeline import StreamlitPetitionPipeline
+
+    parser = argparse.ArgumentParser(description="Live feature drift against the reference petitions")
+    parser.add_argument('--dir', default=str(DRIFT_DIR), help="Drift segment directory")
+    parser.add_argument('--days', type=float, default=7, help="Window of segments to merge")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    profile = load_live_profile(args.dir, since=time.time() - args.days * 86400)
+    if profile is None:
+        print(f"No drift segments in {args.dir}")
+        return 1
+    artifacts = load_model_artifacts()
+    store = FeatureStore(StreamlitPetitionPipeline.from_artifacts(artifacts))
+    try:
+        reference = build_reference_index(store, artifacts['reference_data'].to_dict('records'))
+    finally:
+        store.close()
+    if reference is None:
+        print("Too few reference petitions in the feature store; run python -m utils.feature_store warm")
+        return 1
+    print(f"{profile['sketch'].count} live petitions from {profile['segments']} segments "
+          f"against {reference.n_rows} reference petitions")
+    print(f"{'Feature':<44}{'PSI':>8}{'KS':>8}  Severity")
+    for row in feature_drift(reference, profile)[:args.top]:
+        print(f"{row['feature']:<44}{row['psi']:>8.3f}{row['ks']:>8.3f}  {row['severity']}")
+    for row in categorical_drift(artifacts['reference_data'], profile):
+        print(f"{row['field']:<44}{row['psi']:>8.3f}{'':>8}  {row['severity']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
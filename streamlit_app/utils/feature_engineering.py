@@ -0,0 +1,450 @@
+"""
+Feature Engineering Utilities
+Text scanning helpers shared by the petition analyzer and training code
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Same tag pattern the training notebook used, so cleaned text and tag counts
+# stay identical to what the model was fitted on
+TAG_PATTERN = re.compile('<.*?>')
+TAG_NAME_PATTERN = re.compile(r'</?\s*([A-Za-z][A-Za-z0-9]*)')
+
+# Tags reported individually as features
+TRACKED_TAGS = ('p', 'strong', 'li', 'h3', 'br')
+
+# Words, numbers, contractions and hyphenated compounds; '%' is kept as its own
+# token so statistics keywords can match it
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['\u2019-][a-z0-9]+)*|%")
+
+LIST_TAGS = frozenset({'ul', 'ol'})
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'blockquote', 'table', 'tr',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
+})
+
+
+# ============================================================================
+# FEATURE LAYOUT
+# ============================================================================
+TEXT_COLUMNS = ('title', 'description', 'letter_body', 'targeting_description')
+
+READABILITY_METRICS = (
+    'flesch_ease', 'flesch_kincaid', 'gunning_fog', 'automated_readability',
+    'avg_sentence_length', 'avg_word_length', 'vocab_diversity', 'caps_ratio'
+)
+
+# Per-column features, emitted as '{column}_{metric}'
+COLUMN_METRICS = (
+    'length', 'clean_length', 'word_count',
+    'urgency_count', 'action_count', 'power_count', 'authority_count', 'specificity_count',
+    'has_urgency', 'has_action', 'cta_count', 'has_cta',
+    'numbers_count', 'has_statistics', 'paragraph_count', 'question_count',
+    'sentiment_compound', 'sentiment_positive', 'sentiment_negative', 'emotional_intensity'
+) + READABILITY_METRICS
+
+# Tracked tag -> its per-tag count metric
+TAG_METRICS = tuple((tag, f'{tag}_tags') for tag in TRACKED_TAGS)
+
+# HTML structure features, only computed for the description
+DESCRIPTION_METRICS = ('html_tags',) + tuple(metric for _, metric in TAG_METRICS) + (
+    'list_count', 'html_paragraph_count'
+)
+
+CATEGORICAL_FEATURES = ('original_locale_encoded', 'has_location_encoded')
+
+# Per-column metric families that cost real extraction time (VADER, textstat,
+# NLTK tokenization); the remaining metrics are plain counting. Feature
+# selection can switch a family off per column as '{column}.{family}'.
+FEATURE_FAMILIES = {
+    'sentiment': ('sentiment_compound', 'sentiment_positive', 'sentiment_negative', 'emotional_intensity'),
+    'readability': ('flesch_ease', 'flesch_kincaid', 'gunning_fog', 'automated_readability'),
+    'tokens': ('avg_sentence_length', 'avg_word_length', 'vocab_diversity', 'caps_ratio'),
+}
+
+# Families the composite scores read (title_flesch_kincaid and
+# title_sentiment_compound), which therefore always stay on
+COMPOSITE_INPUT_FAMILIES = ('title.readability', 'title.sentiment')
+
+
+def feature_families() -> Tuple[str, ...]:
+    """Every '{column}.{family}' group, in schema order"""
+    return tuple(f'{column}.{family}' for column in TEXT_COLUMNS for family in FEATURE_FAMILIES)
+
+
+def family_feature_names(group: str) -> Tuple[str, ...]:
+    """Feature names produced by a '{column}.{family}' group"""
+    column, family = group.split('.')
+    return tuple(f'{column}_{metric}' for metric in FEATURE_FAMILIES[family])
+
+# Metrics holding whole numbers; reported back as int rather than float
+INTEGER_METRICS = frozenset(
+    metric for metric in COLUMN_METRICS + DESCRIPTION_METRICS
+    if metric.endswith(('length', '_count', '_tags')) or metric.startswith('has_')
+)
+
+COMPOSITE_FEATURES = (
+    'content_comprehensiveness_score', 'professional_sophistication_score',
+    'strategic_urgency_score', 'authority_targeting_score', 'message_coherence_score'
+)
+
+
+def pipeline_feature_names() -> Tuple[str, ...]:
+    """Every feature the petition pipeline can produce, in schema order"""
+    names = []
+    for column in TEXT_COLUMNS:
+        names.extend(f'{column}_{metric}' for metric in COLUMN_METRICS)
+        if column == 'description':
+            names.extend(f'{column}_{metric}' for metric in DESCRIPTION_METRICS)
+    names.extend(CATEGORICAL_FEATURES)
+    names.extend(COMPOSITE_FEATURES)
+    return tuple(names)
+
+
+class FeatureSchema:
+    """
+    Fixed mapping from feature names to row positions
+
+    Built once when the model is loaded. Extraction code writes into a
+    preallocated NumPy row through the precomputed index tables, so the hot
+    path never formats '{col}_{metric}' keys or grows a dict.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = tuple(dict.fromkeys(names))
+        self.index = {name: position for position, name in enumerate(self.names)}
+        # column -> metric -> position, for the per-column features
+        self.column_index = {
+            column: {
+                metric: self.index[f'{column}_{metric}']
+                for metric in COLUMN_METRICS + DESCRIPTION_METRICS
+                if f'{column}_{metric}' in self.index
+            }
+            for column in TEXT_COLUMNS
+        }
+        self.integer_positions = frozenset(
+            [position for metrics in self.column_index.values()
+             for metric, position in metrics.items() if metric in INTEGER_METRICS]
+            + [self.index[name] for name in CATEGORICAL_FEATURES if name in self.index]
+        )
+
+    @classmethod
+    def for_model(cls, model_features: Optional[Sequence[str]] = None) -> 'FeatureSchema':
+        """
+        Schema covering the pipeline's features plus any model-only features
+
+        Model features the pipeline does not produce get their own slots and
+        stay 0, matching the previous features.get(name, 0) behaviour.
+        """
+        return cls(pipeline_feature_names() + tuple(model_features or ()))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def new_row(self) -> np.ndarray:
+        """Zeroed feature row"""
+        return np.zeros(len(self.names), dtype=np.float64)
+
+    def new_matrix(self, n_rows: int) -> np.ndarray:
+        """Zeroed feature matrix for a batch of petitions"""
+        return np.zeros((n_rows, len(self.names)), dtype=np.float64)
+
+    def positions(self, names: Sequence[str]) -> np.ndarray:
+        """Row positions of the given features, e.g. the model's input columns"""
+        return np.fromiter((self.index[name] for name in names), dtype=np.intp, count=len(names))
+
+
+class FeatureRecord:
+    """Feature values for one petition, backed by a row of a FeatureSchema"""
+
+    __slots__ = ('schema', 'values')
+
+    def __init__(self, schema: FeatureSchema, values: Optional[np.ndarray] = None):
+        self.schema = schema
+        self.values = schema.new_row() if values is None else values
+
+    def _value(self, position: int) -> Any:
+        value = self.values[position].item()
+        return int(value) if position in self.schema.integer_positions else value
+
+    def __getitem__(self, name: str) -> Any:
+        return self._value(self.schema.index[name])
+
+    def __setitem__(self, name: str, value: float):
+        self.values[self.schema.index[name]] = value
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.schema.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.names)
+
+    def __len__(self) -> int:
+        return len(self.schema.names)
+
+    def get(self, name: str, default: Any = 0) -> Any:
+        position = self.schema.index.get(name)
+        return default if position is None else self._value(position)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.schema.names
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((name, self._value(position)) for position, name in enumerate(self.schema.names))
+
+    def to_dict(self) -> Dict[str, float]:
+        """Plain dict view, for display code only"""
+        return dict(self.items())
+
+    def select(self, positions: np.ndarray) -> np.ndarray:
+        """Values at the given positions as a (1, n) model input"""
+        return self.values[positions].reshape(1, -1)
+
+
+def is_missing(value: Any) -> bool:
+    """Return True for None and NaN-like values without importing pandas"""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except (TypeError, ValueError):
+        return False
+
+
+def empty_scan() -> Dict[str, Any]:
+    """Scan result for missing text"""
+    return {
+        'clean_text': '',
+        'tag_count': 0,
+        'tag_histogram': Counter(),
+        'list_count': 0,
+        'paragraph_count': 0,
+        'line_count': 0
+    }
+
+
+def scan_html(text: Any) -> Dict[str, Any]:
+    """
+    Scan raw petition text once and return cleaned text plus structure counts
+
+    Args:
+        text: Raw petition field, possibly containing HTML
+
+    Returns:
+        Dictionary with:
+            clean_text: text with tags removed and whitespace collapsed
+            tag_count: number of tags (opening, closing and other markup)
+            tag_histogram: Counter of opening tag names (lowercase)
+            list_count: number of <ul>/<ol> lists
+            paragraph_count: text blocks separated by block tags or newlines,
+                excluding list items
+            line_count: non-empty newline-separated lines of the raw text
+    """
+    if is_missing(text):
+        return empty_scan()
+
+    text = str(text)
+    chunks = []
+    histogram = Counter()
+    tag_count = 0
+    list_count = 0
+    list_depth = 0
+    paragraph_count = 0
+    line_count = 0
+    line_has_content = False
+    block_has_text = False
+    block_in_list = False
+
+    def end_block():
+        nonlocal paragraph_count, block_has_text
+        if block_has_text and not block_in_list:
+            paragraph_count += 1
+        block_has_text = False
+
+    def feed_data(data):
+        nonlocal line_count, line_has_content, block_has_text, block_in_list
+        if not data:
+            return
+        chunks.append(data)
+        lines = data.split('\n')
+        for i, line in enumerate(lines):
+            if i > 0:
+                # Newline: close the current raw line and text block
+                if line_has_content:
+                    line_count += 1
+                line_has_content = False
+                end_block()
+            if line.strip():
+                line_has_content = True
+                if not block_has_text:
+                    block_in_list = list_depth > 0
+                block_has_text = True
+
+    position = 0
+    for match in TAG_PATTERN.finditer(text):
+        feed_data(text[position:match.start()])
+        position = match.end()
+
+        tag_count += 1
+        line_has_content = True
+        tag = match.group()
+        name_match = TAG_NAME_PATTERN.match(tag)
+        if not name_match:
+            continue
+        name = name_match.group(1).lower()
+        closing = tag.startswith('</')
+
+        if name in BLOCK_TAGS:
+            end_block()
+        if name in LIST_TAGS:
+            if closing:
+                list_depth = max(list_depth - 1, 0)
+            else:
+                list_depth += 1
+                list_count += 1
+        if not closing:
+            histogram[name] += 1
+
+    feed_data(text[position:])
+    if line_has_content:
+        line_count += 1
+    end_block()
+
+    return {
+        'clean_text': ' '.join(''.join(chunks).split()),
+        'tag_count': tag_count,
+        'tag_histogram': histogram,
+        'list_count': list_count,
+        'paragraph_count': paragraph_count,
+        'line_count': line_count
+    }
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for keyword matching"""
+    return TOKEN_PATTERN.findall(text.lower().replace('\u2019', "'"))
+
+
+class KeywordMatcher:
+    """
+    Whole-word keyword matcher over several keyword categories
+
+    Text is tokenized once; single-word keywords are looked up in a hash
+    table and multi-word phrases in an n-gram table keyed by their first
+    token, so every category is counted in one linear pass. Unlike substring
+    counting, 'now' no longer matches 'know' and 'end' no longer matches
+    'attend'.
+    """
+
+    def __init__(self, categories: Dict[str, Sequence[str]]):
+        self.categories = tuple(categories)
+        self.keywords = []
+        self._keyword_category = []
+        self._unigrams = {}
+        self._phrases = {}
+        for index, name in enumerate(self.categories):
+            for keyword in categories[name]:
+                tokens = tuple(tokenize(keyword))
+                if not tokens:
+                    continue
+                keyword_id = len(self.keywords)
+                self.keywords.append(keyword)
+                self._keyword_category.append(index)
+                if len(tokens) == 1:
+                    self._unigrams.setdefault(tokens[0], []).append(keyword_id)
+                else:
+                    self._phrases.setdefault(tokens[0], []).append((tokens, keyword_id))
+        # Freeze the tables so a shared matcher cannot be mutated by callers
+        self.keywords = tuple(self.keywords)
+        self._keyword_category = tuple(self._keyword_category)
+        self._unigrams = {token: tuple(ids) for token, ids in self._unigrams.items()}
+        self._phrases = {token: tuple(entries) for token, entries in self._phrases.items()}
+
+    def match_ids(self, tokens: Sequence[str]) -> Iterable[int]:
+        """Yield the keyword id of every whole-word match in a token list"""
+        unigrams = self._unigrams
+        phrases = self._phrases
+        for position, token in enumerate(tokens):
+            ids = unigrams.get(token)
+            if ids:
+                yield from ids
+            candidates = phrases.get(token)
+            if candidates:
+                for phrase, keyword_id in candidates:
+                    if tuple(tokens[position:position + len(phrase)]) == phrase:
+                        yield keyword_id
+
+    def count_tokens(self, tokens: Sequence[str], distinct: bool = False) -> Dict[str, int]:
+        """
+        Count keyword matches per category for pre-tokenized text
+
+        Args:
+            tokens: Output of tokenize()
+            distinct: Count each keyword at most once (presence) instead of
+                every occurrence
+
+        Returns:
+            Dictionary mapping category name to match count
+        """
+        counts = [0] * len(self.categories)
+        seen = set()
+        for keyword_id in self.match_ids(tokens):
+            if distinct:
+                if keyword_id in seen:
+                    continue
+                seen.add(keyword_id)
+            counts[self._keyword_category[keyword_id]] += 1
+        return dict(zip(self.categories, counts))
+
+    def count(self, text: Any, distinct: bool = False) -> Dict[str, int]:
+        """Tokenize text and count keyword matches per category"""
+        if is_missing(text):
+            return dict.fromkeys(self.categories, 0)
+        return self.count_tokens(tokenize(str(text)), distinct)
+
+
+class CategoricalLookup:
+    """
+    Precomputed lookup tables for the saved categorical encoders
+
+    categorical_encoders.pkl holds one fitted LabelEncoder per field, fitted
+    on the string form of the raw values. The class lists are turned into
+    plain dictionaries once, so single petitions are encoded with one dict
+    lookup and batches with np.unique plus np.take instead of per-row work.
+    Values the encoder never saw map to UNKNOWN_CODE.
+    """
+
+    UNKNOWN_CODE = -1
+
+    def __init__(self, encoders: Mapping[str, Any]):
+        self.fields = tuple(encoders)
+        self.classes = {field: [str(c) for c in encoders[field].classes_] for field in self.fields}
+        self.tables = {
+            field: {value: code for code, value in enumerate(classes)}
+            for field, classes in self.classes.items()
+        }
+
+    def encode(self, field: str, value: Any) -> int:
+        """Encode one value of a categorical field"""
+        return self.tables[field].get(str(value), self.UNKNOWN_CODE)
+
+    def encode_batch(self, field: str, values: Sequence[Any]) -> np.ndarray:
+        """
+        Encode a column of values with one lookup per distinct value
+
+        Args:
+            field: Encoder name, e.g. 'original_locale'
+            values: Raw values for every row
+
+        Returns:
+            Integer array of codes, one per row
+        """
+        table = self.tables[field]
+        uniques, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+        codes = np.fromiter((table.get(value, self.UNKNOWN_CODE) for value in uniques),
+                            dtype=np.int64, count=len(uniques))
+        return np.take(codes, inverse.reshape(-1))
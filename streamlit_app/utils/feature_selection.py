@@ -0,0 +1,206 @@
+"""
+Feature Selection
+Cost-aware pruning of the expensive per-column feature families: VADER
+sentiment, textstat readability and NLTK token statistics. Families are
+ranked by grouped permutation importance minus a penalty per millisecond of
+extraction time, then dropped greedily while validation AUC stays within a
+tolerance of the full feature set. The surviving features become the model's
+schema, and the dropped families are switched off in the app's pipeline.
+"""
+
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .feature_engineering import (
+    COMPOSITE_INPUT_FAMILIES, FEATURE_FAMILIES, TEXT_COLUMNS, family_feature_names, feature_families,
+    is_missing, scan_html
+)
+
+# Largest accepted validation AUC drop against the full feature set
+DEFAULT_AUC_TOLERANCE = 0.005
+# Importance (in AUC) one millisecond of extraction per petition is worth;
+# a family's ranking score is importance - COST_WEIGHT * cost_ms
+DEFAULT_COST_WEIGHT = 0.0005
+PERMUTATION_REPEATS = 5
+# Petitions timed per family
+COST_SAMPLE = 50
+# Share of the training rows held out to score candidates
+VALIDATION_FRACTION = 0.2
+SELECTION_SEED = 42
+
+
+# ============================================================================
+# EXTRACTION COST
+# ============================================================================
+def _sample(petitions: Sequence[Mapping[str, Any]], size: int, seed: int) -> List[Mapping[str, Any]]:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(petitions), size=min(size, len(petitions)), replace=False)
+    return [petitions[i] for i in picks]
+
+
+def measure_family_costs(petitions: Sequence[Mapping[str, Any]], sample: int = COST_SAMPLE,
+                         seed: int = SELECTION_SEED) -> Dict[str, float]:
+    """
+    Mean extraction time per petition of each '{column}.{family}' group
+
+    Returns:
+        Milliseconds per petition, keyed by group
+    """
+    from .pipeline import StreamlitPetitionPipeline
+
+    pipeline = StreamlitPetitionPipeline()
+    rows = _sample(petitions, sample, seed)
+    totals = dict.fromkeys(feature_families(), 0.0)
+    calls = {
+        'sentiment': lambda text, clean: pipeline.get_sentiment_scores(text, clean),
+        'readability': lambda text, clean: pipeline.calculate_readability(text, clean, True, False),
+        'tokens': lambda text, clean: pipeline.calculate_readability(text, clean, False, True),
+    }
+    for petition in rows:
+        for column in TEXT_COLUMNS:
+            text = petition.get(column)
+            if is_missing(text):
+                continue
+            clean_text = scan_html(text)['clean_text']
+            for family in FEATURE_FAMILIES:
+                start = time.perf_counter()
+                calls[family](text, clean_text)
+                totals[f'{column}.{family}'] += time.perf_counter() - start
+    return {group: total / len(rows) * 1000 for group, total in totals.items()}
+
+
+def measure_extraction_ms(petitions: Sequence[Mapping[str, Any]], disabled_families: Sequence[str] = (),
+                          sample: int = COST_SAMPLE, seed: int = SELECTION_SEED) -> float:
+    """End-to-end extract_features time per petition, in ms"""
+    from .pipeline import StreamlitPetitionPipeline
+
+    pipeline = StreamlitPetitionPipeline(disabled_families=disabled_families)
+    rows = _sample(petitions, sample, seed)
+    start = time.perf_counter()
+    for petition in rows:
+        pipeline.extract_features(petition)
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+# ============================================================================
+# IMPORTANCE AND SELECTION
+# ============================================================================
+def grouped_permutation_importance(model: Any, X: np.ndarray, y: np.ndarray,
+                                   groups: Mapping[str, Sequence[int]],
+                                   n_repeats: int = PERMUTATION_REPEATS,
+                                   seed: int = SELECTION_SEED) -> Dict[str, float]:
+    """
+    Mean validation AUC drop when a group's columns are shuffled together
+
+    Args:
+        groups: Group name to column positions in X
+    """
+    from sklearn.metrics import roc_auc_score
+
+    rng = np.random.default_rng(seed)
+    baseline = roc_auc_score(y, model.predict_proba(X)[:, 1])
+    importance = {}
+    for group, columns in groups.items():
+        drops = []
+        for _ in range(n_repeats):
+            shuffled = X.copy()
+            shuffled[:, columns] = X[rng.permutation(len(X))][:, columns]
+            drops.append(baseline - roc_auc_score(y, model.predict_proba(shuffled)[:, 1]))
+        importance[group] = float(np.mean(drops))
+    return importance
+
+
+def select_features(X: np.ndarray, y: np.ndarray, feature_names: Sequence[str],
+                    costs: Mapping[str, float], model_params: Mapping[str, Any],
+                    tolerance: float = DEFAULT_AUC_TOLERANCE,
+                    cost_weight: float = DEFAULT_COST_WEIGHT,
+                    seed: int = SELECTION_SEED, log=print) -> Dict[str, Any]:
+    """
+    Greedily drop feature families that cost more than they contribute
+
+    Candidates are the model's families except those feeding the composite
+    scores, visited from the lowest importance-minus-cost score up. Each drop
+    is kept only if a model refitted without the family scores within
+    `tolerance` of the full feature set's AUC on a validation slice of X.
+
+    Args:
+        X: Training rows, columns in feature_names order
+        costs: Milliseconds per petition per family, from measure_family_costs
+
+    Returns:
+        Report with the kept features, dropped families, per-family cost and
+        importance, every step tried and the AUC before and after
+    """
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X, y, test_size=VALIDATION_FRACTION, random_state=seed, stratify=y
+    )
+    position = {name: i for i, name in enumerate(feature_names)}
+
+    def fit(features):
+        columns = [position[name] for name in features]
+        model = GradientBoostingClassifier(**model_params).fit(X_fit[:, columns], y_fit)
+        return model, float(roc_auc_score(y_val, model.predict_proba(X_val[:, columns])[:, 1]))
+
+    full_model, full_auc = fit(feature_names)
+    groups = {
+        group: [position[name] for name in family_feature_names(group) if name in position]
+        for group in feature_families() if group not in COMPOSITE_INPUT_FAMILIES
+    }
+    groups = {group: columns for group, columns in groups.items() if columns}
+    importance = grouped_permutation_importance(full_model, X_val, y_val, groups, seed=seed)
+    scores = {group: importance[group] - cost_weight * costs.get(group, 0.0) for group in groups}
+    log(f"[select] full feature set: {len(feature_names)} features, validation AUC {full_auc:.4f}")
+
+    kept = list(feature_names)
+    dropped, steps = [], []
+    final_auc = full_auc
+    for group in sorted(groups, key=scores.get):
+        removed = set(family_feature_names(group))
+        trial = [name for name in kept if name not in removed]
+        _, auc = fit(trial)
+        accepted = auc >= full_auc - tolerance
+        steps.append({
+            'family': group, 'cost_ms': costs.get(group, 0.0), 'importance': importance[group],
+            'score': scores[group], 'auc': auc, 'dropped': accepted,
+        })
+        log(f"[select] {group:<36}{costs.get(group, 0.0):>8.2f} ms  importance {importance[group]:+.4f}  "
+            f"AUC {auc:.4f}  {'dropped' if accepted else 'kept'}")
+        if accepted:
+            kept, final_auc = trial, auc
+            dropped.append(group)
+    return {
+        'features': kept,
+        'dropped_families': dropped,
+        'full_auc': full_auc,
+        'final_auc': final_auc,
+        'auc_lost': full_auc - final_auc,
+        'tolerance': tolerance,
+        'cost_weight': cost_weight,
+        'costs_ms': dict(costs),
+        'family_ms_saved': sum(costs.get(group, 0.0) for group in dropped),
+        'family_ms_total': sum(costs.values()),
+        'steps': steps,
+    }
+
+
+def format_selection(report: Mapping[str, Any], extraction_ms: Optional[Mapping[str, float]] = None) -> str:
+    """One-paragraph summary of time saved against AUC lost"""
+    lines = [
+        f"Kept {len(report['features'])} features, dropped {len(report['dropped_families'])} families: "
+        f"{', '.join(report['dropped_families']) or 'none'}",
+        f"Validation AUC {report['full_auc']:.4f} -> {report['final_auc']:.4f} "
+        f"({report['auc_lost'] * 100:+.2f} pt lost)",
+        f"Family extraction time saved: {report['family_ms_saved']:.1f} of "
+        f"{report['family_ms_total']:.1f} ms per petition",
+    ]
+    if extraction_ms:
+        lines.append(
+            f"End-to-end extraction: {extraction_ms['full']:.1f} -> {extraction_ms['selected']:.1f} ms per petition"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,283 @@
+"""
+Feature Store
+On-disk cache of extracted petition features in SQLite, keyed by a hash of the
+four text fields and locale within a namespace of pipeline version, keyword
+matching mode, locale variants, lexicon version, feature layout, disabled
+feature families and
+which NLP data (textstat, NLTK punkt/cmudict) was missing at extraction.
+Editing assets/lexicon.json therefore starts a fresh namespace, and rows
+extracted without the NLP data are never served to a process that has it.
+Training, batch scoring and the reference percentile index read through it,
+so only new or edited petitions go through the NLP extraction path.
+
+Usage, from the streamlit_app directory:
+    python -m utils.feature_store warm    # extract the reference data into the store
+    python -m utils.feature_store stats
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR
+from .feature_engineering import TEXT_COLUMNS, FeatureSchema, is_missing
+from .pipeline import PIPELINE_VERSION, missing_nlp_data
+
+STORE_PATH = APP_DIR / '.cache' / 'features.sqlite'
+
+# Keys per SELECT ... IN (...), below SQLite's bound-parameter limit
+QUERY_CHUNK = 500
+
+# Fewest stored reference petitions worth ranking against
+MIN_REFERENCE_ROWS = 100
+
+# Hits and misses of every store in this process, for utils.metrics
+CACHE_TOTALS = {'hits': 0, 'misses': 0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    namespace TEXT PRIMARY KEY,
+    pipeline_version TEXT NOT NULL,
+    keyword_matching TEXT NOT NULL,
+    feature_names TEXT NOT NULL,
+    lexicon_hash TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS features (
+    namespace TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    row BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (namespace, text_hash)
+);
+"""
+
+
+def text_hash(petition: Mapping[str, Any]) -> str:
+    """
+    Hash of everything extraction reads apart from categorical fields
+
+    The four text fields plus the locale, which selects the keyword lexicon.
+    Missing fields hash differently from empty strings.
+    """
+    values = [None if is_missing(petition.get(col)) else str(petition[col]) for col in TEXT_COLUMNS]
+    values.append(None if is_missing(petition.get('original_locale')) else str(petition['original_locale']))
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def encode_categoricals(pipeline, petitions: Sequence[Mapping[str, Any]], matrix: np.ndarray) -> None:
+    """
+    Write each petition's categorical codes into its row, in place
+
+    Rows shared between petitions with the same text hash, or read from the
+    store, carry some other petition's codes until this runs.
+    """
+    lookup = pipeline.categorical_lookup
+    if lookup is None:
+        return
+    for field in lookup.fields:
+        position = pipeline.schema.index.get(f'{field}_encoded')
+        if position is None:
+            continue
+        for i, petition in enumerate(petitions):
+            matrix[i, position] = lookup.encode(field, petition[field]) if field in petition else 0
+
+
+class FeatureStore:
+    """
+    Read-through feature cache for a pipeline
+
+    Stored rows are the pipeline's schema-ordered feature rows. Categorical
+    columns are re-encoded on every read with the pipeline's current
+    encoders, so a store populated under one set of encoders serves another.
+    """
+
+    def __init__(self, pipeline, path: Union[str, Path] = STORE_PATH):
+        self.pipeline = pipeline
+        self.schema: FeatureSchema = pipeline.schema
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The lexicon the pipeline was built with; its hash covers the locale variants
+        self.lexicon_hash = pipeline.lexicon.version_hash
+        # Without it readability and token features are extracted as 0
+        self.missing_nlp_data = missing_nlp_data()
+        self.namespace = hashlib.sha256(json.dumps([
+            PIPELINE_VERSION, pipeline.keyword_matching, self.schema.names,
+            sorted(pipeline.disabled_families), self.lexicon_hash, self.missing_nlp_data,
+            pipeline.locale_variants
+        ]).encode()).hexdigest()[:16]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(namespaces)')}
+            if 'lexicon_hash' not in columns:
+                # Stores created before namespaces recorded the lexicon
+                self._conn.execute("ALTER TABLE namespaces ADD COLUMN lexicon_hash TEXT NOT NULL DEFAULT ''")
+            self._conn.execute(
+                'INSERT OR IGNORE INTO namespaces (namespace, pipeline_version, keyword_matching, '
+                'feature_names, lexicon_hash) VALUES (?, ?, ?, ?, ?)',
+                (self.namespace, PIPELINE_VERSION, pipeline.keyword_matching, json.dumps(self.schema.names),
+                 self.lexicon_hash)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                'SELECT COUNT(*) FROM features WHERE namespace = ?', (self.namespace,)
+            ).fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _fetch(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        rows = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), QUERY_CHUNK):
+                chunk = unique[start:start + QUERY_CHUNK]
+                query = (
+                    'SELECT text_hash, row FROM features WHERE namespace = ? '
+                    f'AND text_hash IN ({",".join("?" * len(chunk))})'
+                )
+                for key, blob in self._conn.execute(query, (self.namespace, *chunk)):
+                    rows[key] = np.frombuffer(blob, dtype=np.float64)
+        return rows
+
+    def _store(self, items: Sequence[tuple]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)',
+                [(self.namespace, key, row.tobytes(), now) for key, row in items]
+            )
+
+    def add(self, petitions: Sequence[Mapping[str, Any]], matrix: np.ndarray) -> None:
+        """Store rows extracted elsewhere, e.g. by worker processes running the same pipeline"""
+        self._store([(text_hash(petition), row) for petition, row in zip(petitions, matrix)])
+
+    def _encode_categoricals(self, petitions: Sequence[Mapping[str, Any]], matrix: np.ndarray) -> None:
+        encode_categoricals(self.pipeline, petitions, matrix)
+
+    def extract_feature_matrix(self, petitions: Sequence[Mapping[str, Any]],
+                               compute_missing: bool = True) -> np.ndarray:
+        """
+        Feature matrix for a batch, extracting only petitions not yet stored
+
+        Args:
+            petitions: Petition dicts with the pipeline's input fields
+            compute_missing: Extract and store unseen petitions; if False
+                their rows are left as NaN
+
+        Returns:
+            Schema-ordered matrix, one row per petition
+        """
+        keys = [text_hash(petition) for petition in petitions]
+        hits, misses = self.hits, self.misses
+        stored = self._fetch(keys)
+        matrix = self.schema.new_matrix(len(petitions))
+        new_rows = {}
+        for i, (key, petition) in enumerate(zip(keys, petitions)):
+            row = stored.get(key, new_rows.get(key))
+            if row is not None:
+                matrix[i] = row
+                self.hits += 1
+            elif compute_missing:
+                self.pipeline.extract_features(petition, out=matrix[i])
+                new_rows[key] = matrix[i].copy()
+                self.misses += 1
+            else:
+                matrix[i] = np.nan
+                self.misses += 1
+        if new_rows:
+            self._store(list(new_rows.items()))
+        CACHE_TOTALS['hits'] += self.hits - hits
+        CACHE_TOTALS['misses'] += self.misses - misses
+        self._encode_categoricals(petitions, matrix)
+        return matrix
+
+
+# ============================================================================
+# REFERENCE PERCENTILE INDEX
+# ============================================================================
+class ReferencePercentiles:
+    """
+    Percentile ranks of feature values against the reference petitions
+
+    Each feature's reference values are sorted once; a lookup is then two
+    binary searches, with ties counting half.
+    """
+
+    def __init__(self, matrix: np.ndarray, names: Sequence[str]):
+        self.sorted = np.sort(matrix, axis=0)
+        self.index = {name: position for position, name in enumerate(names)}
+        self.n_rows = len(matrix)
+
+    def percentile(self, name: str, value: float) -> float:
+        """Share of reference petitions below the value, in percent"""
+        column = self.sorted[:, self.index[name]]
+        below = np.searchsorted(column, value, side='left')
+        at_or_below = np.searchsorted(column, value, side='right')
+        return float((below + at_or_below) / 2 / self.n_rows * 100)
+
+    def percentiles(self, features: Mapping[str, Any], names: Sequence[str]) -> Dict[str, float]:
+        """Percentile ranks for several features of one petition"""
+        return {name: self.percentile(name, features[name]) for name in names if name in self.index}
+
+
+def build_reference_index(store: FeatureStore, petitions: Sequence[Mapping[str, Any]],
+                          compute_missing: bool = False) -> Optional[ReferencePercentiles]:
+    """
+    Percentile index over the reference petitions held in the store
+
+    By default only stored rows are used, so building the index never runs
+    extraction; returns None if fewer than MIN_REFERENCE_ROWS are stored.
+    """
+    matrix = store.extract_feature_matrix(petitions, compute_missing=compute_missing)
+    matrix = matrix[~np.isnan(matrix).any(axis=1)]
+    if len(matrix) < MIN_REFERENCE_ROWS:
+        return None
+    return ReferencePercentiles(matrix, store.schema.names)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .data_processing import load_model_artifacts
+    from .pipeline import StreamlitPetitionPipeline
+
+    parser = argparse.ArgumentParser(description="Petition feature store")
+    parser.add_argument('command', choices=('warm', 'stats'))
+    parser.add_argument('--path', default=str(STORE_PATH), help="SQLite store file")
+    args = parser.parse_args(argv)
+
+    artifacts = load_model_artifacts()
+    pipeline = StreamlitPetitionPipeline.from_artifacts(artifacts)
+    store = FeatureStore(pipeline, args.path)
+    if args.command == 'warm':
+        if artifacts['reference_data'] is None:
+            print("No reference data to extract")
+            return 1
+        records: List[Dict[str, Any]] = artifacts['reference_data'].to_dict('records')
+        start = time.perf_counter()
+        store.extract_feature_matrix(records)
+        print(f"{store.hits} petitions already stored, {store.misses} extracted "
+              f"in {time.perf_counter() - start:.1f}s")
+    print(f"{len(store)} petitions stored for namespace {store.namespace} in {store.path}")
+    if store.missing_nlp_data:
+        print(f"Namespace extracted without {', '.join(store.missing_nlp_data)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
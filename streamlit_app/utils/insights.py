@@ -0,0 +1,392 @@
+"""
+Petition Insights
+Success benchmarks (baseline success rate, success multipliers and the medians
+of successful vs unsuccessful petitions) computed from the processed petition
+data rather than hard-coded. Summaries are cached by data hash; ingesting new
+petitions only measures the new rows, and bootstrap confidence intervals are
+recomputed on the next request.
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from .feature_engineering import scan_html, is_missing, TEXT_COLUMNS
+from .lexicon import get_lexicon
+
+TARGET_COLUMN = 'target_success'
+KEYWORD_CATEGORIES = ('urgency', 'action', 'power', 'authority')
+
+# Per-petition measurements the insights are computed from
+MEASURES = (
+    tuple(f'{col}_length' for col in TEXT_COLUMNS) +
+    tuple(f'{col}_word_count' for col in TEXT_COLUMNS) +
+    ('description_html_tags', 'title_action_count') +
+    tuple(f'description_{category}_count' for category in KEYWORD_CATEGORIES)
+)
+
+# Success ratios: statistic of the measure for successful petitions divided by
+# the same statistic for unsuccessful ones
+RATIOS = {
+    'content_length': ('description_length', 'median'),
+    'professional_formatting': ('description_html_tags', 'mean'),
+    'title_complexity': ('title_length', 'median'),
+    'strategic_language': ('title_action_count', 'mean'),
+    'letter_body_length': ('letter_body_length', 'median'),
+    'urgency_keywords': ('description_urgency_count', 'mean'),
+    'action_keywords': ('description_action_count', 'mean'),
+    'power_keywords': ('description_power_count', 'mean'),
+    'authority_keywords': ('description_authority_count', 'mean'),
+}
+
+# Multipliers shown on the messaging insights page: (ratio, label, category)
+MULTIPLIERS = (
+    ('content_length', 'Content Length', 'Content'),
+    ('professional_formatting', 'Professional Formatting', 'Structure'),
+    ('title_complexity', 'Title Complexity', 'Complexity'),
+    ('strategic_language', 'Strategic Language', 'Language'),
+)
+
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+BOOTSTRAP_CHUNK_SIZE = 200
+BOOTSTRAP_SEED = 42
+
+
+def _static_pair(successful, unsuccessful):
+    return {'successful': successful, 'unsuccessful': unsuccessful}
+
+
+# Figures from the original analysis, served when the processed data cannot be
+# loaded (missing file or pandas not installed)
+STATIC_INSIGHTS = {
+    'data_hash': 'static',
+    'n_petitions': 3081,
+    'n_successful': 715,
+    'baseline_success_rate': 0.232,
+    'baseline_ci': None,
+    'ratios': {
+        'content_length': {'value': 1.65, 'ci': None},
+        'professional_formatting': {'value': 2.03, 'ci': None},
+        'title_complexity': {'value': 1.19, 'ci': None},
+        'strategic_language': {'value': 1.18, 'ci': None},
+        'letter_body_length': {'value': 1.38, 'ci': None},
+        'urgency_keywords': {'value': 1.26, 'ci': None},
+        'action_keywords': {'value': 2.84, 'ci': None},
+        'power_keywords': {'value': 1.90, 'ci': None},
+        'authority_keywords': {'value': 3.56, 'ci': None},
+    },
+    'medians': {
+        'title_length': _static_pair(83, 70),
+        'description_length': _static_pair(1511, 914),
+        'letter_body_length': _static_pair(66, 48),
+        'targeting_description_length': _static_pair(51, 35),
+        'title_word_count': _static_pair(13, 12),
+        'description_word_count': _static_pair(339, 203),
+        'letter_body_word_count': _static_pair(55, 17),
+    },
+    'means': {
+        'description_html_tags': _static_pair(28.8, 14.2),
+    },
+}
+
+
+def _keyword_count(clean_lower: str, keywords: Iterable[str]) -> int:
+    # Substring counts, matching the pipeline's default keyword_matching mode
+    return sum(clean_lower.count(keyword) for keyword in keywords)
+
+
+def petition_measures(petition: Mapping[str, Any], lexicon=None) -> Dict[str, float]:
+    """
+    Measure one petition for the insights
+
+    Args:
+        petition: Mapping with the raw text columns and original_locale
+        lexicon: Lexicon to count keywords with (default: shared lexicon)
+
+    Returns:
+        Dict of measure name to value, covering MEASURES
+    """
+    lexicon = (lexicon or get_lexicon()).for_locale(petition.get('original_locale'))
+    measures = {}
+    for col in TEXT_COLUMNS:
+        text = petition.get(col)
+        raw_text = '' if is_missing(text) else str(text)
+        scan = scan_html(raw_text)
+        clean_text = scan['clean_text']
+        measures[f'{col}_length'] = len(raw_text)
+        measures[f'{col}_word_count'] = len(clean_text.split())
+        if col == 'title':
+            measures['title_action_count'] = _keyword_count(clean_text.lower(), lexicon.keywords('action'))
+        elif col == 'description':
+            measures['description_html_tags'] = scan['tag_count']
+            clean_lower = clean_text.lower()
+            for category in KEYWORD_CATEGORIES:
+                measures[f'description_{category}_count'] = _keyword_count(clean_lower, lexicon.keywords(category))
+    return measures
+
+
+def _records(petitions) -> Iterable[Mapping[str, Any]]:
+    if hasattr(petitions, 'to_dict'):
+        return petitions.to_dict('records')
+    return petitions
+
+
+def _group_statistic(values: np.ndarray, mask: np.ndarray, statistic: str) -> np.ndarray:
+    """Median or mean of values where mask is set, along the last axis"""
+    if statistic == 'median':
+        return np.nanmedian(np.where(mask, values, np.nan), axis=-1)
+    return (values * mask).sum(axis=-1) / mask.sum(axis=-1)
+
+
+def _ratio(successful, unsuccessful):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(successful, unsuccessful)
+
+
+class InsightsEngine:
+    """
+    Accumulates petition measurements and derives the success benchmarks
+
+    Measurements are stored column-wise as NumPy arrays. Every ingest extends
+    them and chains the data hash, so summaries cached under the old hash are
+    simply no longer used.
+    """
+
+    def __init__(self, n_boot: int = DEFAULT_BOOTSTRAP_SAMPLES,
+                 confidence: float = DEFAULT_CONFIDENCE, seed: int = BOOTSTRAP_SEED):
+        self.n_boot = n_boot
+        self.confidence = confidence
+        self.seed = seed
+        self.lexicon = get_lexicon()
+        self._measures = {measure: np.empty(0) for measure in MEASURES}
+        self._success = np.empty(0, dtype=bool)
+        # Keyword counts depend on the lexicon, so its version seeds the hash
+        self._hash = hashlib.sha256(f'insights:{self.lexicon.version_hash}'.encode()).hexdigest()
+        self._summaries: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def data_hash(self) -> str:
+        return self._hash[:16]
+
+    def __len__(self) -> int:
+        return len(self._success)
+
+    def ingest(self, petitions) -> int:
+        """
+        Measure and add petitions with a known outcome
+
+        Args:
+            petitions: DataFrame or iterable of mappings with the text columns
+                and target_success; rows without an outcome are skipped
+
+        Returns:
+            Number of petitions added
+        """
+        rows = [
+            (petition_measures(petition, self.lexicon), bool(petition[TARGET_COLUMN]))
+            for petition in _records(petitions)
+            if not is_missing(petition.get(TARGET_COLUMN))
+        ]
+        if not rows:
+            return 0
+        batch = {measure: np.array([row[0][measure] for row in rows], dtype=float) for measure in MEASURES}
+        success = np.array([row[1] for row in rows], dtype=bool)
+        digest = hashlib.sha256(self._hash.encode())
+        for measure in MEASURES:
+            digest.update(batch[measure].tobytes())
+        digest.update(success.tobytes())
+        with self._lock:
+            for measure in MEASURES:
+                self._measures[measure] = np.concatenate([self._measures[measure], batch[measure]])
+            self._success = np.concatenate([self._success, success])
+            self._hash = digest.hexdigest()
+        return len(rows)
+
+    def summary(self, with_ci: bool = True) -> Dict[str, Any]:
+        """
+        Benchmarks for the current data, cached by data hash
+
+        Args:
+            with_ci: Include bootstrap confidence intervals for the baseline
+                and the success ratios
+
+        Returns:
+            Dict shaped like STATIC_INSIGHTS
+        """
+        with self._lock:
+            key = (self.data_hash, with_ci)
+            if key not in self._summaries:
+                self._summaries = {k: v for k, v in self._summaries.items() if k[0] == self.data_hash}
+                self._summaries[key] = self._compute(with_ci)
+            return self._summaries[key]
+
+    def _compute(self, with_ci: bool) -> Dict[str, Any]:
+        success = self._success
+        failure = ~success
+        summary = {
+            'data_hash': self.data_hash,
+            'n_petitions': int(len(success)),
+            'n_successful': int(success.sum()),
+            'baseline_success_rate': float(success.mean()) if len(success) else 0.0,
+            'baseline_ci': None,
+            'ratios': {},
+            'medians': {},
+            'means': {},
+        }
+        for measure, values in self._measures.items():
+            summary['medians'][measure] = {
+                'successful': float(np.median(values[success])) if success.any() else 0.0,
+                'unsuccessful': float(np.median(values[failure])) if failure.any() else 0.0,
+            }
+            summary['means'][measure] = {
+                'successful': float(values[success].mean()) if success.any() else 0.0,
+                'unsuccessful': float(values[failure].mean()) if failure.any() else 0.0,
+            }
+        for name, (measure, statistic) in RATIOS.items():
+            group = summary['medians' if statistic == 'median' else 'means'][measure]
+            summary['ratios'][name] = {
+                'value': float(_ratio(group['successful'], group['unsuccessful'])),
+                'ci': None,
+            }
+        if with_ci and success.any() and failure.any():
+            baseline_ci, ratio_cis = self._bootstrap()
+            summary['baseline_ci'] = baseline_ci
+            for name, ci in ratio_cis.items():
+                summary['ratios'][name]['ci'] = ci
+        return summary
+
+    def _bootstrap(self) -> Tuple[Tuple[float, float], Dict[str, Tuple[float, float]]]:
+        """Percentile bootstrap over petitions, resampled in chunks of whole index matrices"""
+        rng = np.random.default_rng(self.seed)
+        n = len(self._success)
+        baseline = []
+        ratios = {name: [] for name in RATIOS}
+        for start in range(0, self.n_boot, BOOTSTRAP_CHUNK_SIZE):
+            size = min(BOOTSTRAP_CHUNK_SIZE, self.n_boot - start)
+            idx = rng.integers(0, n, size=(size, n))
+            success = self._success[idx]
+            baseline.append(success.mean(axis=1))
+            for name, (measure, statistic) in RATIOS.items():
+                values = self._measures[measure][idx]
+                ratios[name].append(_ratio(
+                    _group_statistic(values, success, statistic),
+                    _group_statistic(values, ~success, statistic)
+                ))
+        tail = (1 - self.confidence) / 2 * 100
+
+        def interval(samples):
+            samples = np.concatenate(samples)
+            samples = samples[np.isfinite(samples)]
+            if not len(samples):
+                return None
+            low, high = np.percentile(samples, [tail, 100 - tail])
+            return float(low), float(high)
+
+        return interval(baseline), {name: interval(samples) for name, samples in ratios.items()}
+
+
+# ============================================================================
+# SHARED ENGINE
+# ============================================================================
+_engines: Dict[str, Tuple[Tuple[int, int, str], InsightsEngine]] = {}
+# Petitions added through ingest_petitions, per data directory; they are not in
+# the data file, so a rebuilt engine measures them again
+_ingested: Dict[str, List[Dict[str, Any]]] = {}
+_engines_lock = threading.Lock()
+
+
+def _data_file(data_dir: Path) -> Optional[Path]:
+    for name in ('processed_petition_data.xlsx', 'processed_petition_data.csv'):
+        if (data_dir / name).exists():
+            return data_dir / name
+    return None
+
+
+def get_insights_engine(data_dir: Union[str, Path, None] = None) -> Optional[InsightsEngine]:
+    """
+    Process-wide engine loaded from the processed petition data
+
+    The engine is rebuilt when the data file's mtime or size changes or the
+    lexicon is reloaded. Petitions added through ingest_petitions are carried
+    over, except those the data file now contains. Returns None when the data
+    is unavailable.
+    """
+    from .data_processing import DATA_DIR, load_reference_data
+
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    path = _data_file(data_dir)
+    if path is None:
+        return None
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size, get_lexicon().version_hash)
+    with _engines_lock:
+        cached = _engines.get(str(data_dir))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        try:
+            data = load_reference_data(data_dir)
+        except ImportError:
+            return None
+        if data is None:
+            return None
+        engine = InsightsEngine()
+        engine.ingest(data)
+        ingested = _ingested.get(str(data_dir))
+        if ingested:
+            known = set(data['petition_id']) if 'petition_id' in data.columns else set()
+            engine.ingest([petition for petition in ingested if petition.get('petition_id') not in known])
+        _engines[str(data_dir)] = (signature, engine)
+        return engine
+
+
+def loaded_petition_insights(data_dir: Union[str, Path, None] = None) -> Dict[str, Any]:
+    """
+    Point estimates of the engine if it is already loaded, else STATIC_INSIGHTS
+
+    Never reads the data file, so text helpers can use it on every call
+    without paying for the first load.
+    """
+    from .data_processing import DATA_DIR
+
+    with _engines_lock:
+        cached = _engines.get(str(Path(data_dir) if data_dir is not None else DATA_DIR))
+    if cached is None or not len(cached[1]):
+        return STATIC_INSIGHTS
+    return cached[1].summary(with_ci=False)
+
+
+def ratio_changes(insights: Mapping[str, Any]) -> List[Tuple[str, float, float]]:
+    """(ratio, computed value, original figure) for ratios that differ from STATIC_INSIGHTS at 2 decimals"""
+    changes = []
+    for name, ratio in insights['ratios'].items():
+        original = STATIC_INSIGHTS['ratios'][name]['value']
+        if round(ratio['value'], 2) != round(original, 2):
+            changes.append((name, ratio['value'], original))
+    return changes
+
+
+def get_petition_insights(with_ci: bool = True, data_dir: Union[str, Path, None] = None) -> Dict[str, Any]:
+    """Benchmarks computed from the data, or STATIC_INSIGHTS if it cannot be loaded"""
+    engine = get_insights_engine(data_dir)
+    if engine is None or not len(engine):
+        return STATIC_INSIGHTS
+    return engine.summary(with_ci)
+
+
+def ingest_petitions(petitions, data_dir: Union[str, Path, None] = None) -> int:
+    """Add newly labelled petitions to the shared engine; returns the number added"""
+    from .data_processing import DATA_DIR
+
+    if get_insights_engine(data_dir) is None:
+        return 0
+    key = str(Path(data_dir) if data_dir is not None else DATA_DIR)
+    records = [dict(petition) for petition in _records(petitions) if not is_missing(petition.get(TARGET_COLUMN))]
+    with _engines_lock:
+        _ingested.setdefault(key, []).extend(records)
+        # The engine may have been rebuilt since it was fetched
+        return _engines[key][1].ingest(records)
@@ -0,0 +1,186 @@
+"""
+Lexicon Registry
+Loads the shared keyword lexicon (assets/lexicon.json) once per process and
+hot-reloads it when the file changes
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+from .feature_engineering import KeywordMatcher
+
+LEXICON_PATH = Path(__file__).resolve().parent.parent / 'assets' / 'lexicon.json'
+
+# Minimum seconds between file stat checks for hot reload
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+# Statistics units used when the lexicon file does not list any
+DEFAULT_STATISTICS_UNITS = ('percent', 'million', 'thousand', 'billion')
+
+
+def compile_statistics_pattern(units: Tuple[str, ...]) -> 're.Pattern':
+    """Regex matching percentages and numbers followed by a statistics unit"""
+    alternatives = '|'.join(re.escape(unit).replace(r'\ ', r'\s+') for unit in units)
+    return re.compile(rf'\d+%|\d+\s*({alternatives})', re.IGNORECASE)
+
+
+class Lexicon:
+    """Immutable, compiled keyword lexicon"""
+
+    __slots__ = ('version', 'version_hash', 'locale', 'categories', 'statistics_units',
+                 'statistics_pattern', 'matcher', 'path', '_locales', '_locale_cache')
+
+    def __init__(self, version: str, version_hash: str,
+                 categories: Mapping[str, Tuple[str, ...]], path: Optional[Path] = None,
+                 statistics_units: Tuple[str, ...] = DEFAULT_STATISTICS_UNITS,
+                 locales: Optional[Mapping[str, Any]] = None, locale: Optional[str] = None):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'version_hash', version_hash)
+        object.__setattr__(self, 'locale', locale)
+        object.__setattr__(self, 'categories', MappingProxyType(dict(categories)))
+        object.__setattr__(self, 'statistics_units', tuple(statistics_units))
+        object.__setattr__(self, 'statistics_pattern', compile_statistics_pattern(self.statistics_units))
+        object.__setattr__(self, 'matcher', KeywordMatcher(self.categories))
+        object.__setattr__(self, 'path', path)
+        object.__setattr__(self, '_locales', MappingProxyType(dict(locales or {})))
+        object.__setattr__(self, '_locale_cache', {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Lexicon is immutable")
+
+    def keywords(self, category: str) -> Tuple[str, ...]:
+        """Keywords for one category"""
+        return self.categories[category]
+
+    @property
+    def locales(self) -> Tuple[str, ...]:
+        """Locales with their own keyword variants"""
+        return tuple(self._locales)
+
+    def for_locale(self, locale: Optional[str]) -> 'Lexicon':
+        """
+        Lexicon extended with the variants configured for a locale
+
+        Locale lexicons are compiled on first use and cached on this
+        instance, so a reload of the lexicon file drops them together with
+        the base lexicon. Unknown or empty locales return the base lexicon.
+
+        Args:
+            locale: Locale code such as 'en-IN' or 'en-GB'
+
+        Returns:
+            Lexicon whose categories and statistics pattern include the
+            locale's additions
+        """
+        if self.locale is not None or not locale or locale not in self._locales:
+            return self
+        cached = self._locale_cache.get(locale)
+        if cached is not None:
+            return cached
+
+        overrides = self._locales[locale] or {}
+        categories = dict(self.categories)
+        for name, extra in overrides.get('categories', {}).items():
+            base = categories.get(name, ())
+            categories[name] = base + tuple(word for word in extra if word not in base)
+        units = self.statistics_units + tuple(
+            unit for unit in overrides.get('statistics_units', ()) if unit not in self.statistics_units
+        )
+        localized = Lexicon(
+            version=self.version,
+            version_hash=f"{self.version_hash}:{locale}",
+            categories=categories,
+            path=self.path,
+            statistics_units=units,
+            locale=locale
+        )
+        # setdefault keeps the first compiled copy if two threads race here
+        return self._locale_cache.setdefault(locale, localized)
+
+    def __repr__(self) -> str:
+        locale = f", locale={self.locale!r}" if self.locale else ''
+        return (f"Lexicon(version={self.version!r}, hash={self.version_hash!r}{locale}, "
+                f"categories={list(self.categories)})")
+
+
+def parse_lexicon(raw: bytes, path: Optional[Path] = None) -> Lexicon:
+    """Build a Lexicon from the raw bytes of a lexicon file"""
+    data = json.loads(raw.decode('utf-8'))
+    categories = data.get('categories')
+    if not isinstance(categories, dict) or not categories:
+        raise ValueError(f"Lexicon file {path} has no 'categories' mapping")
+    invalid = [name for name, words in categories.items() if not isinstance(words, list)]
+    if invalid:
+        raise ValueError(f"Lexicon file {path} has categories that are not lists: {', '.join(invalid)}")
+    return Lexicon(
+        version=str(data.get('version', '0')),
+        # Hash of the whole file, so locale variants change it too
+        version_hash=hashlib.sha256(raw).hexdigest()[:12],
+        categories={name: tuple(words) for name, words in categories.items()},
+        path=path,
+        statistics_units=tuple(data.get('statistics_units', DEFAULT_STATISTICS_UNITS)),
+        locales=data.get('locales', {})
+    )
+
+
+class _LexiconCache:
+    """Per-process cache entry for one lexicon file"""
+
+    def __init__(self):
+        self.lexicon = None
+        self.signature = None
+        self.checked_at = 0.0
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_lexicon(path: Optional[Path] = None) -> Lexicon:
+    """
+    Return the compiled lexicon, reloading it if the file has changed
+
+    The file is stat'ed at most once per RELOAD_CHECK_INTERVAL; when its
+    mtime or size changes the lexicon is rebuilt and swapped in atomically,
+    so edits take effect without restarting the app. If the file cannot be
+    read or parsed, the last good lexicon keeps serving.
+
+    Args:
+        path: Lexicon file, defaults to assets/lexicon.json
+
+    Returns:
+        Lexicon instance shared by all callers in this process
+    """
+    path = Path(path) if path else LEXICON_PATH
+    now = time.monotonic()
+    entry = _cache.get(path)
+    if entry is not None and entry.lexicon is not None and now - entry.checked_at < RELOAD_CHECK_INTERVAL:
+        return entry.lexicon
+
+    with _lock:
+        entry = _cache.setdefault(path, _LexiconCache())
+        try:
+            # The file can be missing for a moment while an editor replaces it
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if entry.lexicon is None or signature != entry.signature:
+                entry.lexicon = parse_lexicon(path.read_bytes(), path)
+                entry.signature = signature
+        except (OSError, ValueError, TypeError):
+            if entry.lexicon is None:
+                raise
+        entry.checked_at = now
+        return entry.lexicon
+
+
+def lexicon_version_hash(path: Optional[Path] = None) -> str:
+    """Short content hash of the current lexicon, for use in cache keys"""
+    return get_lexicon(path).version_hash
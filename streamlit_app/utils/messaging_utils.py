@@ -1,41 +1,38 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional
+
+from .insights import get_petition_insights, loaded_petition_insights
+from .lexicon import get_lexicon
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class MessagingAnalyzer:
     """
     Utility class for analyzing petition messaging based on the research insights
     """
     
-    def __init__(self):
-        self.urgency_keywords = [
-            'urgent', 'immediate', 'immediately', 'now', 'today', 'emergency', 'crisis',
-            'deadline', 'time running out', "before it's too late", 'last chance',
-            'act now', 'breaking', 'critical', 'asap', 'quickly', 'rapidly', 'soon'
-        ]
-        
-        self.action_keywords = [
-            'stop', 'save', 'protect', 'demand', 'fight', 'defend', 'prevent',
-            'ban', 'end', 'cancel', 'reverse', 'change', 'fix', 'solve',
-            'help', 'support', 'join', 'sign', 'act', 'take action', 'make'
-        ]
-        
-        self.power_words = [
-            'justice', 'freedom', 'rights', 'equality', 'fair', 'unfair', 'wrong',
-            'illegal', 'violation', 'abuse', 'corruption', 'scandal', 'outrage',
-            'discrimination', 'injustice', 'betrayal', 'exploitation', 'oppression'
-        ]
-        
-        self.authority_keywords = [
-            'government', 'minister', 'ministry', 'department', 'authority', 'official',
-            'court', 'judge', 'police', 'administration', 'commissioner', 'director',
-            'secretary', 'chief', 'president', 'prime minister', 'governor', 'congress'
-        ]
+    # Read from the lexicon on every use, so an analyzer kept across reruns
+    # follows edits to assets/lexicon.json
+    @property
+    def urgency_keywords(self) -> List[str]:
+        return list(get_lexicon().keywords('urgency'))
+
+    @property
+    def action_keywords(self) -> List[str]:
+        return list(get_lexicon().keywords('action'))
+
+    @property
+    def power_words(self) -> List[str]:
+        return list(get_lexicon().keywords('power'))
+
+    @property
+    def authority_keywords(self) -> List[str]:
+        return list(get_lexicon().keywords('authority'))
+
+    @property
+    def keyword_matcher(self):
+        return get_lexicon().matcher
     
     def analyze_content(self, title: str, description: str, letter_body: str = "") -> Dict:
         """
@@ -62,14 +59,15 @@ class MessagingAnalyzer:
         if not text:
             return {}
         
+        keyword_counts = self.keyword_matcher.count(text)
         analysis = {
             'length': len(text),
             'word_count': len(text.split()),
             'sentence_count': len(re.split(r'[.!?]+', text)),
-            'urgency_keywords': self._count_keywords(text, self.urgency_keywords),
-            'action_keywords': self._count_keywords(text, self.action_keywords),
-            'power_words': self._count_keywords(text, self.power_words),
-            'authority_keywords': self._count_keywords(text, self.authority_keywords),
+            'urgency_keywords': keyword_counts['urgency'],
+            'action_keywords': keyword_counts['action'],
+            'power_words': keyword_counts['power'],
+            'authority_keywords': keyword_counts['authority'],
             'html_tags': len(re.findall(r'<[^>]+>', text)),
             'has_numbers': bool(re.search(r'\d+', text)),
             'readability_estimate': self._estimate_readability(text)
@@ -82,14 +80,6 @@ class MessagingAnalyzer:
         
         return analysis
     
-    def _count_keywords(self, text: str, keywords: List[str]) -> int:
-        """Count occurrences of keywords in text"""
-        text_lower = text.lower()
-        count = 0
-        for keyword in keywords:
-            count += text_lower.count(keyword.lower())
-        return count
-    
     def _estimate_readability(self, text: str) -> str:
         """Estimate readability level based on sentence and word complexity"""
         if not text:
@@ -116,23 +106,25 @@ class MessagingAnalyzer:
     
     def _get_benchmarks(self, component_type: str) -> Dict:
         """Get optimization benchmarks for each component type"""
+        # The data's medians once the insights are loaded; the original figures until then
+        medians = loaded_petition_insights()['medians']
         benchmarks = {
             'title': {
                 'min_length': 80,
-                'optimal_length': 83,
+                'optimal_length': medians['title_length']['successful'],
                 'min_keywords': 2,
                 'target_readability': 'Graduate Level'
             },
             'description': {
                 'min_length': 1500,
-                'optimal_length': 1511,
+                'optimal_length': medians['description_length']['successful'],
                 'min_html_tags': 25,
                 'min_keywords': 5,
                 'target_readability': 'Graduate Level'
             },
             'letter': {
                 'min_length': 65,
-                'optimal_length': 66,
+                'optimal_length': medians['letter_body_length']['successful'],
                 'min_keywords': 1,
                 'target_readability': 'College Level'
             }
@@ -242,6 +234,7 @@ class MessagingAnalyzer:
 
 def create_content_analyzer_widget():
     """Create an interactive content analyzer widget"""
+    import streamlit as st
     st.subheader("🔍 Live Content Analyzer")
     st.write("Analyze your petition content against our success framework:")
     
@@ -340,6 +333,7 @@ def create_content_analyzer_widget():
 
 def display_component_analysis(component_name: str, analysis: Dict):
     """Display detailed analysis for a content component"""
+    import streamlit as st
     col1, col2 = st.columns(2)
     
     with col1:
@@ -372,15 +366,22 @@ def display_component_analysis(component_name: str, analysis: Dict):
 
 def create_success_probability_predictor():
     """Create a success probability prediction tool"""
+    import streamlit as st
     st.subheader("🎯 Success Probability Predictor")
     st.write("Input petition characteristics to estimate success probability:")
     
+    # Benchmarks computed from the petition data
+    insights = get_petition_insights(with_ci=False)
+    baseline_rate = insights['baseline_success_rate'] * 100
+    title_benchmark = int(round(insights['medians']['title_length']['successful']))
+    desc_benchmark = int(round(insights['medians']['description_length']['successful']))
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.write("**Content Characteristics:**")
-        title_length = st.slider("Title Length (characters)", 20, 200, 83)
-        desc_length = st.slider("Description Length (characters)", 100, 3000, 1511)
+        title_length = st.slider("Title Length (characters)", 20, 200, title_benchmark)
+        desc_length = st.slider("Description Length (characters)", 100, 3000, desc_benchmark)
         html_tags = st.slider("HTML Formatting Tags", 0, 50, 25)
         
     with col2:
@@ -391,14 +392,14 @@ def create_success_probability_predictor():
         professional_tone = st.checkbox("Professional/Formal Tone", value=True)
     
     # Calculate success probability based on research insights
-    base_probability = 23.2  # Baseline success rate
+    base_probability = baseline_rate  # Baseline success rate
     
     # Length adjustments (based on quartile analysis)
-    if title_length >= 83:
+    if title_length >= title_benchmark:
         base_probability *= 1.3  # Long titles perform better
     
-    if desc_length >= 1511:
-        base_probability *= 1.65  # Very long descriptions have highest success
+    if desc_length >= desc_benchmark:
+        base_probability *= insights['ratios']['content_length']['value']  # Very long descriptions have highest success
     elif desc_length >= 1000:
         base_probability *= 1.3
     
@@ -433,7 +434,7 @@ def create_success_probability_predictor():
         st.metric(
             label="Predicted Success Rate",
             value=f"{predicted_probability:.1f}%",
-            delta=f"+{predicted_probability - 23.2:.1f}pp vs baseline"
+            delta=f"+{predicted_probability - baseline_rate:.1f}pp vs baseline"
         )
     
     with col2:
@@ -445,7 +446,7 @@ def create_success_probability_predictor():
         )
     
     with col3:
-        improvement_factor = predicted_probability / 23.2
+        improvement_factor = predicted_probability / baseline_rate
         st.metric(
             label="Improvement Factor",
             value=f"{improvement_factor:.1f}x",
@@ -462,8 +463,9 @@ def create_success_probability_predictor():
 
 
 # Additional utility functions for the main app
-def load_example_petitions() -> pd.DataFrame:
+def load_example_petitions() -> 'pd.DataFrame':
     """Load example petition data for demonstration"""
+    import pandas as pd
     examples = {
         'Title': [
             'Mandatory Installation of Oxygen Plants in All Hospitals Above 50 Beds',
@@ -480,6 +482,7 @@ def load_example_petitions() -> pd.DataFrame:
 
 def create_case_study_examples():
     """Create case study examples tab"""
+    import streamlit as st
     st.subheader("📚 Success Case Studies")
     
     case_studies = {
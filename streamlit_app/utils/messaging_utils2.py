@@ -4,42 +4,26 @@ Support functions for petition optimization and analysis
 """
 
 import re
-import pandas as pd
-import numpy as np
 from typing import Dict, List, Tuple, Any
-import streamlit as st
-
-# Keyword categories based on analysis results
-URGENCY_KEYWORDS = [
-    'urgent', 'immediate', 'immediately', 'now', 'today', 'emergency', 'crisis',
-    'deadline', 'time running out', "before it's too late", 'last chance',
-    'act now', 'breaking', 'critical', 'asap', 'quickly', 'rapidly', 'soon',
-    'time sensitive', 'expires', 'final notice', 'running out', 'closing soon',
-    'minutes left', 'hours left', 'act fast', 'clock is ticking'
-]
-
-ACTION_KEYWORDS = [
-    'stop', 'save', 'protect', 'demand', 'fight', 'defend', 'prevent',
-    'ban', 'end', 'cancel', 'reverse', 'change', 'fix', 'solve',
-    'help', 'support', 'join', 'sign', 'act', 'take action', 'make',
-    'force', 'require', 'ensure', 'guarantee', 'implement', 'establish',
-    'mandate', 'enforce', 'commit', 'pledge', 'promise', 'repeal'
-]
-
-POWER_KEYWORDS = [
-    'justice', 'freedom', 'rights', 'equality', 'fair', 'unfair', 'wrong',
-    'illegal', 'violation', 'abuse', 'corruption', 'scandal', 'outrage',
-    'discrimination', 'injustice', 'betrayal', 'exploitation', 'oppression',
-    'accountability', 'threat', 'dangerous', 'devastating', 'unjust',
-    'systemic', 'outrageous', 'unconscionable', 'inexcusable', 'intolerable'
-]
-
-AUTHORITY_KEYWORDS = [
-    'government', 'minister', 'ministry', 'department', 'authority', 'official',
-    'court', 'judge', 'police', 'administration', 'commissioner', 'director',
-    'secretary', 'chief', 'president', 'prime minister', 'governor', 'congress',
-    'senate', 'parliament', 'agency', 'council', 'board of directors', 'ceo'
-]
+
+from .insights import get_petition_insights, loaded_petition_insights
+from .lexicon import get_lexicon
+
+# Keyword categories live in the shared lexicon (assets/lexicon.json)
+KEYWORD_CATEGORIES = ('urgency', 'action', 'power', 'authority')
+
+_LEXICON_CONSTANTS = {
+    'URGENCY_KEYWORDS': 'urgency',
+    'ACTION_KEYWORDS': 'action',
+    'POWER_KEYWORDS': 'power',
+    'AUTHORITY_KEYWORDS': 'authority'
+}
+
+def __getattr__(name: str):
+    """Serve the legacy *_KEYWORDS constants from the current lexicon"""
+    if name in _LEXICON_CONSTANTS:
+        return list(get_lexicon().keywords(_LEXICON_CONSTANTS[name]))
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def analyze_text_content(text: str) -> Dict[str, Any]:
     """
@@ -70,7 +54,7 @@ def analyze_text_content(text: str) -> Dict[str, Any]:
     keyword_scores = analyze_keywords(text)
     
     # Readability estimation (simplified)
-    avg_word_length = np.mean([len(word) for word in words]) if words else 0
+    avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
     readability_estimate = min(max(avg_word_length * 2, 1), 20)  # Rough grade level estimate
     
     # Optimization score calculation
@@ -103,14 +87,8 @@ def analyze_keywords(text: str) -> Dict[str, int]:
     Returns:
         Dictionary with keyword counts by category
     """
-    text_lower = text.lower()
-    
-    return {
-        'urgency': sum(1 for keyword in URGENCY_KEYWORDS if keyword in text_lower),
-        'action': sum(1 for keyword in ACTION_KEYWORDS if keyword in text_lower),
-        'power': sum(1 for keyword in POWER_KEYWORDS if keyword in text_lower),
-        'authority': sum(1 for keyword in AUTHORITY_KEYWORDS if keyword in text_lower)
-    }
+    counts = get_lexicon().matcher.count(text, distinct=True)
+    return {category: counts[category] for category in KEYWORD_CATEGORIES}
 
 def calculate_optimization_score(
     length: int, 
@@ -133,7 +111,9 @@ def calculate_optimization_score(
     score = 0
     
     # Length scoring (based on benchmarks)
-    if length >= 1511:  # Description optimal length
+    # The data's median once the insights are loaded; the original figure until then
+    optimal_length = loaded_petition_insights()['medians']['description_length']['successful']
+    if length >= optimal_length:  # Description optimal length
         score += 30
     elif length >= 800:
         score += 20
@@ -260,6 +240,8 @@ def format_optimization_display(analysis: Dict[str, Any]) -> None:
     Args:
         analysis: Analysis results from analyze_text_content
     """
+    import streamlit as st
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -295,41 +277,43 @@ def format_optimization_display(analysis: Dict[str, Any]) -> None:
 
 def get_success_benchmarks() -> Dict[str, Any]:
     """
-    Return success benchmarks based on analysis
+    Return success benchmarks computed from the petition data
     
     Returns:
         Dictionary containing success benchmarks for different components
     """
+    insights = get_petition_insights(with_ci=False)
+    medians = insights['medians']
+    ratios = insights['ratios']
+    html_tags = insights['means']['description_html_tags']
     return {
         'title': {
-            'length_median_successful': 83,
-            'length_median_unsuccessful': 70,
-            'words_median_successful': 13,
-            'words_median_unsuccessful': 12,
+            'length_median_successful': medians['title_length']['successful'],
+            'length_median_unsuccessful': medians['title_length']['unsuccessful'],
+            'words_median_successful': medians['title_word_count']['successful'],
+            'words_median_unsuccessful': medians['title_word_count']['unsuccessful'],
             'optimal_complexity': 12,  # Grade level
-            'success_advantage': 1.19
+            'success_advantage': round(ratios['title_complexity']['value'], 2)
         },
         'description': {
-            'length_median_successful': 1511,
-            'length_median_unsuccessful': 914,
-            'words_median_successful': 339,
-            'words_median_unsuccessful': 203,
-            'html_tags_successful': 28.8,
-            'html_tags_unsuccessful': 14.2,
-            'success_advantage': 1.65
+            'length_median_successful': medians['description_length']['successful'],
+            'length_median_unsuccessful': medians['description_length']['unsuccessful'],
+            'words_median_successful': medians['description_word_count']['successful'],
+            'words_median_unsuccessful': medians['description_word_count']['unsuccessful'],
+            'html_tags_successful': round(html_tags['successful'], 1),
+            'html_tags_unsuccessful': round(html_tags['unsuccessful'], 1),
+            'success_advantage': round(ratios['content_length']['value'], 2)
         },
         'letter_body': {
-            'length_median_successful': 66,
-            'length_median_unsuccessful': 48,
-            'words_median_successful': 55,
-            'words_median_unsuccessful': 17,
-            'success_advantage': 1.38
+            'length_median_successful': medians['letter_body_length']['successful'],
+            'length_median_unsuccessful': medians['letter_body_length']['unsuccessful'],
+            'words_median_successful': medians['letter_body_word_count']['successful'],
+            'words_median_unsuccessful': medians['letter_body_word_count']['unsuccessful'],
+            'success_advantage': round(ratios['letter_body_length']['value'], 2)
         },
         'keywords': {
-            'urgency_advantage': 1.26,
-            'action_advantage': 2.84,
-            'power_advantage': 1.90,
-            'authority_advantage': 3.56
+            f'{category}_advantage': round(ratios[f'{category}_keywords']['value'], 2)
+            for category in KEYWORD_CATEGORIES
         },
         'overall': {
             'content_comprehensiveness_improvement': 3.928,  # 392.8%
@@ -410,7 +394,7 @@ def calculate_success_probability(
     probability = (total_score / max_score) * 100
     
     # Adjust based on historical performance
-    base_success_rate = 23.2  # Historical baseline
+    base_success_rate = get_petition_insights(with_ci=False)['baseline_success_rate'] * 100  # Historical baseline
     improvement_factor = probability / 100
     adjusted_probability = base_success_rate + (improvement_factor * 40)  # Max ~63% success rate
     
@@ -616,7 +600,10 @@ Direct Appeal to Authority:
 """
         },
         'tools': {
-            'keyword_checker': URGENCY_KEYWORDS + ACTION_KEYWORDS + POWER_KEYWORDS + AUTHORITY_KEYWORDS,
+            'keyword_checker': [
+                keyword for category in KEYWORD_CATEGORIES
+                for keyword in get_lexicon().keywords(category)
+            ],
             'length_calculator': get_success_benchmarks(),
             'formatting_validator': "Check for 25+ HTML tags",
             'readability_target': "12+ grade level complexity"
@@ -627,7 +614,6 @@ Direct Appeal to Authority:
 
 # Streamlit helper functions for UI components
 
-@st.cache_data
 def load_sample_campaigns():
     """Load sample campaign data for demonstrations"""
     return {
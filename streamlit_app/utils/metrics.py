@@ -0,0 +1,261 @@
+"""
+Scoring Metrics
+Counters, latency histograms and gauges of the analysing process in the
+Prometheus text exposition format. The analyzer records each analysis (and
+its StageTimer laps, see utils.timing); caches and loaded models report
+through collectors read at scrape time.
+
+Two exporters, both without any external collector:
+    - a textfile, rewritten atomically every EXPORT_SECONDS (logs/metrics.prom),
+      also readable by node_exporter's textfile collector
+    - an HTTP endpoint, when PETITION_METRICS_PORT is set:
+      curl localhost:9464/metrics
+
+Set PETITION_METRICS=1 (or PETITION_METRICS_PORT) to turn metrics on.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .data_processing import APP_DIR
+from .timing import StageTimer, stage_name
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = APP_DIR / 'logs' / 'metrics.prom'
+EXPORT_SECONDS = 15
+PORT = int(os.environ.get('PETITION_METRICS_PORT') or 0)
+ENABLED = bool(PORT) or os.environ.get('PETITION_METRICS', '') not in ('', '0', 'false')
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'petition_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# (name, type, help, labels, value) samples returned by collectors
+Sample = Tuple[str, str, str, Mapping[str, str], float]
+
+
+class Histogram:
+    """Cumulative Prometheus histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: Mapping[str, str]) -> List[str]:
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            out.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+        out.append(f"{name}_sum{_labels(labels)} {self.sum!r}")
+        out.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return out
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def process_rss_bytes() -> float:
+    """Resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    """Registry of the process's scoring metrics"""
+
+    def __init__(self):
+        self.analyses: Dict[Tuple[str, str], int] = {}
+        self.latency: Dict[str, Histogram] = {}
+        self.stages: Dict[str, Histogram] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = [self._process_samples]
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record_analysis(self, model_artifacts: Optional[Mapping[str, Any]], seconds: float,
+                        timer: Optional[StageTimer] = None, outcome: str = 'ok') -> None:
+        """
+        Count one analysis and observe its latency
+
+        Args:
+            model_artifacts: Artifacts that scored it; None for the demo score
+            timer: StageTimer of the analysis, for per-stage histograms
+            outcome: 'ok', or 'fallback' when the model failed
+        """
+        version = str(model_artifacts.get('version', '')) if model_artifacts else 'demo'
+        with self._lock:
+            key = (version, outcome)
+            self.analyses[key] = self.analyses.get(key, 0) + 1
+            histogram = self.latency.get(version)
+            if histogram is None:
+                histogram = self.latency[version] = Histogram()
+            histogram.observe(seconds)
+            if isinstance(timer, StageTimer):
+                for stage_key, stage_seconds in timer.laps.items():
+                    name = stage_name(stage_key)
+                    histogram = self.stages.get(name)
+                    if histogram is None:
+                        histogram = self.stages[name] = Histogram()
+                    histogram.observe(stage_seconds)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callable returning samples, read on every render"""
+        self.collectors.append(collector)
+
+    def _process_samples(self) -> Iterable[Sample]:
+        yield ('process_resident_memory_bytes', 'gauge', "Resident memory size in bytes", {},
+               process_rss_bytes())
+        yield ('process_start_time_seconds', 'gauge', "Start time of the process since unix epoch", {},
+               self.started)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        lines: List[str] = []
+        with self._lock:
+            lines += [f"# HELP {PREFIX}analyses_total Petition analyses served",
+                      f"# TYPE {PREFIX}analyses_total counter"]
+            lines += [f"{PREFIX}analyses_total{_labels({'version': version, 'outcome': outcome})} {count}"
+                      for (version, outcome), count in sorted(self.analyses.items())]
+            lines += [f"# HELP {PREFIX}analysis_duration_seconds Time from submit to prediction",
+                      f"# TYPE {PREFIX}analysis_duration_seconds histogram"]
+            for version, histogram in sorted(self.latency.items()):
+                lines += histogram.lines(f'{PREFIX}analysis_duration_seconds', {'version': version})
+            lines += [f"# HELP {PREFIX}stage_duration_seconds Time per analysis stage",
+                      f"# TYPE {PREFIX}stage_duration_seconds histogram"]
+            for stage, histogram in sorted(self.stages.items()):
+                lines += histogram.lines(f'{PREFIX}stage_duration_seconds', {'stage': stage})
+        # Samples of one metric must be contiguous, whichever collectors report it
+        families: Dict[str, List[str]] = {}
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning("Metrics collector %s failed: %s", getattr(collector, '__name__', collector), e)
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if name not in families:
+                    families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                families[name].append(f"{name}{_labels(labels)} {float(value)!r}")
+        for family in families.values():
+            lines += family
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# COLLECTORS
+# ============================================================================
+def live_models_samples(live_models, pointer: str = 'current') -> Callable[[], Iterable[Sample]]:
+    """Collector for a LiveModels: served version, load times and cache hits"""
+    def collect() -> Iterable[Sample]:
+        labels = {'pointer': pointer}
+        yield (f'{PREFIX}artifact_requests_total', 'counter', "Model artifact lookups", labels,
+               live_models.requests)
+        yield (f'{PREFIX}artifact_loads_total', 'counter', "Model versions loaded from disk", labels,
+               live_models.loads)
+        yield (f'{PREFIX}artifact_load_failures_total', 'counter', "Model versions that failed to load",
+               labels, live_models.load_failures)
+        for version, artifacts in list(live_models.live.items()):
+            yield (f'{PREFIX}model_info', 'gauge', "Model versions in memory; 1 for the served one",
+                   {**labels, 'version': version, 'model_file': artifacts.get('model_file', '')},
+                   float(version == live_models.version))
+            yield (f'{PREFIX}artifact_load_seconds', 'gauge', "Time load_model_artifacts took",
+                   {**labels, 'version': version}, artifacts.get('load_seconds', 0.0))
+    return collect
+
+
+def feature_store_samples() -> Iterable[Sample]:
+    """Hits and misses of every feature store opened in this process"""
+    from .feature_store import CACHE_TOTALS
+
+    for result, total in (('hit', 'hits'), ('miss', 'misses')):
+        yield (f'{PREFIX}feature_cache_lookups_total', 'counter', "Feature store lookups",
+               {'result': result}, CACHE_TOTALS[total])
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+def write_metrics(metrics: Metrics, path: Union[str, Path] = METRICS_PATH) -> None:
+    """Write the rendered metrics to a file atomically"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(metrics.render())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def start_file_exporter(metrics: Metrics, path: Union[str, Path] = METRICS_PATH,
+                        interval: float = EXPORT_SECONDS) -> threading.Thread:
+    """Rewrite the metrics file every `interval` seconds from a daemon thread"""
+    def run():
+        while True:
+            try:
+                write_metrics(metrics, path)
+            except Exception as e:
+                logger.warning("Could not write metrics to %s: %s", path, e)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='metrics-file-exporter', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_http_exporter(metrics: Metrics, port: int = PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve GET /metrics on a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http-exporter', daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
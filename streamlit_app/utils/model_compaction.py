@@ -0,0 +1,202 @@
+"""
+Model Compaction
+Shrinks a trained gradient boosting model for serving: drops trailing trees
+and caps tree depth greedily while validation AUC stays within a tolerance of
+the full model, then saves the result as compact_model.pkl next to
+best_model.pkl, where the app picks it up. Candidates are chosen on a
+validation slice of the training rows; the bundle's holdout only reports the
+chosen one.
+
+Usage, from the streamlit_app directory:
+    python -m utils.model_compaction                    # 0.2 pt AUC tolerance
+    python -m utils.model_compaction --tolerance 0.005 --dry-run
+"""
+
+import argparse
+import copy
+import json
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .data_processing import COMPACT_MODEL_FILE, MODEL_FILE, MODELS_DIR, load_manifest
+from .model_selection import measure_latency, model_size
+
+# Largest AUC drop accepted, in AUC units (0.002 = 0.2 points)
+DEFAULT_AUC_TOLERANCE = 0.002
+# Trees per step of the reported truncation curve
+CURVE_STEP = 10
+
+
+def truncate_trees(model: Any, n_trees: int) -> Any:
+    """Copy of a fitted gradient boosting model keeping its first n_trees stages"""
+    compact = copy.deepcopy(model)
+    compact.estimators_ = compact.estimators_[:n_trees]
+    compact.train_score_ = compact.train_score_[:n_trees]
+    if getattr(compact, 'oob_improvement_', None) is not None:
+        compact.oob_improvement_ = compact.oob_improvement_[:n_trees]
+    compact.n_estimators = n_trees
+    compact.n_estimators_ = n_trees
+    return compact
+
+
+def prefix_aucs(model: Any, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Validation AUC of every tree prefix, from one staged prediction pass"""
+    from sklearn.metrics import roc_auc_score
+
+    return np.array([roc_auc_score(y, proba[:, 1]) for proba in model.staged_predict_proba(X)])
+
+
+def describe(model: Any, X_val: np.ndarray, y_val: np.ndarray) -> Dict[str, Any]:
+    """Size, latency and accuracy of one candidate"""
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    point = {
+        'max_depth': model.max_depth,
+        'n_trees': len(model.estimators_),
+        'auc': float(roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])),
+        'accuracy': float(accuracy_score(y_val, model.predict(X_val))),
+        'size_kb': model_size(model) / 1024,
+    }
+    point.update(measure_latency(model, X_val))
+    return point
+
+
+def compact_model(model: Any, X_train: np.ndarray, y_train: np.ndarray,
+                  X_val: np.ndarray, y_val: np.ndarray,
+                  tolerance: float = DEFAULT_AUC_TOLERANCE,
+                  log=print) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Greedy tree-count and depth reduction under an AUC floor
+
+    At the model's own depth and then at each shallower depth, refitted with
+    the same settings, keep the shortest tree prefix whose validation AUC is
+    at least the full model's minus `tolerance`. Stop at the first depth
+    where no prefix reaches the floor, and return the smallest candidate.
+
+    Returns:
+        (compact model, report with the full model, the floor, the accepted
+        candidates and the truncation curve at every depth tried)
+    """
+    from sklearn.base import clone
+
+    full = describe(model, X_val, y_val)
+    floor = full['auc'] - tolerance
+    log(f"full model: depth {full['max_depth']}, {full['n_trees']} trees, AUC {full['auc']:.4f}, "
+        f"{full['size_kb']:.0f} KB; AUC floor {floor:.4f}")
+    best, best_point = model, full
+    accepted: List[Dict[str, Any]] = []
+    curves: Dict[int, List[Tuple[int, float]]] = {}
+    for depth in range(model.max_depth, 0, -1):
+        candidate = model if depth == model.max_depth else clone(model).set_params(max_depth=depth).fit(X_train, y_train)
+        aucs = prefix_aucs(candidate, X_val, y_val)
+        curves[depth] = [(k, float(aucs[k - 1])) for k in range(CURVE_STEP, len(aucs) + 1, CURVE_STEP)]
+        reaching = np.flatnonzero(aucs >= floor)
+        if not len(reaching):
+            log(f"depth {depth}: best AUC {aucs.max():.4f} below the floor, stopping")
+            break
+        point = describe(truncate_trees(candidate, int(reaching[0]) + 1), X_val, y_val)
+        accepted.append(point)
+        log(f"depth {depth}: {point['n_trees']} trees, AUC {point['auc']:.4f}, {point['size_kb']:.0f} KB, "
+            f"{point['latency_ms']:.2f} ms/call")
+        if point['size_kb'] < best_point['size_kb']:
+            best, best_point = truncate_trees(candidate, point['n_trees']), point
+    report = {
+        'tolerance': tolerance,
+        'auc_floor': floor,
+        'full': full,
+        'chosen': best_point,
+        'accepted': accepted,
+        'curves': {str(depth): curve for depth, curve in curves.items()},
+    }
+    return best, report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Plain-text size/latency/accuracy trade-off table"""
+    lines = [f"{'Depth':>6}{'Trees':>7}{'AUC':>8}{'Acc':>8}{'KB':>8}{'ms/call':>9}{'us/row':>8}"]
+    for label, point in [('full', report['full'])] + [('', point) for point in report['accepted']]:
+        if point == report['chosen']:
+            label = f'{label} chosen'.strip()
+        lines.append(
+            f"{point['max_depth']:>6}{point['n_trees']:>7}{point['auc']:>8.4f}{point['accuracy']:>8.3f}"
+            f"{point['size_kb']:>8.0f}{point['latency_ms']:>9.2f}{point['batch_us_per_row']:>8.1f}  {label}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from sklearn.base import clone
+
+    from .model_performance import SPLIT_SEED, TEST_SIZE
+    from .training import CACHE_DIR, INPUT_PATH, StageCache, TrainingPipeline
+
+    parser = argparse.ArgumentParser(description="Compact the gradient boosting model under an AUC tolerance")
+    parser.add_argument('--models-dir', default=str(MODELS_DIR), help="Directory holding best_model.pkl")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_AUC_TOLERANCE,
+                        help="Largest accepted validation AUC drop (0.002 = 0.2 points)")
+    parser.add_argument('--input', default=str(INPUT_PATH), help="Petition data (xlsx or csv)")
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR))
+    parser.add_argument('--dry-run', action='store_true', help="Report without saving")
+    args = parser.parse_args(argv)
+
+    models_dir = Path(args.models_dir)
+    with open(models_dir / MODEL_FILE, 'rb') as f:
+        model = pickle.load(f)
+    if not hasattr(model, 'staged_predict_proba'):
+        print(f"error: {type(model).__name__} is not a gradient boosting model", file=sys.stderr)
+        return 1
+    # Rows split as the bundle was trained, featurized for its own feature list
+    # and keyword matching mode
+    manifest = load_manifest(models_dir)
+    training_pipeline = TrainingPipeline(
+        input_path=args.input,
+        features_path=models_dir / 'model_features.pkl',
+        keyword_matching=manifest.get('keyword_matching', 'substring'),
+        locale_variants=manifest.get('locale_variants', False),
+        test_size=manifest.get('test_size', TEST_SIZE),
+        split_seed=manifest.get('split_seed', SPLIT_SEED),
+        cache=StageCache(args.cache_dir)
+    )
+    try:
+        X = training_pipeline.model_matrix()
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    y = training_pipeline.load()['labels']
+    train_index, test_index = training_pipeline.split()
+    fit_index, val_index = training_pipeline.validation_split()
+    # The bundle's model was fitted on the validation rows too, so candidates
+    # come from a refit without them; the chosen shape is then refitted on
+    # every training row, which keeps its first n_trees identical
+    reference = clone(model).fit(X[fit_index], y[fit_index])
+    _, report = compact_model(
+        reference, X[fit_index], y[fit_index], X[val_index], y[val_index], tolerance=args.tolerance
+    )
+    print(format_report(report))
+    chosen = report['chosen']
+    if chosen is report['full']:
+        compact = model
+    else:
+        compact = clone(model).set_params(max_depth=chosen['max_depth'], n_estimators=chosen['n_trees'])
+        compact.fit(X[train_index], y[train_index])
+    report['holdout'] = {
+        'full': describe(model, X[test_index], y[test_index]),
+        'compact': describe(compact, X[test_index], y[test_index]),
+    }
+    print(f"holdout AUC: full {report['holdout']['full']['auc']:.4f}, "
+          f"compact {report['holdout']['compact']['auc']:.4f}")
+    if not args.dry_run:
+        with open(models_dir / COMPACT_MODEL_FILE, 'wb') as f:
+            pickle.dump(compact, f)
+        with open(models_dir / 'compaction_report.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {models_dir / COMPACT_MODEL_FILE}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""
+Model Performance Utilities
+Vectorized bootstrap confidence intervals for classifier evaluation, and the
+saved holdout predictions the Model Guide page reports from.
+
+Usage, from the streamlit_app directory:
+    python -m utils.model_performance export   # score the holdout split, save predictions
+    python -m utils.model_performance report   # print metrics with bootstrap intervals
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_processing import DATA_DIR, MODELS_DIR
+
+EVALUATION_PATH = MODELS_DIR / 'evaluation_predictions.npz'
+
+# Holdout split used by the training notebook
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 42
+# Resamples per chunk; a chunk holds a (chunk_size x n_samples) count matrix
+DEFAULT_CHUNK_SIZE = 250
+
+BOOTSTRAP_METRICS = ('accuracy', 'auc', 'precision', 'recall')
+
+
+# ============================================================================
+# VECTORIZED BOOTSTRAP
+# ============================================================================
+def resample_counts(rng: np.random.Generator, n: int, size: int) -> np.ndarray:
+    """
+    Draw `size` bootstrap resamples of n observations at once
+
+    Returns:
+        (size, n) matrix with the multiplicity of each observation per resample
+    """
+    indices = rng.integers(0, n, size=(size, n))
+    offsets = (np.arange(size) * n)[:, None]
+    return np.bincount((indices + offsets).ravel(), minlength=size * n).reshape(size, n)
+
+
+def _safe_divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def _confusion_metrics(weights: np.ndarray, y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, np.ndarray]:
+    """Threshold metrics for every row of a weight matrix, via four matrix-vector products"""
+    tp = weights @ (y_true & y_pred)
+    fp = weights @ (~y_true & y_pred)
+    fn = weights @ (y_true & ~y_pred)
+    tn = weights @ (~y_true & ~y_pred)
+    return {
+        'accuracy': (tp + tn) / weights.sum(axis=1),
+        'precision': _safe_divide(tp, tp + fp),
+        'recall': _safe_divide(tp, tp + fn),
+        'npv': _safe_divide(tn, tn + fn),
+        'specificity': _safe_divide(tn, tn + fp),
+    }
+
+
+def _weighted_auc(weights: np.ndarray, y_true: np.ndarray, y_score: np.ndarray) -> np.ndarray:
+    """
+    ROC AUC for every row of a weight matrix
+
+    Scores are sorted once; per resample the AUC is the weighted Mann-Whitney
+    statistic, with tied scores counting half.
+    """
+    order = np.argsort(y_score, kind='mergesort')
+    scores = y_score[order]
+    positive = y_true[order]
+    # Start of each run of tied scores
+    starts = np.flatnonzero(np.r_[True, scores[1:] != scores[:-1]])
+    w = weights[:, order]
+    pos_w = np.add.reduceat(w * positive, starts, axis=1)
+    neg_w = np.add.reduceat(w * ~positive, starts, axis=1)
+    neg_below = np.cumsum(neg_w, axis=1) - neg_w
+    n_pos = pos_w.sum(axis=1)
+    n_neg = neg_w.sum(axis=1)
+    return _safe_divide((pos_w * (neg_below + 0.5 * neg_w)).sum(axis=1), n_pos * n_neg)
+
+
+def _metric_matrix(weights, y_true, y_score, y_pred, metrics) -> Dict[str, np.ndarray]:
+    values = _confusion_metrics(weights, y_true, y_pred)
+    if 'auc' in metrics:
+        values['auc'] = _weighted_auc(weights, y_true, y_score)
+    return {metric: values[metric] for metric in metrics}
+
+
+def bootstrap_metrics(
+    y_true,
+    y_score,
+    y_pred=None,
+    threshold: float = 0.5,
+    metrics: Sequence[str] = BOOTSTRAP_METRICS,
+    n_bootstrap: int = DEFAULT_BOOTSTRAP_SAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = BOOTSTRAP_SEED,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Dict[str, float]]:
+    """
+    Point estimates and percentile bootstrap intervals for classifier metrics
+
+    Args:
+        y_true: Binary labels
+        y_score: Scores or probabilities for the positive class (used for AUC)
+        y_pred: Predicted labels; defaults to y_score >= threshold
+        metrics: Any of accuracy, auc, precision, recall, npv, specificity
+        n_bootstrap: Number of resamples
+        confidence: Interval coverage
+        seed: Seed for the resample indices
+        chunk_size: Resamples evaluated per vectorized chunk, bounding memory
+
+    Returns:
+        Dict of metric name to {'value', 'ci_lower', 'ci_upper'}
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    y_score = np.asarray(y_score, dtype=float)
+    y_pred = (y_score >= threshold) if y_pred is None else np.asarray(y_pred).astype(bool)
+    n = len(y_true)
+    point = _metric_matrix(np.ones((1, n)), y_true, y_score, y_pred, metrics)
+
+    rng = np.random.default_rng(seed)
+    samples = {metric: [] for metric in metrics}
+    for start in range(0, n_bootstrap, chunk_size):
+        weights = resample_counts(rng, n, min(chunk_size, n_bootstrap - start)).astype(float)
+        for metric, values in _metric_matrix(weights, y_true, y_score, y_pred, metrics).items():
+            samples[metric].append(values)
+
+    tail = (1 - confidence) / 2 * 100
+    results = {}
+    for metric in metrics:
+        values = np.concatenate(samples[metric])
+        values = values[np.isfinite(values)]
+        lower, upper = np.percentile(values, [tail, 100 - tail]) if len(values) else (np.nan, np.nan)
+        results[metric] = {
+            'value': float(point[metric][0]),
+            'ci_lower': float(lower),
+            'ci_upper': float(upper),
+        }
+    return results
+
+
+def bootstrap_accuracy(y_true, y_pred, n_bootstrap: int = DEFAULT_BOOTSTRAP_SAMPLES) -> np.ndarray:
+    """Drop-in for the notebook helper: 95% percentile interval of accuracy"""
+    result = bootstrap_metrics(y_true, y_pred, y_pred=y_pred, metrics=('accuracy',), n_bootstrap=n_bootstrap)
+    return np.array([result['accuracy']['ci_lower'], result['accuracy']['ci_upper']])
+
+
+# ============================================================================
+# SAVED HOLDOUT PREDICTIONS
+# ============================================================================
+def save_evaluation_predictions(y_true, y_score, y_pred, path: Union[str, Path] = EVALUATION_PATH,
+                                **metadata) -> Path:
+    """Save holdout labels, scores and predictions with JSON metadata"""
+    path = Path(path)
+    np.savez_compressed(
+        path,
+        y_true=np.asarray(y_true, dtype=np.int8),
+        y_score=np.asarray(y_score, dtype=float),
+        y_pred=np.asarray(y_pred, dtype=np.int8),
+        metadata=np.array(json.dumps(metadata))
+    )
+    return path
+
+
+def load_evaluation_predictions(path: Union[str, Path] = EVALUATION_PATH) -> Optional[Dict[str, Any]]:
+    """Saved holdout predictions, or None if they have not been exported"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return {
+            'y_true': data['y_true'],
+            'y_score': data['y_score'],
+            'y_pred': data['y_pred'],
+            'metadata': json.loads(str(data['metadata'])),
+        }
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """Short sha256 of a file, used to tie saved predictions to a model"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def export_holdout_predictions(path: Union[str, Path] = EVALUATION_PATH,
+                               models_dir: Union[str, Path] = MODELS_DIR,
+                               data_dir: Union[str, Path] = DATA_DIR,
+                               feature_store: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Score the notebook's holdout split with the serving pipeline and save it
+
+    The split (stratified, 20%, random_state=42) reproduces the training
+    notebook's, so the saved predictions cover petitions the model was not
+    fitted on, featurized and scored exactly as the app does (text model
+    blend included, when the bundle has one). Features are
+    read through the feature store at `feature_store`, if given.
+
+    Raises RuntimeError if textstat or the NLTK data is unavailable, since
+    the readability and token features would all be scored as 0.
+    """
+    from sklearn.model_selection import train_test_split
+
+    from .data_processing import load_model_artifacts, load_reference_data
+    from .feature_store import FeatureStore
+    from .pipeline import StreamlitPetitionPipeline, missing_nlp_data
+    from .scoring import score_matrix
+
+    missing = missing_nlp_data()
+    if missing:
+        raise RuntimeError(f"Cannot featurize the holdout without {', '.join(missing)}; "
+                           "install the missing data and export again")
+    artifacts = load_model_artifacts(models_dir, data_dir=None)
+    data = load_reference_data(data_dir)
+    if data is None:
+        raise FileNotFoundError(f"No processed petition data in {data_dir}")
+    labels = data['target_success'].to_numpy()
+    _, test_index = train_test_split(
+        np.arange(len(data)), test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=labels
+    )
+    pipeline = StreamlitPetitionPipeline.from_artifacts(artifacts)
+    petitions = data.iloc[test_index].to_dict('records')
+    if feature_store is None:
+        X = pipeline.extract_feature_matrix(petitions)
+    else:
+        store = FeatureStore(pipeline, feature_store)
+        try:
+            X = store.extract_feature_matrix(petitions)
+        finally:
+            store.close()
+    X = X[:, artifacts['model_columns']]
+    model = artifacts['model']
+    text_model = artifacts['text_model']
+    y_score, y_pred = score_matrix(artifacts, X, petitions)
+    return save_evaluation_predictions(
+        labels[test_index], y_score, y_pred, path,
+        model=type(model).__name__,
+        model_file=artifacts['model_file'],
+        model_digest=file_digest(Path(models_dir) / artifacts['model_file']),
+        test_size=TEST_SIZE,
+        split_seed=SPLIT_SEED,
+        keyword_matching=pipeline.keyword_matching,
+        text_blend_weight=text_model['blend_weight'] if text_model is not None else None,
+    )
+
+
+# ============================================================================
+# PERFORMANCE SUMMARY
+# ============================================================================
+_summaries: Dict[Any, Dict[str, Any]] = {}
+_summaries_lock = threading.Lock()
+
+
+def performance_metrics(path: Union[str, Path] = EVALUATION_PATH,
+                        n_bootstrap: int = DEFAULT_BOOTSTRAP_SAMPLES) -> Optional[Dict[str, Any]]:
+    """
+    Model Guide metrics computed from the saved holdout predictions
+
+    Cached per predictions file version. Returns None if no predictions have
+    been exported.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size, n_bootstrap)
+    with _summaries_lock:
+        if key in _summaries:
+            return _summaries[key]
+    saved = load_evaluation_predictions(path)
+    y_true = saved['y_true'].astype(bool)
+    results = bootstrap_metrics(
+        y_true, saved['y_score'], y_pred=saved['y_pred'],
+        metrics=('accuracy', 'auc', 'precision', 'recall', 'npv', 'specificity'),
+        n_bootstrap=n_bootstrap
+    )
+    summary = {
+        'accuracy': results['accuracy']['value'],
+        'auc_roc': results['auc']['value'],
+        'precision_successful': results['precision']['value'],
+        'recall_successful': results['recall']['value'],
+        'precision_unsuccessful': results['npv']['value'],
+        'recall_unsuccessful': results['specificity']['value'],
+        'confidence_interval_lower': results['accuracy']['ci_lower'],
+        'confidence_interval_upper': results['accuracy']['ci_upper'],
+        'test_samples': int(len(y_true)),
+        'successful_actual': int(y_true.sum()),
+        'unsuccessful_actual': int((~y_true).sum()),
+        'bootstrap': results,
+        'metadata': saved['metadata'],
+    }
+    with _summaries_lock:
+        _summaries.clear()
+        _summaries[key] = summary
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Holdout predictions and bootstrap metrics for the saved model")
+    parser.add_argument('command', choices=('export', 'report'))
+    parser.add_argument('--path', default=str(EVALUATION_PATH), help="Predictions file")
+    parser.add_argument('--n-bootstrap', type=int, default=DEFAULT_BOOTSTRAP_SAMPLES)
+    parser.add_argument('--feature-store', help="SQLite feature store to read features through")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        try:
+            saved = export_holdout_predictions(args.path, feature_store=args.feature_store)
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        print(f"Saved holdout predictions to {saved}")
+    summary = performance_metrics(args.path, args.n_bootstrap)
+    if summary is None:
+        print(f"No predictions at {args.path}; run the export command first")
+        return 1
+    print(f"Holdout: {summary['test_samples']} petitions, model {summary['metadata'].get('model')}")
+    for metric, result in summary['bootstrap'].items():
+        print(f"  {metric:<12}{result['value']:.3f}  95% CI [{result['ci_lower']:.3f}, {result['ci_upper']:.3f}]")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
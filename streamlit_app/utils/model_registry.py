@@ -0,0 +1,283 @@
+"""
+Model Registry
+Versioned model bundles under one directory with a CURRENT pointer, so a new
+model can be deployed into a running app, and an optional SHADOW pointer
+naming a candidate scored alongside it (see utils.shadow). Each request asks
+LiveModels for the current artifacts; a stat of the pointer file detects a
+switch, the new version is loaded once and swapped in for later requests,
+while requests already holding the old artifacts finish on them. At most two
+versions are kept in memory per pointer.
+
+Layout:
+    registry/CURRENT        name of the served version, e.g. "v3"
+    registry/SHADOW         name of the shadow candidate, if any
+    registry/versions/v3/   a bundle: best_model.pkl, model_features.pkl, ...
+
+Usage, from the streamlit_app directory:
+    python -m utils.model_registry publish build/bundle-v2 --activate
+    python -m utils.model_registry activate v1      # roll back
+    python -m utils.model_registry shadow v3        # score v3 in shadow; --clear to stop
+    python -m utils.model_registry list
+"""
+
+import argparse
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .data_processing import APP_DIR, MODEL_FILE, MODELS_DIR, load_manifest, load_model_artifacts
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = APP_DIR / 'registry'
+POINTER_FILE = 'CURRENT'
+SHADOW_POINTER_FILE = 'SHADOW'
+VERSION_PATTERN = re.compile(r'^v(\d+)$')
+# Versions held in memory: the current one and the one it replaced, which
+# in-flight requests may still be using
+MAX_LIVE_VERSIONS = 2
+# Version name of the bundle in models/ when the registry has no pointer
+FALLBACK_VERSION = 'models'
+
+
+class ModelRegistry:
+    """Versioned bundle directories and the pointers naming the served ones"""
+
+    def __init__(self, root: Union[str, Path] = REGISTRY_DIR):
+        self.root = Path(root)
+        self.versions_dir = self.root / 'versions'
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first"""
+        if not self.versions_dir.exists():
+            return []
+        names = [path.name for path in self.versions_dir.iterdir() if VERSION_PATTERN.match(path.name)]
+        return sorted(names, key=lambda name: int(VERSION_PATTERN.match(name).group(1)))
+
+    def path(self, version: str) -> Path:
+        return self.versions_dir / version
+
+    def read_pointer(self, pointer: str = POINTER_FILE) -> Optional[str]:
+        """Version a pointer names, or None if it is not set"""
+        try:
+            return (self.root / pointer).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> Optional[str]:
+        """Served version, or None if nothing has been activated"""
+        return self.read_pointer(POINTER_FILE)
+
+    def publish(self, bundle_dir: Union[str, Path]) -> str:
+        """
+        Copy a bundle into the registry as the next version
+
+        The copy is made under a temporary name and renamed into place, so a
+        version directory is never seen half-written. Does not activate it.
+
+        Returns:
+            The new version name
+        """
+        bundle_dir = Path(bundle_dir)
+        if not (bundle_dir / MODEL_FILE).exists():
+            raise FileNotFoundError(f"{bundle_dir} has no {MODEL_FILE}")
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.versions_dir, prefix='.publish-'))
+        try:
+            shutil.copytree(bundle_dir, staging, dirs_exist_ok=True)
+            while True:
+                existing = self.versions()
+                version = f"v{int(VERSION_PATTERN.match(existing[-1]).group(1)) + 1 if existing else 1}"
+                try:
+                    # Fails if another publish took the name first
+                    os.rename(staging, self.path(version))
+                    return version
+                except OSError:
+                    if not self.path(version).exists():
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def activate(self, version: str, pointer: str = POINTER_FILE) -> None:
+        """Point CURRENT (or another pointer) at a published version, atomically"""
+        if not (self.path(version) / MODEL_FILE).exists():
+            raise FileNotFoundError(f"Version {version} is not published in {self.versions_dir}")
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f'.{pointer}-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(version + '\n')
+            os.replace(tmp, self.root / pointer)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def clear(self, pointer: str) -> None:
+        """Unset a pointer; CURRENT falls back to models/, SHADOW stops shadow scoring"""
+        (self.root / pointer).unlink(missing_ok=True)
+
+
+class LiveModels:
+    """
+    The artifacts of the version a registry pointer names
+
+    get() costs one stat while the pointer is unchanged. When it changes, the
+    first request to notice loads the new version while concurrent requests
+    keep getting the old one; a version that fails to load is logged and
+    skipped until the pointer changes again. Without a pointer set, the
+    bundle in `fallback_dir` is served, or None if there is no fallback.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None,
+                 fallback_dir: Optional[Union[str, Path]] = MODELS_DIR,
+                 data_dir: Optional[Union[str, Path]] = None,
+                 pointer: str = POINTER_FILE):
+        self.registry = registry if registry is not None else ModelRegistry()
+        self.fallback_dir = Path(fallback_dir) if fallback_dir is not None else None
+        self.data_dir = data_dir
+        self.pointer = pointer
+        self.live: Dict[str, Dict[str, Any]] = {}
+        self.version: Optional[str] = None
+        # Requests served from memory vs. versions loaded, for utils.metrics
+        self.requests = 0
+        self.loads = 0
+        self.load_failures = 0
+        self._checked = False
+        self._pointer_stat: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.registry.root / self.pointer).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def _load(self, version: str) -> Dict[str, Any]:
+        models_dir = self.fallback_dir if version == FALLBACK_VERSION else self.registry.path(version)
+        try:
+            artifacts = load_model_artifacts(models_dir, data_dir=self.data_dir)
+        except Exception:
+            self.load_failures += 1
+            raise
+        self.loads += 1
+        artifacts['version'] = version
+        return artifacts
+
+    def _serving(self) -> Optional[Dict[str, Any]]:
+        return self.live[self.version] if self.version is not None else None
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """
+        Artifacts of the version to serve this request
+
+        Callers should fetch once per request and keep using the returned
+        dict, so a swap never changes models halfway through an analysis.
+        Raises FileNotFoundError if nothing has loaded yet and the first
+        version cannot be.
+        """
+        self.requests += 1
+        stat = self._stat()
+        if self._checked and stat == self._pointer_stat:
+            return self._serving()
+        # First caller to see the change loads; others keep the old version
+        if self._checked and not self._load_lock.acquire(blocking=False):
+            return self._serving()
+        if not self._checked:
+            self._load_lock.acquire()
+        try:
+            stat = self._stat()
+            if self._checked and stat == self._pointer_stat:
+                return self._serving()
+            version = self.registry.read_pointer(self.pointer) if stat is not None else None
+            if version is None and self.fallback_dir is not None:
+                version = FALLBACK_VERSION
+            artifacts = None
+            if version is not None and version != self.version:
+                try:
+                    artifacts = self.live.get(version) or self._load(version)
+                except Exception as e:
+                    if self.version is None and self.fallback_dir is not None:
+                        raise
+                    logger.warning("Could not load model version %s, still serving %s: %s",
+                                   version, self.version, e)
+                    self._pointer_stat = stat
+                    self._checked = True
+                    return self._serving()
+            with self._lock:
+                if artifacts is not None:
+                    self.live.pop(version, None)
+                    self.live[version] = artifacts
+                    while len(self.live) > MAX_LIVE_VERSIONS:
+                        del self.live[next(iter(self.live))]
+                    logger.info("Serving model version %s from %s", version, self.pointer)
+                elif version is None:
+                    self.live.clear()
+                self.version = version
+                self._pointer_stat = stat
+                self._checked = True
+            return self._serving()
+        finally:
+            self._load_lock.release()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Versioned model bundle registry")
+    parser.add_argument('--root', default=str(REGISTRY_DIR), help="Registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish', help="Copy a bundle in as the next version")
+    publish.add_argument('bundle')
+    publish.add_argument('--activate', action='store_true', help="Serve it once published")
+    activate = commands.add_parser('activate', help="Serve a published version")
+    activate.add_argument('version')
+    shadow = commands.add_parser('shadow', help="Score a published version in shadow")
+    shadow.add_argument('version', nargs='?')
+    shadow.add_argument('--clear', action='store_true', help="Stop shadow scoring")
+    commands.add_parser('list')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == 'publish':
+            version = registry.publish(args.bundle)
+            print(f"Published {args.bundle} as {version}")
+            if args.activate:
+                registry.activate(version)
+                print(f"Serving {version}")
+        elif args.command == 'activate':
+            registry.activate(args.version)
+            print(f"Serving {args.version}")
+        elif args.command == 'shadow':
+            if args.clear:
+                registry.clear(SHADOW_POINTER_FILE)
+                print("Shadow scoring off")
+            elif args.version:
+                registry.activate(args.version, SHADOW_POINTER_FILE)
+                print(f"Scoring {args.version} in shadow")
+            else:
+                print(f"Shadow: {registry.read_pointer(SHADOW_POINTER_FILE) or 'none'}")
+        else:
+            current = registry.current()
+            shadow = registry.read_pointer(SHADOW_POINTER_FILE)
+            for version in registry.versions():
+                manifest = load_manifest(registry.path(version))
+                auc = manifest.get('metrics', {}).get('auc', {}).get('value')
+                marker = '*' if version == current else 's' if version == shadow else ' '
+                print(f"{marker} {version:<6}"
+                      f"{manifest.get('created_at', ''):<27}{manifest.get('model', ''):<30}"
+                      f"{'' if auc is None else f'AUC {auc:.3f}'}")
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
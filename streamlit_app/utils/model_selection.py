@@ -0,0 +1,234 @@
+"""
+Model Selection
+Successive-halving hyperparameter search over the notebook 03 model families
+(Random Forest, Gradient Boosting with early stopping, Logistic Regression).
+Each family's best configuration is cross-validated on accuracy and AUC in a
+single pass per fold, then ranked on a leaderboard next to its holdout
+scores, inference latency and pickled size.
+
+Usage, from the streamlit_app directory:
+    python -m utils.model_selection                        # every family
+    python -m utils.model_selection --models gradient_boosting --n-jobs 4
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR
+from .pipeline import KEYWORD_MATCHING_MODES
+
+SELECTION_DIR = APP_DIR / 'build' / 'model_selection'
+
+CV_FOLDS = 5
+CV_SEED = 42
+# Scored together in one cross_validate pass per fold
+SCORERS = {'accuracy': 'accuracy', 'auc': 'roc_auc'}
+# Metric successive halving promotes candidates on
+SEARCH_SCORER = 'roc_auc'
+# Each halving round keeps the best third of candidates on three times the data
+HALVING_FACTOR = 3
+
+# Gradient boosting stops adding trees once the internal validation loss has
+# not improved for this many iterations
+EARLY_STOPPING_ROUNDS = 10
+MAX_BOOSTING_ROUNDS = 500
+
+LATENCY_CALLS = 200
+
+
+def candidate_models(random_state: int = 42) -> Dict[str, Tuple[Any, Dict[str, List[Any]]]]:
+    """Estimator and search grid per model family"""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return {
+        'random_forest': (
+            RandomForestClassifier(random_state=random_state, class_weight='balanced'),
+            {'n_estimators': [100, 200], 'max_depth': [6, 10, None], 'min_samples_leaf': [1, 2, 4]},
+        ),
+        'gradient_boosting': (
+            GradientBoostingClassifier(
+                random_state=random_state, n_estimators=MAX_BOOSTING_ROUNDS,
+                n_iter_no_change=EARLY_STOPPING_ROUNDS, validation_fraction=0.1
+            ),
+            {'learning_rate': [0.05, 0.1], 'max_depth': [3, 4, 6], 'subsample': [0.8, 1.0]},
+        ),
+        'logistic_regression': (
+            make_pipeline(
+                StandardScaler(),
+                LogisticRegression(random_state=random_state, max_iter=1000, class_weight='balanced')
+            ),
+            {'logisticregression__C': [0.01, 0.1, 1.0, 10.0]},
+        ),
+    }
+
+
+MODEL_FAMILIES = ('random_forest', 'gradient_boosting', 'logistic_regression')
+
+
+# ============================================================================
+# COST MEASUREMENTS
+# ============================================================================
+def model_size(model: Any) -> int:
+    """Pickled size of a model in bytes"""
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def measure_latency(model: Any, X: np.ndarray, n_calls: int = LATENCY_CALLS) -> Dict[str, float]:
+    """
+    Inference cost as the app sees it and in bulk
+
+    Returns:
+        Median single-petition predict_proba time in ms, and the per-row
+        cost of one batch call over X in microseconds
+    """
+    rows = [X[i % len(X)].reshape(1, -1) for i in range(n_calls)]
+    model.predict_proba(rows[0])
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - start
+    return {'latency_ms': float(np.median(timings) * 1000), 'batch_us_per_row': batch / len(X) * 1e6}
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+def search_family(estimator: Any, grid: Dict[str, List[Any]], X: np.ndarray, y: np.ndarray,
+                  n_jobs: Optional[int] = None, random_state: int = CV_SEED):
+    """Successive-halving grid search; returns the fitted search object"""
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+
+    search = HalvingGridSearchCV(
+        estimator, grid,
+        factor=HALVING_FACTOR,
+        scoring=SEARCH_SCORER,
+        cv=StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=random_state),
+        n_jobs=n_jobs,
+        random_state=random_state,
+    )
+    return search.fit(X, y)
+
+
+def evaluate_candidate(name: str, search, X_train: np.ndarray, y_train: np.ndarray,
+                       X_test: np.ndarray, y_test: np.ndarray,
+                       n_jobs: Optional[int] = None) -> Dict[str, Any]:
+    """Leaderboard row for a family's best configuration"""
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold, cross_validate
+
+    cv = cross_validate(
+        clone(search.best_estimator_), X_train, y_train,
+        cv=StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=CV_SEED),
+        scoring=SCORERS, n_jobs=n_jobs
+    )
+    model = search.best_estimator_
+    y_score = model.predict_proba(X_test)[:, 1]
+    row = {
+        'model': name,
+        'params': search.best_params_,
+        'cv_accuracy': float(cv['test_accuracy'].mean()),
+        'cv_accuracy_std': float(cv['test_accuracy'].std()),
+        'cv_auc': float(cv['test_auc'].mean()),
+        'cv_auc_std': float(cv['test_auc'].std()),
+        'holdout_accuracy': float(accuracy_score(y_test, model.predict(X_test))),
+        'holdout_auc': float(roc_auc_score(y_test, y_score)),
+        'size_kb': model_size(model) / 1024,
+        'candidates': int(sum(search.n_candidates_)),
+    }
+    row.update(measure_latency(model, X_test))
+    # Trees actually fitted once early stopping kicked in
+    if hasattr(model, 'n_estimators_'):
+        row['n_estimators'] = int(model.n_estimators_)
+    return row
+
+
+def run_selection(training_pipeline, families: Sequence[str] = MODEL_FAMILIES,
+                  n_jobs: Optional[int] = None, out_dir: Optional[Union[str, Path]] = None,
+                  log=print) -> List[Dict[str, Any]]:
+    """
+    Search every family on the training split and rank the winners
+
+    Features and the holdout split come from the training pipeline, so its
+    cached feature stage is reused. With `out_dir`, each family's best model
+    is pickled there as <family>.pkl.
+
+    Returns:
+        Leaderboard rows sorted by cross-validated AUC
+    """
+    X = training_pipeline.model_matrix()
+    y = training_pipeline.load()['labels']
+    train_index, test_index = training_pipeline.split()
+    models = candidate_models()
+    rows = []
+    for name in families:
+        estimator, grid = models[name]
+        start = time.perf_counter()
+        search = search_family(estimator, grid, X[train_index], y[train_index], n_jobs=n_jobs)
+        row = evaluate_candidate(
+            name, search, X[train_index], y[train_index], X[test_index], y[test_index], n_jobs=n_jobs
+        )
+        row['search_s'] = time.perf_counter() - start
+        log(f"[{name}] {row['candidates']} candidates in {row['search_s']:.1f}s, best {row['params']}")
+        if out_dir is not None:
+            Path(out_dir).mkdir(parents=True, exist_ok=True)
+            with open(Path(out_dir) / f'{name}.pkl', 'wb') as f:
+                pickle.dump(search.best_estimator_, f)
+        rows.append(row)
+    return sorted(rows, key=lambda row: row['cv_auc'], reverse=True)
+
+
+def format_leaderboard(rows: Sequence[Dict[str, Any]]) -> str:
+    """Render the leaderboard as a plain-text table"""
+    lines = [
+        f"{'Model':<22}{'CV acc':>9}{'CV AUC':>9}{'Test acc':>10}{'Test AUC':>10}"
+        f"{'ms/call':>9}{'us/row':>8}{'KB':>9}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['model']:<22}{row['cv_accuracy']:>9.3f}{row['cv_auc']:>9.3f}"
+            f"{row['holdout_accuracy']:>10.3f}{row['holdout_auc']:>10.3f}"
+            f"{row['latency_ms']:>9.2f}{row['batch_us_per_row']:>8.1f}{row['size_kb']:>9.0f}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .training import CACHE_DIR, INPUT_PATH, StageCache, TrainingPipeline
+
+    parser = argparse.ArgumentParser(description="Hyperparameter search and model leaderboard")
+    parser.add_argument('--models', nargs='+', choices=MODEL_FAMILIES, default=list(MODEL_FAMILIES))
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel fits (-1: all cores)")
+    parser.add_argument('--input', default=str(INPUT_PATH), help="Petition data (xlsx or csv)")
+    parser.add_argument('--keyword-matching', choices=KEYWORD_MATCHING_MODES, default='substring')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR))
+    parser.add_argument('--out', default=str(SELECTION_DIR), help="Leaderboard and best models")
+    args = parser.parse_args(argv)
+
+    training_pipeline = TrainingPipeline(
+        input_path=args.input, keyword_matching=args.keyword_matching, cache=StageCache(args.cache_dir)
+    )
+    rows = run_selection(training_pipeline, args.models, n_jobs=args.n_jobs, out_dir=args.out)
+    with open(Path(args.out) / 'leaderboard.json', 'w') as f:
+        json.dump(rows, f, indent=2)
+    print(format_leaderboard(rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Model Update
+Incremental bundle updates from newly labelled petitions, without rerunning
+notebook 03 or the training pipeline. The tree model is warm-started with
+extra trees fitted on the new petitions only, the text model (if the bundle
+has one) takes partial_fit steps on them, and the result is checked against
+a holdout slice of the new data before being published as the next bundle
+version. Only the new petitions go through feature extraction, so an update
+costs time in proportion to the batch, not the history.
+
+Usage, from the streamlit_app directory:
+    python -m utils.model_update --input week_42.csv                 # writes build/bundle-v2
+    python -m utils.model_update --input week_42.xlsx --new-trees 30 --models-dir build/bundle-v2
+"""
+
+import argparse
+import copy
+import json
+import pickle
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_processing import (
+    APP_DIR, COMPACT_MODEL_FILE, MANIFEST_FILE, MODEL_FILE, MODELS_DIR, TEXT_MODEL_FILE, load_model_artifacts
+)
+from .feature_engineering import TEXT_COLUMNS
+from .feature_store import STORE_PATH, FeatureStore
+from .model_performance import bootstrap_metrics, file_digest, save_evaluation_predictions
+from .pipeline import StreamlitPetitionPipeline
+from .text_model import petition_text
+from .training import (
+    CATEGORICAL_FIELDS, EVALUATION_METRICS, EXCEL_SUFFIXES, REQUIRED_COLUMNS, TARGET_COLUMN
+)
+
+# Trees added to the forest or boosting sequence per update
+DEFAULT_NEW_TREES = 20
+# Settings for the added trees only: a week of petitions is small, and
+# unregularised depth-6 trees fitted on it overfit
+UPDATE_TREE_PARAMS = {'min_samples_leaf': 20}
+# Share of the new petitions held out to accept or reject the update
+HOLDOUT_FRACTION = 0.2
+UPDATE_SEED = 42
+# Largest holdout AUC drop against the current bundle accepted for publishing
+DEFAULT_AUC_TOLERANCE = 0.005
+MIN_UPDATE_RECORDS = 20
+# Passes of the text model over the new petitions
+TEXT_EPOCHS = 5
+# Files carried over unchanged from the current bundle
+CARRIED_FILES = ('model_features.pkl', 'categorical_encoders.pkl')
+
+
+def bundle_version(manifest: Dict[str, Any]) -> int:
+    """Version of a bundle; bundles from before versioning count as 1"""
+    return int(manifest.get('version', 1))
+
+
+def load_update_data(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read a batch of newly labelled petitions
+
+    Returns:
+        Records with the fields extraction uses, and their labels; raises
+        ValueError if the file lacks required columns or labelled rows
+    """
+    import pandas as pd
+
+    path = Path(path)
+    df = pd.read_excel(path) if path.suffix in EXCEL_SUFFIXES else pd.read_csv(path)
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"{path} is missing required columns: {', '.join(missing)}")
+    df = df[df[TARGET_COLUMN].isin([0, 1])]
+    if len(df) < MIN_UPDATE_RECORDS:
+        raise ValueError(f"{path} has {len(df)} labelled petitions; at least {MIN_UPDATE_RECORDS} are required")
+    if df[TARGET_COLUMN].nunique() < 2:
+        raise ValueError(f"{path} has only one outcome class; an update needs both")
+    columns = [col for col in ('petition_id',) + TEXT_COLUMNS + CATEGORICAL_FIELDS if col in df.columns]
+    return {
+        'records': df[columns].to_dict('records'),
+        'labels': df[TARGET_COLUMN].astype(int).to_numpy(np.int8),
+    }
+
+
+# ============================================================================
+# UPDATES
+# ============================================================================
+def add_trees(model: Any, X: np.ndarray, y: np.ndarray, n_trees: int = DEFAULT_NEW_TREES,
+              tree_params: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Copy of a fitted forest or boosting model with n_trees more, fitted on X
+
+    Random forests grow independent trees on the new rows. Gradient boosting
+    continues the sequence: the new stages fit the residuals of the existing
+    model's predictions on the new rows.
+
+    Args:
+        tree_params: Estimator settings used for the new trees only,
+            UPDATE_TREE_PARAMS by default
+    """
+    params = model.get_params()
+    if not hasattr(model, 'estimators_') or 'warm_start' not in params:
+        raise TypeError(f"{type(model).__name__} cannot be updated incrementally; retrain it instead")
+    tree_params = UPDATE_TREE_PARAMS if tree_params is None else tree_params
+    updated = copy.deepcopy(model)
+    updated.set_params(warm_start=True, n_estimators=len(updated.estimators_) + n_trees, **tree_params)
+    updated.fit(X, y)
+    # Fitted trees keep their shape, so the original settings can be restored
+    updated.set_params(warm_start=False, **{name: params[name] for name in tree_params})
+    return updated
+
+
+def update_text_model(text_model: Dict[str, Any], records: Sequence[Dict[str, Any]], y: np.ndarray,
+                      epochs: int = TEXT_EPOCHS, seed: int = UPDATE_SEED) -> Dict[str, Any]:
+    """Copy of a text model with partial_fit passes over the new petitions"""
+    updated = copy.deepcopy(text_model)
+    X = updated['vectorizer'].transform([petition_text(record) for record in records])
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        updated['classifier'].partial_fit(X[order], y[order])
+    updated['n_trained'] = updated.get('n_trained', 0) + len(y)
+    return updated
+
+
+def _scores(model: Any, text_model: Optional[Dict[str, Any]], X: np.ndarray,
+            records: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Served probabilities: the tree model's, blended with the text model's if present"""
+    scores = model.predict_proba(X)[:, 1]
+    if text_model is not None:
+        text_scores = text_model['classifier'].predict_proba(
+            text_model['vectorizer'].transform([petition_text(record) for record in records])
+        )[:, 1]
+        weight = text_model['blend_weight']
+        scores = (1 - weight) * scores + weight * text_scores
+    return scores
+
+
+def update_bundle(models_dir: Union[str, Path], input_path: Union[str, Path],
+                  out_dir: Optional[Union[str, Path]] = None, new_trees: int = DEFAULT_NEW_TREES,
+                  tolerance: float = DEFAULT_AUC_TOLERANCE, force: bool = False,
+                  feature_store: Optional[Union[str, Path]] = STORE_PATH,
+                  log=print) -> Dict[str, Any]:
+    """
+    Update a bundle with new petitions and publish the next version
+
+    The new petitions are split into update and holdout rows. The updated
+    models are published only if their holdout AUC is within `tolerance` of
+    the current bundle's, unless `force` is set.
+
+    Args:
+        models_dir: Current bundle
+        out_dir: Where to write the new version; build/bundle-v<version>
+            by default
+        feature_store: Feature store file, or None to extract every new
+            petition
+
+    Returns:
+        Report with the holdout AUC before and after, timings, and the
+        published directory (None if the update was rejected)
+    """
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    timings = {}
+    start = time.perf_counter()
+    models_dir = Path(models_dir)
+    artifacts = load_model_artifacts(models_dir, data_dir=None)
+    # Updates continue the full model; a compact copy would drop the new trees
+    with open(models_dir / MODEL_FILE, 'rb') as f:
+        model = pickle.load(f)
+    data = load_update_data(input_path)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline = StreamlitPetitionPipeline.from_artifacts(artifacts)
+    if feature_store is not None:
+        store = FeatureStore(pipeline, feature_store)
+        try:
+            matrix = store.extract_feature_matrix(data['records'])
+        finally:
+            store.close()
+    else:
+        matrix = pipeline.extract_feature_matrix(data['records'])
+    X = matrix[:, artifacts['model_columns']]
+    y = data['labels']
+    timings['features'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fit_index, holdout_index = train_test_split(
+        np.arange(len(y)), test_size=HOLDOUT_FRACTION, random_state=UPDATE_SEED, stratify=y
+    )
+    records = data['records']
+    fit_records = [records[i] for i in fit_index]
+    holdout_records = [records[i] for i in holdout_index]
+    updated = add_trees(model, X[fit_index], y[fit_index], new_trees)
+    text_model = artifacts['text_model']
+    updated_text = (
+        update_text_model(text_model, fit_records, y[fit_index]) if text_model is not None else None
+    )
+    timings['update'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_holdout = y[holdout_index]
+    # The model being extended, not the compact copy load_model_artifacts may serve
+    before = _scores(model, text_model, X[holdout_index], holdout_records)
+    after = _scores(updated, updated_text, X[holdout_index], holdout_records)
+    auc_before = float(roc_auc_score(y_holdout, before))
+    auc_after = float(roc_auc_score(y_holdout, after))
+    timings['validate'] = time.perf_counter() - start
+    accepted = force or auc_after >= auc_before - tolerance
+    log(f"[update] {len(fit_index)} update and {len(holdout_index)} holdout petitions; "
+        f"holdout AUC {auc_before:.4f} -> {auc_after:.4f} ({'accepted' if accepted else 'rejected'})")
+
+    manifest = artifacts['manifest']
+    version = bundle_version(manifest) + 1
+    report = {
+        'version': version,
+        'n_update': int(len(fit_index)),
+        'n_holdout': int(len(holdout_index)),
+        'new_trees': new_trees,
+        'auc_before': auc_before,
+        'auc_after': auc_after,
+        'accepted': accepted,
+        'timings': timings,
+        'out_dir': None,
+    }
+    if not accepted:
+        return report
+
+    start = time.perf_counter()
+    out_dir = Path(out_dir) if out_dir is not None else APP_DIR / 'build' / f'bundle-v{version}'
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / COMPACT_MODEL_FILE).unlink(missing_ok=True)
+    for name in CARRIED_FILES:
+        shutil.copy2(models_dir / name, out_dir / name)
+    with open(out_dir / MODEL_FILE, 'wb') as f:
+        pickle.dump(updated, f)
+    if updated_text is not None:
+        with open(out_dir / TEXT_MODEL_FILE, 'wb') as f:
+            pickle.dump(updated_text, f)
+    else:
+        (out_dir / TEXT_MODEL_FILE).unlink(missing_ok=True)
+    y_pred = (after >= 0.5).astype(np.int8)
+    save_evaluation_predictions(
+        y_holdout, after, y_pred, out_dir / 'evaluation_predictions.npz',
+        model=type(updated).__name__,
+        model_file=MODEL_FILE,
+        model_digest=file_digest(out_dir / MODEL_FILE),
+        holdout='update',
+        keyword_matching=artifacts['keyword_matching'],
+    )
+    update = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'input': Path(input_path).name,
+        'input_digest': file_digest(input_path),
+        'n_records': int(len(y)),
+        'new_trees': new_trees,
+        'tree_params': UPDATE_TREE_PARAMS,
+        'holdout_auc_before': auc_before,
+        'holdout_auc_after': auc_after,
+        # Measured on this update's holdout rows; `metrics` stays the training holdout's
+        'holdout_metrics': bootstrap_metrics(y_holdout, after, y_pred=y_pred, metrics=EVALUATION_METRICS),
+    }
+    manifest = dict(
+        manifest,
+        version=version,
+        parent={'version': version - 1, 'model_digest': file_digest(models_dir / MODEL_FILE)},
+        updates=manifest.get('updates', []) + [update],
+    )
+    manifest['model_params'] = dict(manifest.get('model_params', {}), n_estimators=len(updated.estimators_))
+    with open(out_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    timings['publish'] = time.perf_counter() - start
+    report['out_dir'] = str(out_dir)
+    log(f"[update] published version {version} to {out_dir}")
+    return report
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Update a model bundle with newly labelled petitions")
+    parser.add_argument('--input', required=True, help="New petitions (xlsx or csv) with target_success")
+    parser.add_argument('--models-dir', default=str(MODELS_DIR), help="Current bundle")
+    parser.add_argument('--out', default=None, help="New bundle directory (default: build/bundle-v<version>)")
+    parser.add_argument('--new-trees', type=int, default=DEFAULT_NEW_TREES)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_AUC_TOLERANCE,
+                        help="Largest accepted holdout AUC drop against the current bundle")
+    parser.add_argument('--force', action='store_true', help="Publish even if the holdout AUC drops")
+    parser.add_argument('--feature-store', default=str(STORE_PATH))
+    parser.add_argument('--no-feature-store', action='store_true')
+    args = parser.parse_args(argv)
+
+    try:
+        report = update_bundle(
+            args.models_dir, args.input, out_dir=args.out, new_trees=args.new_trees,
+            tolerance=args.tolerance, force=args.force,
+            feature_store=None if args.no_feature_store else args.feature_store,
+        )
+    except (TypeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in report['timings'].items()))
+    return 0 if report['accepted'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""
+Petition Pipeline
+Feature extraction for petitions, importable without Streamlit. NLTK and
+textstat are imported on first use so that workers and scripts importing this
+module start quickly.
+"""
+
+import re
+import threading
+
+from .feature_engineering import (
+    scan_html, is_missing, feature_families, FeatureRecord, FeatureSchema,
+    COMPOSITE_INPUT_FAMILIES, TAG_METRICS, TEXT_COLUMNS
+)
+from .lexicon import get_lexicon
+from .timing import NULL_TIMER
+
+# NLTK data packages the pipeline relies on
+NLTK_PACKAGES = (
+    ('vader_lexicon', 'sentiment/vader_lexicon.zip'),
+    ('punkt', 'tokenizers/punkt'),
+    ('stopwords', 'corpora/stopwords'),
+)
+
+_optional_modules = {}
+_optional_lock = threading.Lock()
+_missing_nlp_data = None
+
+
+# ============================================================================
+# LAZY OPTIONAL IMPORTS
+# ============================================================================
+def _import_nltk():
+    import nltk
+    import nltk.sentiment
+    import nltk.tokenize
+    # Download required NLTK data
+    for package, resource in NLTK_PACKAGES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+    return nltk
+
+
+def _import_textstat():
+    import textstat
+    return textstat
+
+
+def _load_optional(name, importer):
+    """Import an optional module once; returns None if it is not installed"""
+    if name not in _optional_modules:
+        with _optional_lock:
+            if name not in _optional_modules:
+                try:
+                    _optional_modules[name] = importer()
+                except ImportError:
+                    _optional_modules[name] = None
+    return _optional_modules[name]
+
+
+def load_nltk():
+    """NLTK with its data packages, or None if NLTK is not installed"""
+    return _load_optional('nltk', _import_nltk)
+
+
+def load_textstat():
+    """textstat, or None if it is not installed"""
+    return _load_optional('textstat', _import_textstat)
+
+
+def missing_nlp_data():
+    """
+    NLP dependencies that are unavailable in this environment
+
+    Without them extraction still runs but scores the readability and token
+    metrics as 0, so anything computed offline from features should refuse
+    to run, or keep its results apart, when this list is not empty. Probed
+    once per process.
+    """
+    global _missing_nlp_data
+    if _missing_nlp_data is None:
+        # Outside _optional_lock: the probe loads NLTK and textstat through it
+        _missing_nlp_data = _probe_nlp_data()
+    return list(_missing_nlp_data)
+
+
+def _probe_nlp_data():
+    probe = "The council should fund the park. Residents use it every day."
+    missing = []
+    textstat = load_textstat()
+    if textstat is None:
+        missing.append('textstat')
+    else:
+        try:
+            textstat.flesch_reading_ease(probe)
+        except Exception:
+            missing.append("textstat's syllable dictionary (NLTK cmudict)")
+    nltk = load_nltk()
+    if nltk is None:
+        missing.append('nltk')
+    else:
+        try:
+            nltk.tokenize.sent_tokenize(probe)
+            nltk.tokenize.word_tokenize(probe)
+        except LookupError:
+            missing.append('NLTK punkt tokenizer data')
+    return tuple(missing)
+
+
+# ============================================================================
+# PETITION PROCESSING PIPELINE
+# ============================================================================
+# Keyword matching modes: 'substring' reproduces the raw substring counts the
+# current best_model.pkl was trained on, 'token' counts exact whole words and
+# phrases. Training and serving must use the same mode.
+KEYWORD_MATCHING_MODES = ('substring', 'token')
+# Locale keyword variants (lexicon.json 'locales') are applied only for models
+# trained with them; the shipped best_model.pkl was trained without
+# Bump when extraction changes the values produced for the same petition;
+# cached feature matrices are keyed by it
+PIPELINE_VERSION = '1'
+NUMBER_PATTERN = re.compile(r'\d+')
+class StreamlitPetitionPipeline:
+    """Streamlit-optimized petition processing pipeline"""
+    def __init__(self, keyword_matching='substring', categorical_lookup=None, schema=None,
+                 disabled_families=(), locale_variants=False):
+        if keyword_matching not in KEYWORD_MATCHING_MODES:
+            raise ValueError(f"keyword_matching must be one of {KEYWORD_MATCHING_MODES}, got {keyword_matching!r}")
+        unknown = set(disabled_families) - set(feature_families())
+        if unknown:
+            raise ValueError(f"Unknown feature families {sorted(unknown)}")
+        if set(disabled_families) & set(COMPOSITE_INPUT_FAMILIES):
+            raise ValueError(f"{COMPOSITE_INPUT_FAMILIES} feed the composite scores and cannot be disabled")
+        self.keyword_matching = keyword_matching
+        # Count keywords with the petition locale's lexicon variants
+        self.locale_variants = bool(locale_variants)
+        # '{column}.{family}' groups the model does not use; their features stay 0
+        self.disabled_families = frozenset(disabled_families)
+        self.enabled = {
+            column: {
+                family: f'{column}.{family}' not in self.disabled_families
+                for family in ('sentiment', 'readability', 'tokens')
+            }
+            for column in TEXT_COLUMNS
+        }
+        # CategoricalLookup built from categorical_encoders.pkl, if available
+        self.categorical_lookup = categorical_lookup
+        # Fixed feature layout; built from model_features.pkl when a model is loaded
+        self.schema = schema or FeatureSchema.for_model()
+        nltk = load_nltk()
+        self.sia = nltk.sentiment.SentimentIntensityAnalyzer() if nltk else None
+        self.setup_keywords()
+    @classmethod
+    def from_artifacts(cls, model_artifacts):
+        """Pipeline extracting features the way the loaded model was trained"""
+        if not model_artifacts:
+            return cls()
+        return cls(
+            keyword_matching=model_artifacts['keyword_matching'],
+            categorical_lookup=model_artifacts['categorical_lookup'],
+            schema=model_artifacts['schema'],
+            disabled_families=model_artifacts['disabled_families'],
+            locale_variants=model_artifacts['locale_variants']
+        )
+    def setup_keywords(self):
+        """Load keyword categories from the shared lexicon"""
+        self.lexicon = get_lexicon()
+        self.urgency_keywords = list(self.lexicon.keywords('urgency'))
+        self.action_keywords = list(self.lexicon.keywords('action'))
+        self.power_words = list(self.lexicon.keywords('power'))
+        self.authority_keywords = list(self.lexicon.keywords('authority'))
+        self.specificity_keywords = list(self.lexicon.keywords('specificity'))
+        self.cta_patterns = [
+            r'\bsign\s+this\b', r'\bsign\s+now\b', r'\bjoin\s+us\b', r'\bhelp\s+us\b',
+            r'\btake\s+action\b', r'\bact\s+now\b', r'\bmake\s+a\s+difference\b',
+            r'\bdemand\s+action\b', r'\bstop\s+this\b', r'\bforce\s+them\b'
+        ]
+        self.cta_regexes = [re.compile(pattern) for pattern in self.cta_patterns]
+        self.keyword_categories = {
+            'urgency': self.urgency_keywords,
+            'action': self.action_keywords,
+            'power': self.power_words,
+            'authority': self.authority_keywords,
+            'specificity': self.specificity_keywords
+        }
+        self.keyword_matcher = self.lexicon.matcher
+    def clean_html(self, text):
+        """Remove HTML tags and clean text"""
+        return scan_html(text)['clean_text']
+    def count_html_tags(self, text):
+        """Count HTML tags in text"""
+        return scan_html(text)['tag_count']
+    def count_keywords(self, text, keywords, clean_text=None):
+        """Count keyword occurrences"""
+        if is_missing(text):
+            return 0
+        if clean_text is None:
+            clean_text = self.clean_html(text)
+        clean_text = clean_text.lower()
+        count = 0
+        for keyword in keywords:
+            count += clean_text.count(keyword.lower())
+        return count
+    def count_keyword_categories(self, text, clean_text=None, lexicon=None):
+        """Count keyword categories using the configured matching mode and (locale) lexicon"""
+        lexicon = lexicon or self.lexicon
+        if self.keyword_matching == 'token':
+            if clean_text is None:
+                clean_text = self.clean_html(text)
+            return lexicon.matcher.count(clean_text)
+        return {
+            name: self.count_keywords(text, lexicon.keywords(name), clean_text)
+            for name in self.keyword_categories
+        }
+    def get_sentiment_scores(self, text, clean_text=None):
+        """Get sentiment scores"""
+        if is_missing(text) or not self.sia:
+            return {'compound': 0, 'pos': 0, 'neg': 0, 'neu': 0}
+        if clean_text is None:
+            clean_text = self.clean_html(text)
+        return self.sia.polarity_scores(clean_text)
+    def calculate_readability(self, text, clean_text=None, textstat_metrics=True, token_metrics=True,
+                              timer=NULL_TIMER):
+        """
+        Calculate readability metrics
+
+        The textstat scores and the NLTK token statistics can each be skipped;
+        skipped metrics are returned as 0. `timer` gets a lap for each.
+        """
+        if is_missing(text) or len(str(text).strip()) < 10:
+            # Lap anyway, or this check's time is charged to the caller's next stage
+            timer.lap('readability')
+            timer.lap('tokens')
+            return {
+                'flesch_ease': 0, 'flesch_kincaid': 0, 'gunning_fog': 0,
+                'automated_readability': 0, 'avg_sentence_length': 0,
+                'avg_word_length': 0, 'vocab_diversity': 0, 'caps_ratio': 0
+            }
+        if clean_text is None:
+            clean_text = self.clean_html(text)
+        textstat = load_textstat()
+        nltk = load_nltk()
+        try:
+            if textstat and textstat_metrics:
+                flesch_ease = textstat.flesch_reading_ease(clean_text)
+                flesch_kincaid = textstat.flesch_kincaid_grade(clean_text)
+                gunning_fog_score = textstat.gunning_fog(clean_text)
+                automated_readability = textstat.automated_readability_index(clean_text)
+            else:
+                flesch_ease = flesch_kincaid = gunning_fog_score = automated_readability = 0
+        except:
+            flesch_ease = flesch_kincaid = gunning_fog_score = automated_readability = 0
+        timer.lap('readability')
+        # Additional metrics
+        try:
+            if not token_metrics:
+                sentences = words = []
+            elif nltk:
+                sentences = nltk.tokenize.sent_tokenize(clean_text)
+                words = nltk.tokenize.word_tokenize(clean_text)
+            else:
+                sentences = clean_text.split('.')
+                words = clean_text.split()
+            
+            avg_sentence_length = len(words) / len(sentences) if sentences else 0
+            avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
+            unique_words = set(word.lower() for word in words if word.isalpha())
+            vocab_diversity = len(unique_words) / len(words) if words else 0
+            caps_words = sum(1 for word in words if word.isupper() and len(word) > 1)
+            caps_ratio = caps_words / len(words) if words else 0
+        except:
+            avg_sentence_length = avg_word_length = vocab_diversity = caps_ratio = 0
+        timer.lap('tokens')
+        return {
+            'flesch_ease': flesch_ease,
+            'flesch_kincaid': flesch_kincaid,
+            'gunning_fog': gunning_fog_score,
+            'automated_readability': automated_readability,
+            'avg_sentence_length': avg_sentence_length,
+            'avg_word_length': avg_word_length,
+            'vocab_diversity': vocab_diversity,
+            'caps_ratio': caps_ratio
+        }
+    def extract_features(self, petition_data, out=None, timer=NULL_TIMER):
+        """
+        Extract all features from petition data into a FeatureRecord
+
+        Values are written straight into a schema-ordered NumPy row; pass a
+        row of a preallocated matrix as `out` to fill batches in place. A
+        StageTimer as `timer` gets a lap per stage and text column.
+        """
+        schema = self.schema
+        if out is None:
+            row = schema.new_row()
+        else:
+            row = out
+            row[:] = 0
+        ix = schema.index
+        # Locale-specific keyword variants and statistics units
+        lexicon = self.lexicon
+        if self.locale_variants:
+            lexicon = lexicon.for_locale(petition_data.get('original_locale'))
+        # Process each text column
+        for col in TEXT_COLUMNS:
+            if col in petition_data:
+                timer.scope = col
+                text = petition_data[col]
+                has_text = not is_missing(text)
+                raw_text = str(text) if has_text else ''
+                idx = schema.column_index[col]
+                # Single HTML pass: cleaned text and structure counts
+                scan = scan_html(text)
+                clean_text = scan['clean_text']
+                # Basic text features
+                row[idx['length']] = len(raw_text)
+                row[idx['clean_length']] = len(clean_text)
+                row[idx['word_count']] = len(clean_text.split())
+                # HTML features
+                if col == 'description':
+                    row[idx['html_tags']] = scan['tag_count']
+                    for tag, metric in TAG_METRICS:
+                        row[idx[metric]] = scan['tag_histogram'][tag]
+                    row[idx['list_count']] = scan['list_count']
+                    row[idx['html_paragraph_count']] = scan['paragraph_count']
+                timer.lap('html')
+                # Keyword counts
+                keyword_counts = self.count_keyword_categories(text, clean_text, lexicon)
+                row[idx['urgency_count']] = keyword_counts['urgency']
+                row[idx['action_count']] = keyword_counts['action']
+                row[idx['power_count']] = keyword_counts['power']
+                row[idx['authority_count']] = keyword_counts['authority']
+                row[idx['specificity_count']] = keyword_counts['specificity']
+                # Boolean keyword features
+                row[idx['has_urgency']] = keyword_counts['urgency'] > 0
+                row[idx['has_action']] = keyword_counts['action'] > 0
+                # CTA detection
+                lower_text = raw_text.lower()
+                cta_count = sum(len(pattern.findall(lower_text)) for pattern in self.cta_regexes)
+                row[idx['cta_count']] = cta_count
+                row[idx['has_cta']] = cta_count > 0
+                # Numbers and statistics
+                row[idx['numbers_count']] = len(NUMBER_PATTERN.findall(raw_text))
+                row[idx['has_statistics']] = has_text and lexicon.statistics_pattern.search(raw_text) is not None
+                # Text structure
+                row[idx['paragraph_count']] = scan['line_count']
+                row[idx['question_count']] = raw_text.count('?')
+                timer.lap('keywords')
+                enabled = self.enabled[col]
+                # Sentiment features
+                if enabled['sentiment']:
+                    sentiment = self.get_sentiment_scores(text, clean_text)
+                    row[idx['sentiment_compound']] = sentiment['compound']
+                    row[idx['sentiment_positive']] = sentiment['pos']
+                    row[idx['sentiment_negative']] = sentiment['neg']
+                    row[idx['emotional_intensity']] = sentiment['pos'] + sentiment['neg']
+                    timer.lap('sentiment')
+                # Readability features
+                if enabled['readability'] or enabled['tokens']:
+                    readability = self.calculate_readability(
+                        text, clean_text, enabled['readability'], enabled['tokens'], timer
+                    )
+                    for metric, value in readability.items():
+                        row[idx[metric]] = value
+        timer.scope = None
+        # Categorical features through the saved encoders
+        if self.categorical_lookup is not None:
+            for field in self.categorical_lookup.fields:
+                if field in petition_data and f'{field}_encoded' in ix:
+                    row[ix[f'{field}_encoded']] = self.categorical_lookup.encode(field, petition_data[field])
+        timer.lap('categorical')
+        # Strategic composite features
+        title_clean_length = row[ix['title_clean_length']]
+        desc_length = row[ix['description_clean_length']]
+        row[ix['content_comprehensiveness_score']] = (
+            title_clean_length + desc_length + row[ix['letter_body_clean_length']]
+        )
+        # Professional sophistication score
+        html_formatting = row[ix['description_html_tags']]
+        title_complexity_norm = min(row[ix['title_flesch_kincaid']] / 20, 1)
+        desc_length_norm = min(desc_length / 2000, 1)
+        html_tags_norm = min(html_formatting / 25, 1)
+        row[ix['professional_sophistication_score']] = (
+            title_complexity_norm * 0.4 + desc_length_norm * 0.3 + html_tags_norm * 0.3
+        )
+        # Strategic urgency score
+        urgency_total = row[ix['title_urgency_count']] + row[ix['description_urgency_count']]
+        action_total = row[ix['title_action_count']] + row[ix['description_action_count']]
+        sentiment_score = max(0, row[ix['title_sentiment_compound']] + 1) / 2
+        row[ix['strategic_urgency_score']] = min((urgency_total + action_total) / 10 * 0.7 + sentiment_score * 0.3, 1)
+        # Authority targeting score
+        row[ix['authority_targeting_score']] = (
+            row[ix['title_authority_count']] +
+            row[ix['description_authority_count']] +
+            row[ix['targeting_description_word_count']] / 10
+        )
+        # Message coherence score (simplified)
+        row[ix['message_coherence_score']] = 0.5
+        timer.lap('composites')
+        return FeatureRecord(schema, row)
+    def extract_feature_matrix(self, petitions):
+        """Extract features for a batch of petitions into one schema-ordered matrix"""
+        matrix = self.schema.new_matrix(len(petitions))
+        for i, petition_data in enumerate(petitions):
+            self.extract_features(petition_data, out=matrix[i])
+        return matrix
@@ -0,0 +1,148 @@
+"""
+Startup Profiling
+Measures the cold start of each app page: per-module import cost (from
+`python -X importtime`) and time to first paint, i.e. until the page sends its
+first Streamlit element.
+
+Usage, from the streamlit_app directory:
+    python -m utils.profiling                 # every page
+    python -m utils.profiling Home petition_analyzer --top 15
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+RESULT_MARKER = '__startup_profile__'
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+# Runs one page script in a fresh interpreter; the clock starts before
+# Streamlit is imported, and the first enqueued element marks first paint
+_PAGE_RUNNER = '''
+import time
+start = time.perf_counter()
+import json, runpy, sys
+from streamlit.delta_generator import DeltaGenerator
+first_paint = []
+_enqueue = DeltaGenerator._enqueue
+def _timed_enqueue(self, *args, **kwargs):
+    if not first_paint:
+        first_paint.append(time.perf_counter())
+    return _enqueue(self, *args, **kwargs)
+DeltaGenerator._enqueue = _timed_enqueue
+script, app_dir = sys.argv[1], sys.argv[2]
+sys.path.insert(0, app_dir)
+runpy.run_path(script, run_name='__main__')
+end = time.perf_counter()
+print({marker!r} + json.dumps({{
+    'first_paint_ms': (first_paint[0] - start) * 1000 if first_paint else None,
+    'total_ms': (end - start) * 1000,
+}}))
+'''.format(marker=RESULT_MARKER)
+
+
+def discover_pages(app_dir: Path = APP_DIR) -> Dict[str, Path]:
+    """Map page name to script path: Home.py plus every script in pages/"""
+    pages = {'Home': app_dir / 'Home.py'}
+    for path in sorted((app_dir / 'pages').glob('*.py')):
+        if not path.name.startswith('_'):
+            pages[path.stem] = path
+    return pages
+
+
+def parse_importtime(stderr: str) -> Dict[str, Any]:
+    """
+    Aggregate `-X importtime` output by top-level package
+
+    Args:
+        stderr: Captured stderr of a `python -X importtime` run
+
+    Returns:
+        Dict with total import time and self time per top-level package, in ms
+    """
+    packages = defaultdict(float)
+    total_us = 0
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us = int(match.group(1))
+        packages[match.group(4).split('.')[0]] += self_us / 1000
+        total_us += self_us
+    return {'import_ms': total_us / 1000, 'packages': dict(packages)}
+
+
+def profile_page(script: Path, app_dir: Path = APP_DIR,
+                 python: str = sys.executable) -> Dict[str, Any]:
+    """
+    Cold-start one page in a fresh interpreter
+
+    Returns:
+        Dict with import_ms, per-package import cost, first_paint_ms and total_ms
+    """
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', _PAGE_RUNNER, str(script), str(app_dir)],
+        cwd=app_dir, capture_output=True, text=True
+    )
+    profile = parse_importtime(proc.stderr)
+    profile.update({'first_paint_ms': None, 'total_ms': None, 'returncode': proc.returncode})
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            profile.update(json.loads(line[len(RESULT_MARKER):]))
+    if proc.returncode != 0:
+        profile['error'] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'
+    return profile
+
+
+def format_report(profiles: Dict[str, Dict[str, Any]], top: int = 10) -> str:
+    """Render page timings and the most expensive imports as plain text"""
+    def ms(value):
+        return '-' if value is None else f'{value:,.0f}'
+
+    lines = [f"{'Page':<24}{'Imports ms':>12}{'First paint ms':>16}{'Total ms':>12}"]
+    for name, profile in profiles.items():
+        lines.append(
+            f"{name:<24}{ms(profile['import_ms']):>12}"
+            f"{ms(profile['first_paint_ms']):>16}{ms(profile['total_ms']):>12}"
+        )
+        if 'error' in profile:
+            lines.append(f"  error: {profile['error']}")
+    for name, profile in profiles.items():
+        lines.append('')
+        lines.append(f"{name}: top {top} imports by self time (ms)")
+        ranked = sorted(profile['packages'].items(), key=lambda item: item[1], reverse=True)
+        for package, cost in ranked[:top]:
+            lines.append(f"  {package:<30}{cost:>10.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile cold start of the Streamlit pages")
+    parser.add_argument('pages', nargs='*', help="Page names (default: all pages)")
+    parser.add_argument('--top', type=int, default=10, help="Imports listed per page")
+    parser.add_argument('--json', action='store_true', help="Print raw results as JSON")
+    args = parser.parse_args(argv)
+
+    available = discover_pages()
+    unknown = [name for name in args.pages if name not in available]
+    if unknown:
+        parser.error(f"unknown page(s) {unknown}; available: {sorted(available)}")
+    selected: List[str] = args.pages or list(available)
+
+    profiles = {name: profile_page(available[name]) for name in selected}
+    if args.json:
+        print(json.dumps(profiles, indent=2))
+    else:
+        print(format_report(profiles, args.top))
+    return 0 if all(profile['returncode'] == 0 for profile in profiles.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
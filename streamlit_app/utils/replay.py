@@ -0,0 +1,280 @@
+"""
+Model Replay
+Re-scores historical petitions with the served bundle and a new one and
+reports how the scores move: probability shifts, prediction flips, grade
+changes and the largest movers. Features are extracted once per petition and
+shared by both models whenever the new bundle can read the old bundle's
+feature rows (the same check shadow scoring uses). Rows already in the
+feature store are reused, and the rest are extracted in parallel worker
+processes and stored for next time.
+
+Petitions come from processed_petition_data plus any CSV/XLSX request
+exports given with --input; each needs at least a title and description.
+
+Usage, from the streamlit_app directory:
+    python -m utils.replay --new build/bundle-v2
+    python -m utils.replay --new registry/versions/v3 --old models --input requests.csv --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR, DATA_DIR, MODELS_DIR, load_model_artifacts, load_reference_data
+from .feature_engineering import TEXT_COLUMNS
+from .feature_store import STORE_PATH, FeatureStore, encode_categoricals, text_hash
+from .model_registry import ModelRegistry
+from .pipeline import StreamlitPetitionPipeline
+from .scoring import GRADES, grade_for, score_matrix
+from .shadow import candidate_columns
+from .training import CATEGORICAL_FIELDS, EXCEL_SUFFIXES, TARGET_COLUMN
+
+REPLAY_DIR = APP_DIR / 'build' / 'replay'
+# Petitions per task sent to a worker process
+CHUNK_SIZE = 64
+# Movers listed in the printed report
+TOP_MOVERS = 20
+# Input fields kept from each petition source
+PETITION_COLUMNS = ('petition_id',) + TEXT_COLUMNS + CATEGORICAL_FIELDS + (TARGET_COLUMN,)
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+def load_petitions(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Petitions from a CSV or XLSX export, with the fields extraction reads
+
+    petition_id and target_success are kept when present. Raises ValueError
+    if the file has no title or description column.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    df = pd.read_excel(path) if path.suffix in EXCEL_SUFFIXES else pd.read_csv(path)
+    missing = [col for col in ('title', 'description') if col not in df.columns]
+    if missing:
+        raise ValueError(f"{path} is missing required columns: {', '.join(missing)}")
+    records = df[[col for col in PETITION_COLUMNS if col in df.columns]].to_dict('records')
+    for record in records:
+        record['source'] = path.name
+    return records
+
+
+def default_old_bundle() -> Path:
+    """The registry's served version, or models/ when nothing is activated"""
+    registry = ModelRegistry()
+    version = registry.current()
+    return registry.path(version) if version is not None else MODELS_DIR
+
+
+# ============================================================================
+# PARALLEL EXTRACTION
+# ============================================================================
+_worker_pipeline = None
+
+
+def _init_worker(pipeline_settings: Dict[str, Any]) -> None:
+    global _worker_pipeline
+    _worker_pipeline = StreamlitPetitionPipeline(**pipeline_settings)
+
+
+def _extract_chunk(petitions: List[Dict[str, Any]]) -> np.ndarray:
+    return _worker_pipeline.extract_feature_matrix(petitions)
+
+
+def pipeline_settings(model_artifacts: Mapping[str, Any]) -> Dict[str, Any]:
+    """Constructor arguments of the pipeline a bundle was trained with"""
+    return {
+        'keyword_matching': model_artifacts['keyword_matching'],
+        'categorical_lookup': model_artifacts['categorical_lookup'],
+        'schema': model_artifacts['schema'],
+        'disabled_families': model_artifacts['disabled_families'],
+        'locale_variants': model_artifacts['locale_variants'],
+    }
+
+
+def extract_matrix(model_artifacts: Mapping[str, Any], petitions: Sequence[Dict[str, Any]],
+                   workers: int = 1, store_path: Optional[Union[str, Path]] = STORE_PATH) -> np.ndarray:
+    """
+    Schema-ordered feature matrix of the petitions under a bundle's pipeline
+
+    Args:
+        workers: Extraction processes; 1 extracts in this process
+        store_path: Feature store read first and filled with new rows, or
+            None to extract everything
+
+    Returns:
+        One row per petition; duplicate texts are extracted once and each
+        row gets its own petition's categorical codes
+    """
+    pipeline = StreamlitPetitionPipeline.from_artifacts(model_artifacts)
+    store = FeatureStore(pipeline, store_path) if store_path is not None else None
+    try:
+        if store is not None:
+            matrix = store.extract_feature_matrix(petitions, compute_missing=False)
+        else:
+            matrix = pipeline.schema.new_matrix(len(petitions))
+            matrix[:] = np.nan
+        # One extraction per distinct petition still missing
+        todo: Dict[str, List[int]] = {}
+        for i in np.flatnonzero(np.isnan(matrix).any(axis=1)):
+            todo.setdefault(text_hash(petitions[i]), []).append(int(i))
+        unique = [petitions[rows[0]] for rows in todo.values()]
+        if unique:
+            chunks = [unique[start:start + CHUNK_SIZE] for start in range(0, len(unique), CHUNK_SIZE)]
+            if workers > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                         initargs=(pipeline_settings(model_artifacts),)) as pool:
+                    extracted = np.vstack(list(pool.map(_extract_chunk, chunks)))
+            else:
+                extracted = pipeline.extract_feature_matrix(unique)
+            for row, rows in zip(extracted, todo.values()):
+                matrix[rows] = row
+            if store is not None:
+                store.add(unique, extracted)
+            # The text hash leaves out the categorical fields, so rows filled from
+            # another petition's extraction need their own codes
+            encode_categoricals(pipeline, petitions, matrix)
+        return matrix
+    finally:
+        if store is not None:
+            store.close()
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+def replay(old: Mapping[str, Any], new: Mapping[str, Any], petitions: Sequence[Dict[str, Any]],
+           workers: int = 1, store_path: Optional[Union[str, Path]] = STORE_PATH):
+    """
+    Scores of every petition under both bundles
+
+    Returns:
+        DataFrame with one row per petition: identifying fields, old and new
+        probability, prediction and grade, and the shift
+    """
+    import pandas as pd
+
+    start = time.perf_counter()
+    matrix = extract_matrix(old, petitions, workers, store_path)
+    new_columns = candidate_columns(old, new, old['schema'])
+    if new_columns is None:
+        # Different keyword matching or skipped families: the new bundle needs its own rows
+        new_matrix = extract_matrix(new, petitions, workers, store_path)
+        new_columns = new['schema'].positions(new['features'])
+    else:
+        new_matrix = matrix
+    extract_seconds = time.perf_counter() - start
+
+    old_probability, old_prediction = score_matrix(old, matrix[:, old['model_columns']], petitions)
+    new_probability, new_prediction = score_matrix(new, new_matrix[:, new_columns], petitions)
+
+    report = pd.DataFrame({
+        'source': [petition.get('source', 'reference') for petition in petitions],
+        'petition_id': [petition.get('petition_id') for petition in petitions],
+        'title': [str(petition.get('title', ''))[:80] for petition in petitions],
+        TARGET_COLUMN: [petition.get(TARGET_COLUMN) for petition in petitions],
+        'old_probability': old_probability,
+        'new_probability': new_probability,
+        'shift': new_probability - old_probability,
+        'old_prediction': old_prediction,
+        'new_prediction': new_prediction,
+        'old_grade': [grade_for(p)[0] for p in old_probability],
+        'new_grade': [grade_for(p)[0] for p in new_probability],
+    })
+    report.attrs['extract_seconds'] = extract_seconds
+    report.attrs['score_seconds'] = time.perf_counter() - start - extract_seconds
+    return report
+
+
+def replay_summary(report) -> Dict[str, Any]:
+    """Headline numbers of a replay report"""
+    shift = report['shift'].to_numpy()
+    summary = {
+        'petitions': len(report),
+        'mean_shift': float(shift.mean()),
+        'mean_abs_shift': float(np.abs(shift).mean()),
+        'p95_abs_shift': float(np.quantile(np.abs(shift), 0.95)),
+        'prediction_flips': int((report['old_prediction'] != report['new_prediction']).sum()),
+        'grade_changes': int((report['old_grade'] != report['new_grade']).sum()),
+        'old_positive_rate': float(report['old_prediction'].mean()),
+        'new_positive_rate': float(report['new_prediction'].mean()),
+    }
+    labelled = report[report[TARGET_COLUMN].isin([0, 1])]
+    if labelled[TARGET_COLUMN].nunique() == 2:
+        from sklearn.metrics import roc_auc_score
+
+        y = labelled[TARGET_COLUMN].astype(int)
+        summary['labelled'] = len(labelled)
+        summary['old_auc'] = float(roc_auc_score(y, labelled['old_probability']))
+        summary['new_auc'] = float(roc_auc_score(y, labelled['new_probability']))
+    return summary
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Re-score historical petitions with an old and a new bundle")
+    parser.add_argument('--new', required=True, help="Bundle directory of the new model")
+    parser.add_argument('--old', help="Bundle directory of the old model (default: the served version)")
+    parser.add_argument('--input', nargs='*', default=[], help="Extra CSV/XLSX request exports")
+    parser.add_argument('--no-reference', action='store_true', help="Skip processed_petition_data")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Extraction processes")
+    parser.add_argument('--store', default=str(STORE_PATH), help="Feature store; 'none' to extract everything")
+    parser.add_argument('--out', default=str(REPLAY_DIR), help="Directory for replay.csv")
+    parser.add_argument('--top', type=int, default=TOP_MOVERS, help="Largest movers to print")
+    args = parser.parse_args(argv)
+
+    try:
+        old = load_model_artifacts(args.old or default_old_bundle(), data_dir=None)
+        new = load_model_artifacts(args.new, data_dir=None)
+        petitions: List[Dict[str, Any]] = []
+        if not args.no_reference:
+            reference = load_reference_data(DATA_DIR)
+            if reference is not None:
+                petitions.extend(
+                    reference[[col for col in PETITION_COLUMNS if col in reference.columns]].to_dict('records')
+                )
+        for path in args.input:
+            petitions.extend(load_petitions(path))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if not petitions:
+        print("No petitions to replay", file=sys.stderr)
+        return 1
+
+    store_path = None if args.store == 'none' else args.store
+    report = replay(old, new, petitions, workers=args.workers, store_path=store_path)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report.to_csv(out_dir / 'replay.csv', index=False)
+
+    summary = replay_summary(report)
+    seconds = report.attrs['extract_seconds'] + report.attrs['score_seconds']
+    print(f"Replayed {len(report):,} petitions in {seconds:.1f}s "
+          f"({report.attrs['extract_seconds']:.1f}s extraction, {len(report) / seconds * 60:,.0f}/min)")
+    for name, value in summary.items():
+        print(f"  {name:<18}{value:.4f}" if isinstance(value, float) else f"  {name:<18}{value}")
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 3):
+        print("\nGrade changes (rows: old, columns: new)")
+        order = [grade for _, grade, _, _ in GRADES]
+        print(pd.crosstab(pd.Categorical(report['old_grade'], order), pd.Categorical(report['new_grade'], order),
+                          rownames=['old'], colnames=['new'], dropna=False).to_string())
+        print("\nLargest movers")
+        movers = report.reindex(report['shift'].abs().sort_values(ascending=False).index).head(args.top)
+        print(movers[['source', 'petition_id', 'title', 'old_probability', 'new_probability', 'shift']]
+              .to_string(index=False))
+    print(f"\nFull report: {out_dir / 'replay.csv'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Request Profiling
+Runs a single petition analysis under cProfile and reports where the time
+went: the hottest functions overall and a call tree under
+StreamlitPetitionPipeline.extract_features. Nothing is profiled unless asked
+for, so the normal request path pays nothing.
+
+On the Petition Analyzer page, set PETITION_PROFILE_TOKEN and open the page
+with ?profile=<token>; each analysis then gets a downloadable report.
+
+Usage, from the streamlit_app directory:
+    python -m utils.request_profiling --title "Save the park" --description "..."
+    python -m utils.request_profiling --json petition.json --top 40 --out build/profile
+"""
+
+import argparse
+import cProfile
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+PROFILE_TOKEN = os.environ.get('PETITION_PROFILE_TOKEN', '')
+# Function the call tree starts from
+TREE_ROOT = 'extract_features'
+TREE_ROOT_FILE = 'pipeline.py'
+# Call tree depth, and smallest share of the root's time a branch needs to be shown
+TREE_DEPTH = 5
+TREE_MIN_SHARE = 0.01
+TOP_FUNCTIONS = 25
+
+FunctionKey = Tuple[str, int, str]
+
+
+def profiling_allowed(query_value: Optional[str]) -> bool:
+    """Whether a ?profile= value switches profiling on; never without a configured token"""
+    # Constant-time comparison, so response timing does not leak the token; bytes,
+    # since compare_digest rejects non-ASCII str
+    return bool(PROFILE_TOKEN) and hmac.compare_digest((query_value or '').encode(), PROFILE_TOKEN.encode())
+
+
+def profile_call(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, pstats.Stats]:
+    """Call fn under cProfile; returns its result and the collected stats"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    return result, pstats.Stats(profiler)
+
+
+def _label(func: FunctionKey) -> str:
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def _find_root(stats: pstats.Stats) -> Optional[FunctionKey]:
+    for func in stats.stats:
+        if func[2] == TREE_ROOT and Path(func[0]).name == TREE_ROOT_FILE:
+            return func
+    return None
+
+
+def call_tree(stats: pstats.Stats, depth: int = TREE_DEPTH, min_share: float = TREE_MIN_SHARE) -> List[str]:
+    """
+    Indented call tree under the pipeline's extract_features
+
+    Each line gives the cumulative time spent in a callee from that caller,
+    its share of the root and the call count. Branches below `min_share`
+    of the root are left out, and recursion is cut where a function repeats.
+    """
+    root = _find_root(stats)
+    if root is None:
+        return [f"{TREE_ROOT} was not called"]
+    stats.calc_callees()
+    total = stats.stats[root][3] or 1e-12
+    lines = [f"{stats.stats[root][3] * 1000:9.2f} ms  100.0%  {stats.stats[root][1]:>6}  {_label(root)}"]
+
+    def walk(func: FunctionKey, level: int, path: Tuple[FunctionKey, ...]) -> None:
+        if level > depth:
+            return
+        callees = sorted(stats.all_callees.get(func, {}).items(), key=lambda item: item[1][3], reverse=True)
+        for callee, (_, calls, _, cumulative) in callees:
+            if cumulative / total < min_share or callee in path:
+                continue
+            lines.append(f"{cumulative * 1000:9.2f} ms  {cumulative / total:6.1%}  {calls:>6}  "
+                         f"{'  ' * level}{_label(callee)}")
+            walk(callee, level + 1, path + (callee,))
+
+    walk(root, 1, (root,))
+    return lines
+
+
+def profile_report(stats: pstats.Stats, top: int = TOP_FUNCTIONS) -> str:
+    """Plain-text report: call tree of the pipeline, then the hottest functions"""
+    lines = ["Call tree under StreamlitPetitionPipeline.extract_features",
+             "  cumulative   share   calls  function"]
+    lines += call_tree(stats)
+    buffer = io.StringIO()
+    # Tables from a copy with short paths, leaving the caller's stats as collected
+    table = pstats.Stats(stream=buffer)
+    table.add(stats)
+    table.strip_dirs().sort_stats('cumulative').print_stats(top)
+    table.sort_stats('tottime').print_stats(top)
+    lines += ['', f"Top {top} functions by cumulative and by own time", buffer.getvalue()]
+    return '\n'.join(lines)
+
+
+def stats_bytes(stats: pstats.Stats) -> bytes:
+    """Stats in the .prof format pstats and snakeviz read"""
+    return marshal.dumps(stats.stats)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .data_processing import MODELS_DIR, load_model_artifacts
+    from .pipeline import StreamlitPetitionPipeline
+    from .scoring import predict_success
+
+    parser = argparse.ArgumentParser(description="Profile the analysis of one petition")
+    parser.add_argument('--json', help="JSON file with the petition's fields")
+    parser.add_argument('--title', default='')
+    parser.add_argument('--description', default='')
+    parser.add_argument('--letter-body', default='')
+    parser.add_argument('--targeting', default='', help="targeting_description")
+    parser.add_argument('--locale', default='en-IN', help="original_locale")
+    parser.add_argument('--models-dir', default=str(MODELS_DIR), help="Bundle to score with")
+    parser.add_argument('--cold', action='store_true', help="Profile the first analysis, including lazy loads")
+    parser.add_argument('--top', type=int, default=TOP_FUNCTIONS, help="Functions listed per table")
+    parser.add_argument('--out', help="Directory to write profile.txt and profile.prof to")
+    args = parser.parse_args(argv)
+
+    if args.json:
+        with open(args.json) as f:
+            petition: Dict[str, Any] = json.load(f)
+    else:
+        petition = {'title': args.title, 'description': args.description, 'letter_body': args.letter_body,
+                    'targeting_description': args.targeting, 'original_locale': args.locale}
+    if not petition.get('title') and not petition.get('description'):
+        parser.error("give a petition with --json or at least --title/--description")
+
+    artifacts = load_model_artifacts(args.models_dir, data_dir=None)
+    pipeline = StreamlitPetitionPipeline.from_artifacts(artifacts)
+    if not args.cold:
+        # NLTK, textstat and the lexicon load on first use; keep them out of the profile
+        predict_success(petition, artifacts, pipeline)
+    (probability, _, _), stats = profile_call(predict_success, petition, artifacts, pipeline)
+    report = profile_report(stats, args.top)
+    print(f"Probability {probability:.3f}\n")
+    print(report)
+    if args.out:
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / 'profile.txt').write_text(report)
+        (out_dir / 'profile.prof').write_bytes(stats_bytes(stats))
+        print(f"Wrote {out_dir / 'profile.txt'} and {out_dir / 'profile.prof'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
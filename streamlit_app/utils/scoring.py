@@ -0,0 +1,195 @@
+"""
+Petition Scoring
+Model prediction, heuristic fallback scoring and feedback generation for
+petitions, importable without Streamlit
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from .text_model import blend_probability, text_probabilities
+from .timing import NULL_TIMER
+
+logger = logging.getLogger(__name__)
+
+# Lowest probability for each grade, best first: (threshold, grade, CSS class, summary)
+GRADES = (
+    (0.8, "🏆 EXCELLENT", "success-excellent", "Your petition has exceptional success potential!"),
+    (0.7, "🎯 VERY GOOD", "success-good", "Your petition has strong success potential with minor optimizations."),
+    (0.6, "✅ GOOD", "success-good", "Your petition shows good potential with some improvements needed."),
+    (0.5, "📈 MODERATE", "success-moderate",
+     "Your petition has moderate potential - several improvements recommended."),
+    (0.4, "⚠️ NEEDS WORK", "success-moderate", "Your petition needs significant improvements to succeed."),
+    (0.0, "🔧 MAJOR REVISION NEEDED", "success-poor", "Your petition requires major restructuring for success."),
+)
+
+
+# ============================================================================
+# PREDICTION
+# ============================================================================
+def score_features(model_artifacts, feature_array, petition_data):
+    """
+    Probability and prediction of a model for one model-ordered feature row
+
+    With a text model loaded, its probability is blended in and the
+    prediction thresholds the blend at 0.5.
+    """
+    probability = model_artifacts['model'].predict_proba(feature_array)[0, 1]
+    text_model = model_artifacts.get('text_model')
+    if text_model is not None:
+        probability = blend_probability(probability, text_model, petition_data)
+        return probability, int(probability >= 0.5)
+    return probability, model_artifacts['model'].predict(feature_array)[0]
+
+def score_matrix(model_artifacts, feature_matrix, petitions):
+    """
+    Probabilities and predictions for many model-ordered feature rows
+
+    The batch form of score_features, for offline scoring; `petitions` are
+    only read when the bundle has a text model.
+    """
+    probabilities = model_artifacts['model'].predict_proba(feature_matrix)[:, 1]
+    text_model = model_artifacts.get('text_model')
+    if text_model is not None:
+        weight = text_model['blend_weight']
+        probabilities = (1 - weight) * probabilities + weight * text_probabilities(text_model, petitions)
+        return probabilities, (probabilities >= 0.5).astype(np.int8)
+    return probabilities, model_artifacts['model'].predict(feature_matrix).astype(np.int8)
+
+def grade_for(probability):
+    """Grade, CSS class and one-line summary for a success probability"""
+    for threshold, grade, grade_class, overall in GRADES:
+        if probability >= threshold:
+            return grade, grade_class, overall
+    return GRADES[-1][1:]
+
+
+def predict_success(petition_data, model_artifacts, pipeline, on_error=None, shadow=None, timer=NULL_TIMER):
+    """
+    Predict petition success probability
+
+    Falls back to the heuristic demo score when no model is loaded or the model
+    fails; `on_error` is called with the exception in the latter case. With a
+    `shadow` scorer, the feature row is also queued for the shadow candidate.
+    A StageTimer as `timer` gets laps for extraction stages and prediction.
+    """
+    if not model_artifacts:
+        return demo_prediction(petition_data, pipeline, timer)
+    try:
+        features = pipeline.extract_features(petition_data, timer=timer)
+        
+        # Create feature vector: one gather from the schema-ordered row
+        if features.schema is model_artifacts['schema']:
+            model_columns = model_artifacts['model_columns']
+        else:
+            model_columns = features.schema.positions(model_artifacts['features'])
+        feature_array = features.select(model_columns)
+        start = time.perf_counter()
+        probability, prediction = score_features(model_artifacts, feature_array, petition_data)
+        timer.lap('predict')
+        if shadow is not None:
+            shadow.submit(
+                features, petition_data, model_artifacts, probability, prediction,
+                (time.perf_counter() - start) * 1000
+            )
+            timer.lap('shadow')
+        return probability, prediction, features
+    except Exception as e:
+        logger.warning("Prediction error: %s", e)
+        if on_error is not None:
+            on_error(e)
+        return demo_prediction(petition_data, pipeline, timer)
+def demo_prediction(petition_data, pipeline, timer=NULL_TIMER):
+    """Demo prediction when model is not available"""
+    features = pipeline.extract_features(petition_data, timer=timer)
+    # Simple scoring system
+    score = 0.0
+    # Content length (40% weight)
+    content_score = features.get('content_comprehensiveness_score', 0)
+    if content_score >= 2000:
+        score += 0.4
+    elif content_score >= 1000:
+        score += 0.25
+    elif content_score >= 500:
+        score += 0.15
+    # HTML formatting (20% weight)
+    html_tags = features.get('description_html_tags', 0)
+    score += min(html_tags / 25, 1) * 0.20
+    # Strategic language (25% weight)
+    urgency_count = features.get('title_urgency_count', 0) + features.get('description_urgency_count', 0)
+    action_count = features.get('title_action_count', 0) + features.get('description_action_count', 0)
+    strategic_score = min((urgency_count + action_count) / 8, 1)
+    score += strategic_score * 0.25
+    # Professional sophistication (15% weight)
+    prof_score = features.get('professional_sophistication_score', 0)
+    score += prof_score * 0.15
+    probability = min(score, 0.95)
+    prediction = 1 if probability >= 0.5 else 0
+    timer.lap('predict')
+    return probability, prediction, features
+# ============================================================================
+# FEEDBACK GENERATION
+# ============================================================================
+def generate_detailed_feedback(petition_data, features, probability, prediction):
+    """Generate comprehensive feedback and recommendations"""
+    
+    feedback = {
+        'probability': probability,
+        'prediction': prediction,
+        'grade': '',
+        'strengths': [],
+        'improvements': [],
+        'specific_recommendations': [],
+        'metrics': {}
+    }
+    # Overall grade and styling
+    feedback['grade'], feedback['grade_class'], feedback['overall'] = grade_for(probability)
+    # Analyze specific metrics
+    content_score = features.get('content_comprehensiveness_score', 0)
+    html_tags = features.get('description_html_tags', 0)
+    urgency_count = features.get('title_urgency_count', 0) + features.get('description_urgency_count', 0)
+    action_count = features.get('title_action_count', 0) + features.get('description_action_count', 0)
+    prof_score = features.get('professional_sophistication_score', 0)
+    # Content analysis
+    if content_score >= 2000:
+        feedback['strengths'].append("✅ Excellent content comprehensiveness")
+    elif content_score >= 1000:
+        feedback['strengths'].append("✅ Good content length")
+    else:
+        feedback['improvements'].append("📝 Increase content comprehensiveness")
+        feedback['specific_recommendations'].append(
+            f"Expand total content to 2000+ characters (current: {content_score:.0f})"
+        )
+    # HTML formatting
+    if html_tags >= 15:
+        feedback['strengths'].append("✅ Professional HTML formatting")
+    else:
+        feedback['improvements'].append("🎨 Improve formatting and structure")
+        feedback['specific_recommendations'].append(
+            f"Add HTML formatting: <b>bold</b>, <strong>emphasis</strong>, <h3>headers</h3> (current: {html_tags} tags)"
+        )
+    # Strategic language
+    if urgency_count >= 2:
+        feedback['strengths'].append("✅ Strong urgency language")
+    else:
+        feedback['specific_recommendations'].append(
+            "Add urgency keywords: 'immediate', 'urgent', 'critical', 'emergency'"
+        )
+    if action_count >= 3:
+        feedback['strengths'].append("✅ Strong action-oriented language")
+    else:
+        feedback['specific_recommendations'].append(
+            "Include more action words: 'demand', 'stop', 'implement', 'enforce'"
+        )
+    # Store metrics for display
+    feedback['metrics'] = {
+        'Content Length': f"{content_score:.0f} characters",
+        'HTML Tags': f"{html_tags}",
+        'Urgency Words': f"{urgency_count}",
+        'Action Words': f"{action_count}",
+        'Professional Score': f"{prof_score:.2f}",
+        'Success Probability': f"{probability:.1%}"
+    }
+    return feedback
@@ -0,0 +1,230 @@
+"""
+Shadow Scoring
+Scores a candidate model on live analyzer traffic next to the served one.
+predict_success hands over the feature row it already extracted, so the
+candidate costs one predict_proba and no second NLP pass; scoring happens on
+a background thread and the user-facing result never waits for it. Both
+models' outputs and latencies go to a CSV log for offline comparison.
+
+The candidate is the registry's SHADOW version:
+    python -m utils.model_registry shadow v3
+
+Usage, from the streamlit_app directory:
+    python -m utils.shadow                      # compare the logged scores
+"""
+
+import argparse
+import csv
+import logging
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR
+from .feature_engineering import FeatureRecord, family_feature_names
+from .scoring import score_features
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = APP_DIR / 'logs'
+SHADOW_LOG_PATH = LOG_DIR / 'shadow_scores.csv'
+LOG_FIELDS = (
+    'timestamp', 'production', 'candidate', 'production_probability', 'candidate_probability',
+    'production_prediction', 'candidate_prediction', 'disagree', 'production_ms', 'candidate_ms',
+)
+# Requests waiting for the shadow model; beyond this they are dropped, not queued
+QUEUE_SIZE = 256
+
+
+def candidate_columns(production: Mapping[str, Any], candidate: Mapping[str, Any],
+                      schema) -> Optional[np.ndarray]:
+    """
+    Positions of the candidate's features in the production feature row
+
+    None if the production row cannot stand in for the candidate's own
+    extraction: a different keyword matching mode or locale variant setting,
+    a feature the row lacks,
+    a feature from a family production skips, or a categorical feature the
+    two bundles' encoders code differently.
+    """
+    if (candidate['keyword_matching'] != production['keyword_matching']
+            or candidate['locale_variants'] != production['locale_variants']):
+        return None
+    skipped = {name for group in production['disabled_families'] for name in family_feature_names(group)}
+    if any(name not in schema.index or name in skipped for name in candidate['features']):
+        return None
+    for name in candidate['features']:
+        if name.endswith('_encoded'):
+            field = name[:-len('_encoded')]
+            if _encoder_classes(production, field) != _encoder_classes(candidate, field):
+                return None
+    return schema.positions(candidate['features'])
+
+
+def _encoder_classes(model_artifacts: Mapping[str, Any], field: str) -> Optional[List[str]]:
+    lookup = model_artifacts['categorical_lookup']
+    return lookup.classes.get(field) if lookup is not None else None
+
+
+class ShadowScorer:
+    """
+    Background scoring of the shadow candidate
+
+    submit() only copies the feature row onto a bounded queue; a worker
+    thread, started on first use, scores queued requests in batches and
+    appends one log row each. Requests arriving while the queue is full are
+    dropped and counted.
+    """
+
+    def __init__(self, candidates, path: Union[str, Path] = SHADOW_LOG_PATH, queue_size: int = QUEUE_SIZE):
+        """
+        Args:
+            candidates: LiveModels following the registry's SHADOW pointer
+        """
+        self.candidates = candidates
+        self.path = Path(path)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self._columns: Dict[Tuple[Any, ...], Optional[np.ndarray]] = {}
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, features: FeatureRecord, petition_data: Mapping[str, Any],
+               production: Mapping[str, Any], probability: float, prediction: int,
+               latency_ms: float) -> bool:
+        """Queue one served prediction for shadow scoring; never blocks or raises"""
+        try:
+            if self._worker is None:
+                self._start()
+            self.queue.put_nowait((
+                time.time(), features.schema, features.values.copy(), petition_data, production,
+                float(probability), int(prediction), latency_ms
+            ))
+            self.submitted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+        except Exception as e:
+            logger.warning("Shadow submit failed: %s", e)
+            return False
+
+    def flush(self) -> None:
+        """Wait until every queued request has been scored and logged"""
+        self.queue.join()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score_batch(batch)
+            except Exception as e:
+                logger.warning("Shadow scoring failed: %s", e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _score_batch(self, batch: List[tuple]) -> None:
+        candidate = self.candidates.get()
+        if candidate is None:
+            return
+        rows = []
+        for timestamp, schema, values, petition_data, production, probability, prediction, latency_ms in batch:
+            key = (production.get('version'), candidate['version'], id(schema))
+            if key not in self._columns:
+                self._columns[key] = candidate_columns(production, candidate, schema)
+                if self._columns[key] is None:
+                    logger.warning("Shadow version %s cannot reuse features of %s; not scoring it",
+                                   candidate['version'], production.get('version'))
+            columns = self._columns[key]
+            if columns is None:
+                continue
+            start = time.perf_counter()
+            shadow_probability, shadow_prediction = score_features(
+                candidate, values[columns].reshape(1, -1), petition_data
+            )
+            shadow_ms = (time.perf_counter() - start) * 1000
+            rows.append((
+                f'{timestamp:.3f}', production.get('version'), candidate['version'],
+                f'{probability:.6f}', f'{shadow_probability:.6f}', prediction, int(shadow_prediction),
+                int(prediction != shadow_prediction), f'{latency_ms:.3f}', f'{shadow_ms:.3f}',
+            ))
+        if rows:
+            self._append(rows)
+            self.scored += len(rows)
+
+    def _append(self, rows: List[tuple]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        new_file = not self.path.exists()
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(LOG_FIELDS)
+            writer.writerows(rows)
+
+
+def shadow_report(path: Union[str, Path] = SHADOW_LOG_PATH):
+    """
+    Per production/candidate pair: agreement, probability gap and latency
+
+    Returns:
+        DataFrame with one row per (production, candidate) pair, or None if
+        nothing has been logged
+    """
+    import pandas as pd
+
+    path = Path(path)
+    if not path.exists():
+        return None
+    log = pd.read_csv(path, dtype={'production': str, 'candidate': str})
+    log['gap'] = (log['candidate_probability'] - log['production_probability']).abs()
+    grouped = log.groupby(['production', 'candidate'])
+    return pd.DataFrame({
+        'requests': grouped.size(),
+        'disagreement_rate': grouped['disagree'].mean(),
+        'mean_gap': grouped['gap'].mean(),
+        'production_positive_rate': grouped['production_prediction'].mean(),
+        'candidate_positive_rate': grouped['candidate_prediction'].mean(),
+        'production_p50_ms': grouped['production_ms'].median(),
+        'production_p95_ms': grouped['production_ms'].quantile(0.95),
+        'candidate_p50_ms': grouped['candidate_ms'].median(),
+        'candidate_p95_ms': grouped['candidate_ms'].quantile(0.95),
+    }).reset_index()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Compare shadow and production scores")
+    parser.add_argument('--path', default=str(SHADOW_LOG_PATH), help="Shadow score log")
+    args = parser.parse_args(argv)
+
+    report = shadow_report(args.path)
+    if report is None:
+        print(f"No shadow scores logged at {args.path}")
+        return 1
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.precision', 3):
+        print(report.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
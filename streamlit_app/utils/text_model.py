@@ -0,0 +1,348 @@
+"""
+Text Model
+Optional bag-of-words branch next to the engineered-feature model. Petition
+text is hashed into a fixed number of columns and a logistic SGD classifier is
+trained with partial_fit on chunks streamed from CSV or XLSX, so memory is
+bounded by the chunk size and hash width however large the archive is. The
+app blends its probability with the tree model's in predict_success.
+
+The blend weight is chosen on a validation slice of the tree model's training
+rows, scored by a tree refitted without them, and the chosen blend is then
+reported on the bundle's holdout and recorded in bundle.json and
+evaluation_predictions.npz.
+
+Usage, from the streamlit_app directory:
+    python -m utils.text_model --input archive.csv          # writes models/text_model.pkl
+    python -m utils.text_model --input archive.xlsx --epochs 3 --blend-weight 0.2
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_processing import MANIFEST_FILE, MODELS_DIR, TEXT_MODEL_FILE, load_manifest, load_model_artifacts
+from .feature_engineering import TAG_PATTERN, TEXT_COLUMNS, is_missing
+
+# Hashed columns; the classifier's weight vector is this long whatever the corpus
+N_HASH_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 1)
+# Petitions per partial_fit call
+CHUNK_SIZE = 2000
+EPOCHS = 5
+SGD_ALPHA = 1e-5
+RANDOM_STATE = 42
+# Share of the blended probability taken from the text model when the
+# validation rows do not pick one
+DEFAULT_BLEND_WEIGHT = 0.3
+BLEND_GRID = tuple(np.round(np.arange(0, 1.01, 0.1), 1))
+
+
+def petition_text(petition: Mapping[str, Any]) -> str:
+    """The petition's text fields joined, with HTML tags removed"""
+    return ' '.join(
+        TAG_PATTERN.sub(' ', str(petition[col])) for col in TEXT_COLUMNS
+        if col in petition and not is_missing(petition[col])
+    )
+
+
+def make_vectorizer():
+    """Stateless hashing vectorizer; nothing is fitted, so chunks never grow a vocabulary"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        n_features=N_HASH_FEATURES, ngram_range=NGRAM_RANGE, alternate_sign=False, dtype=np.float32
+    )
+
+
+# ============================================================================
+# STREAMING INPUT
+# ============================================================================
+def _read_xlsx(path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, ())]
+        chunk = []
+        for row in rows:
+            chunk.append(dict(zip(header, row)))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def _read_xls(path: Path, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    # openpyxl cannot stream the legacy binary format, so it is read whole
+    import pandas as pd
+
+    records = pd.read_excel(path).to_dict('records')
+    for start in range(0, len(records), chunk_size):
+        yield records[start:start + chunk_size]
+
+
+def _read_csv(path: Path, chunk_size: int, columns: Sequence[str]) -> Iterator[List[Dict[str, Any]]]:
+    import pandas as pd
+
+    for frame in pd.read_csv(path, chunksize=chunk_size, usecols=lambda col: col in columns):
+        yield frame.to_dict('records')
+
+
+def iter_chunks(path: Union[str, Path], chunk_size: int = CHUNK_SIZE,
+                label_column: Optional[str] = None) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Stream (texts, labels) chunks from a CSV or spreadsheet file
+
+    Only one chunk of rows is held at a time, except for legacy .xls files,
+    which are read whole. Rows without a 0/1 label are skipped.
+
+    Args:
+        label_column: Target column, TARGET_COLUMN of the training pipeline
+            by default
+    """
+    from .training import EXCEL_SUFFIXES
+
+    if label_column is None:
+        from .training import TARGET_COLUMN as label_column
+
+    path = Path(path)
+    if path.suffix == '.xls':
+        chunks = _read_xls(path, chunk_size)
+    elif path.suffix in EXCEL_SUFFIXES:
+        chunks = _read_xlsx(path, chunk_size)
+    else:
+        chunks = _read_csv(path, chunk_size, TEXT_COLUMNS + (label_column,))
+    for records in chunks:
+        texts, labels = [], []
+        for record in records:
+            label = record.get(label_column)
+            if is_missing(label) or label not in (0, 1):
+                continue
+            texts.append(petition_text(record))
+            labels.append(int(label))
+        if texts:
+            yield texts, np.array(labels, dtype=np.int8)
+
+
+# ============================================================================
+# TRAINING
+# ============================================================================
+def train_text_model(path: Union[str, Path], epochs: int = EPOCHS, chunk_size: int = CHUNK_SIZE,
+                     exclude: Sequence[str] = (), log=print) -> Dict[str, Any]:
+    """
+    Train the hashed bag-of-words classifier out of core
+
+    Each epoch streams the file again and calls partial_fit once per chunk,
+    with rows shuffled within the chunk.
+
+    Args:
+        exclude: Petition texts (as built by petition_text) to leave out,
+            e.g. the tree model's holdout so the blend can be scored on it
+
+    Returns:
+        Text model artifact: vectorizer, classifier and training counts
+    """
+    from sklearn.linear_model import SGDClassifier
+
+    vectorizer = make_vectorizer()
+    classifier = SGDClassifier(loss='log_loss', alpha=SGD_ALPHA, random_state=RANDOM_STATE)
+    excluded = set(exclude)
+    rng = np.random.default_rng(RANDOM_STATE)
+    n_trained = n_excluded = 0
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        n_trained = n_excluded = 0
+        for texts, labels in iter_chunks(path, chunk_size):
+            keep = np.array([text not in excluded for text in texts], dtype=bool)
+            n_excluded += int((~keep).sum())
+            if not keep.any():
+                continue
+            order = rng.permutation(np.flatnonzero(keep))
+            X = vectorizer.transform([texts[i] for i in order])
+            classifier.partial_fit(X, labels[order], classes=np.array([0, 1]))
+            n_trained += len(order)
+        log(f"[text] epoch {epoch + 1}/{epochs}: {n_trained} petitions in {time.perf_counter() - start:.1f}s")
+    if not n_trained:
+        raise ValueError(f"{path} has no labelled petitions to train on")
+    return {
+        'vectorizer': vectorizer,
+        'classifier': classifier,
+        'blend_weight': DEFAULT_BLEND_WEIGHT,
+        'n_trained': n_trained,
+        'n_excluded': n_excluded,
+        'epochs': epochs,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+def text_probability(text_model: Mapping[str, Any], petition: Mapping[str, Any]) -> float:
+    """
+    Text model probability for one petition
+
+    A sparse dot product over the petition's hashed n-grams only, instead of
+    going through the classifier's dense input validation.
+    """
+    X = text_model['vectorizer'].transform([petition_text(petition)])
+    classifier = text_model['classifier']
+    margin = float(X.data @ classifier.coef_[0, X.indices]) + float(classifier.intercept_[0])
+    return 1.0 / (1.0 + np.exp(-margin))
+
+
+def text_probabilities(text_model: Mapping[str, Any], petitions: Sequence[Mapping[str, Any]]) -> np.ndarray:
+    """Text model probabilities for a batch of petitions"""
+    X = text_model['vectorizer'].transform([petition_text(petition) for petition in petitions])
+    return text_model['classifier'].predict_proba(X)[:, 1]
+
+
+def blend_probability(tree_probability: float, text_model: Mapping[str, Any],
+                      petition: Mapping[str, Any]) -> float:
+    """Tree model probability blended with the text model's"""
+    weight = text_model['blend_weight']
+    return (1 - weight) * tree_probability + weight * text_probability(text_model, petition)
+
+
+def blend_curve(text_model: Mapping[str, Any], records: Sequence[Mapping[str, Any]],
+                y_true: np.ndarray, tree_scores: np.ndarray) -> List[Dict[str, float]]:
+    """AUC of the blend on the given rows at every weight in BLEND_GRID"""
+    from sklearn.metrics import roc_auc_score
+
+    text_scores = text_probabilities(text_model, records)
+    return [
+        {'weight': float(weight),
+         'auc': float(roc_auc_score(y_true, (1 - weight) * tree_scores + weight * text_scores))}
+        for weight in BLEND_GRID
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from sklearn.base import clone
+    from sklearn.metrics import roc_auc_score
+
+    from .model_performance import (
+        EVALUATION_PATH, SPLIT_SEED, TEST_SIZE, file_digest, save_evaluation_predictions
+    )
+    from .training import CACHE_DIR, INPUT_PATH, StageCache, TrainingPipeline
+
+    parser = argparse.ArgumentParser(description="Train the hashed bag-of-words text model out of core")
+    parser.add_argument('--input', required=True, help="Petition archive (csv or xlsx) with a target_success column")
+    parser.add_argument('--models-dir', default=str(MODELS_DIR), help="Directory holding the tree model bundle")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--blend-weight', type=float, default=None,
+                        help="Text model share of the blended probability "
+                             "(default: best on a validation slice of the training rows)")
+    parser.add_argument('--training-input', default=str(INPUT_PATH),
+                        help="Tree model training data; its holdout and validation rows are excluded")
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR))
+    args = parser.parse_args(argv)
+
+    models_dir = Path(args.models_dir)
+    artifacts = load_model_artifacts(models_dir, data_dir=None)
+    model = artifacts['model']
+    # The tree model's rows, split and featurized as the bundle was trained
+    manifest = load_manifest(models_dir)
+    training_pipeline = TrainingPipeline(
+        input_path=args.training_input,
+        features_path=models_dir / 'model_features.pkl',
+        keyword_matching=manifest.get('keyword_matching', 'substring'),
+        locale_variants=manifest.get('locale_variants', False),
+        test_size=manifest.get('test_size', TEST_SIZE),
+        split_seed=manifest.get('split_seed', SPLIT_SEED),
+        cache=StageCache(args.cache_dir)
+    )
+    try:
+        data = training_pipeline.load()
+        X = training_pipeline.model_matrix()
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    labels = data['labels']
+    _, test_index = training_pipeline.split()
+    fit_index, val_index = training_pipeline.validation_split()
+    holdout = [data['records'][i] for i in test_index]
+    validation = [data['records'][i] for i in val_index]
+    text_model = train_text_model(
+        args.input, epochs=args.epochs, chunk_size=args.chunk_size,
+        exclude=[petition_text(record) for record in holdout + validation]
+    )
+    print(f"Trained on {text_model['n_trained']} petitions, "
+          f"{text_model['n_excluded']} holdout and validation petitions left out")
+
+    # The bundle's tree was fitted on the validation rows, so a refit without them scores the blend
+    tree_scores = clone(model).fit(X[fit_index], labels[fit_index]).predict_proba(X[val_index])[:, 1]
+    curve = blend_curve(text_model, validation, labels[val_index], tree_scores)
+    text_model['validation_blend'] = curve
+    print(f"{'Weight':>7}{'AUC':>8}")
+    for point in curve:
+        print(f"{point['weight']:>7.1f}{point['auc']:>8.4f}")
+    if args.blend_weight is None:
+        text_model['blend_weight'] = max(curve, key=lambda point: point['auc'])['weight']
+    else:
+        text_model['blend_weight'] = args.blend_weight
+    weight = text_model['blend_weight']
+
+    # The holdout only reports the chosen blend
+    y_true = labels[test_index]
+    tree_scores = model.predict_proba(X[test_index])[:, 1]
+    y_score = (1 - weight) * tree_scores + weight * text_probabilities(text_model, holdout)
+    text_model['holdout_auc'] = {
+        'tree': float(roc_auc_score(y_true, tree_scores)),
+        'blend': float(roc_auc_score(y_true, y_score)),
+    }
+    print(f"Blend weight {weight:.1f}: holdout AUC {text_model['holdout_auc']['blend']:.4f} "
+          f"(tree model alone {text_model['holdout_auc']['tree']:.4f})")
+
+    sample = holdout[:200]
+    text_probability(text_model, sample[0])
+    start = time.perf_counter()
+    for petition in sample:
+        text_probability(text_model, petition)
+    latency_ms = (time.perf_counter() - start) / len(sample) * 1000
+    print(f"Scoring {latency_ms:.3f} ms per petition")
+
+    with open(models_dir / TEXT_MODEL_FILE, 'wb') as f:
+        pickle.dump(text_model, f)
+    print(f"Saved {models_dir / TEXT_MODEL_FILE}")
+    save_evaluation_predictions(
+        y_true, y_score, (y_score >= 0.5).astype(np.int8), models_dir / EVALUATION_PATH.name,
+        model=type(model).__name__,
+        model_file=artifacts['model_file'],
+        model_digest=file_digest(models_dir / artifacts['model_file']),
+        test_size=training_pipeline.test_size,
+        split_seed=training_pipeline.split_seed,
+        keyword_matching=training_pipeline.keyword_matching,
+        text_blend_weight=weight,
+    )
+    print(f"Saved blended holdout predictions to {models_dir / EVALUATION_PATH.name}")
+    if manifest:
+        manifest['text_model'] = {
+            'file': TEXT_MODEL_FILE,
+            'blend_weight': weight,
+            'validation_blend': curve,
+            'holdout_auc': text_model['holdout_auc'],
+            'n_trained': text_model['n_trained'],
+            'epochs': text_model['epochs'],
+            'created_at': text_model['created_at'],
+        }
+        with open(models_dir / MANIFEST_FILE, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Recorded the blend in {models_dir / MANIFEST_FILE}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
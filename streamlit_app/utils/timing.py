@@ -0,0 +1,173 @@
+"""
+Stage Timing
+Per-stage timers for one petition analysis and rolling histograms of them
+across analyses. Code under measurement calls timer.lap(stage) after each
+stage; the time since the previous lap is charged to that stage, under the
+timer's current scope (a text column, or None for whole-petition stages).
+
+Timing is off unless requested: callers get NULL_TIMER, whose lap() does
+nothing, so instrumented code costs one no-op call per stage.
+
+Set PETITION_STAGE_TIMING=1 to time every analysis by default.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('PETITION_STAGE_TIMING', '') not in ('', '0', 'false')
+# Upper bounds of the histogram buckets in ms, doubling from 10 µs to ~84 s;
+# anything slower lands in a final overflow bucket
+BUCKET_BOUNDS_MS = tuple(0.01 * 2 ** i for i in range(24))
+# Analyses each stage histogram covers
+WINDOW = 1000
+
+StageKey = Tuple[Optional[str], str]
+
+
+def stage_name(key: StageKey) -> str:
+    """'description.sentiment' for a column stage, 'predict' for a petition stage"""
+    scope, stage = key
+    return stage if scope is None else f'{scope}.{stage}'
+
+
+class StageTimer:
+    """Stage durations of one analysis, in seconds"""
+
+    __slots__ = ('laps', 'scope', '_started', '_last')
+
+    def __init__(self):
+        self.laps: Dict[StageKey, float] = {}
+        self.scope: Optional[str] = None
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Charge the time since the previous lap to `stage`"""
+        now = time.perf_counter()
+        key = (self.scope, stage)
+        self.laps[key] = self.laps.get(key, 0.0) + now - self._last
+        self._last = now
+
+    def skip(self) -> None:
+        """Start the next lap now, leaving the time since the last one uncharged"""
+        self._last = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return self._last - self._started
+
+    def record(self) -> Dict[str, Any]:
+        """The analysis as one structured log record, times in ms"""
+        return {
+            'timestamp': time.time(),
+            'total_ms': round(self.total * 1000, 3),
+            'stages': {stage_name(key): round(seconds * 1000, 3) for key, seconds in self.laps.items()},
+        }
+
+
+class _NullTimer:
+    """Stands in for a StageTimer when timing is off"""
+
+    __slots__ = ('scope',)
+
+    def __init__(self):
+        self.scope = None
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def skip(self) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class RollingHistogram:
+    """
+    Bucketed durations of the last `window` observations
+
+    Adding is a binary search and two counter updates; the oldest
+    observation's bucket is decremented as it leaves the window. The raw
+    durations are kept too, for exact quantiles over the window.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.counts = np.zeros(len(BUCKET_BOUNDS_MS) + 1, dtype=np.int64)
+        self.recent: deque = deque(maxlen=window)
+        self.total_count = 0
+        self.total_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        if len(self.recent) == self.recent.maxlen:
+            self.counts[self.recent[0][0]] -= 1
+        bucket = bisect.bisect_left(BUCKET_BOUNDS_MS, ms)
+        self.recent.append((bucket, ms))
+        self.counts[bucket] += 1
+        self.total_count += 1
+        self.total_ms += ms
+
+    def quantile(self, q: float) -> float:
+        """q-quantile of the durations in the window, in ms"""
+        return float(np.quantile([ms for _, ms in self.recent], q)) if self.recent else 0.0
+
+    def mean(self) -> float:
+        return sum(ms for _, ms in self.recent) / len(self.recent) if self.recent else 0.0
+
+
+class StageStats:
+    """Rolling histograms of every stage seen, shared across sessions"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.histograms: Dict[str, RollingHistogram] = {}
+        self.analyses = RollingHistogram(window)
+        self._lock = threading.Lock()
+
+    def add(self, timer: StageTimer, log: bool = True) -> None:
+        """Fold one analysis in and, by default, log it as a JSON record"""
+        record = timer.record()
+        with self._lock:
+            self.analyses.add(record['total_ms'])
+            for name, ms in record['stages'].items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = RollingHistogram(self.window)
+                histogram.add(ms)
+        if log:
+            logger.info("stage_timings %s", json.dumps(record))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per stage, slowest mean first, after a 'total' row for whole analyses"""
+        def row(name, histogram):
+            return {'stage': name, 'analyses': len(histogram.recent), 'mean_ms': histogram.mean(),
+                    'p50_ms': histogram.quantile(0.5), 'p95_ms': histogram.quantile(0.95)}
+
+        with self._lock:
+            rows = [row(name, histogram) for name, histogram in self.histograms.items()]
+            total = row('total', self.analyses)
+        return [total] + sorted(rows, key=lambda row: row['mean_ms'], reverse=True)
+
+    def export(self) -> Dict[str, Any]:
+        """Histograms as a JSON-serialisable dict, for download or log shipping"""
+        with self._lock:
+            return {
+                'bucket_bounds_ms': list(BUCKET_BOUNDS_MS),
+                'window': self.window,
+                'total': {'counts': self.analyses.counts.tolist(), 'total_count': self.analyses.total_count,
+                          'total_ms': self.analyses.total_ms},
+                'stages': {
+                    name: {'counts': histogram.counts.tolist(), 'total_count': histogram.total_count,
+                           'total_ms': histogram.total_ms}
+                    for name, histogram in self.histograms.items()
+                },
+            }
@@ -0,0 +1,522 @@
+"""
+Training Pipeline
+Command-line reproduction of the model training in notebooks 02/03, split into
+explicit stages: load/validate, feature extraction, train, evaluate and export.
+Every stage output is cached on disk under a key built from its inputs and its
+code version, so changing only model hyperparameters reuses the extracted
+features instead of re-running the NLP pass over the corpus. When the input
+file does change, the feature store limits extraction to new or edited
+petitions.
+
+Usage, from the streamlit_app directory:
+    python -m utils.training                              # bundle in build/bundle
+    python -m utils.training --max-depth 4 --n-estimators 200
+    python -m utils.training --keyword-matching token --out models
+    python -m utils.training --stage features             # stop after a stage
+    python -m utils.training --select-features            # prune costly feature families
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_processing import APP_DIR, COMPACT_MODEL_FILE, MANIFEST_FILE, MODEL_FILE, MODELS_DIR
+from .feature_engineering import CATEGORICAL_FEATURES, TEXT_COLUMNS, CategoricalLookup, FeatureSchema
+from .feature_selection import (
+    DEFAULT_AUC_TOLERANCE, DEFAULT_COST_WEIGHT, SELECTION_SEED, VALIDATION_FRACTION, format_selection,
+    measure_extraction_ms, measure_family_costs, select_features
+)
+from .feature_store import STORE_PATH, FeatureStore
+from .lexicon import lexicon_version_hash
+from .model_performance import (
+    DEFAULT_BOOTSTRAP_SAMPLES, SPLIT_SEED, TEST_SIZE, bootstrap_metrics, file_digest,
+    save_evaluation_predictions
+)
+from .pipeline import KEYWORD_MATCHING_MODES, PIPELINE_VERSION, missing_nlp_data
+
+INPUT_PATH = APP_DIR.parent / 'docs' / 'inputdata.xlsx'
+FEATURES_PATH = MODELS_DIR / 'model_features.pkl'
+CACHE_DIR = APP_DIR / '.cache' / 'training'
+BUNDLE_DIR = APP_DIR / 'build' / 'bundle'
+
+STAGES = ('load', 'features', 'select', 'train', 'evaluate', 'export')
+# Bump a stage's version when its code changes what it produces
+STAGE_VERSIONS = {'load': '1', 'features': '1', 'select': '1', 'train': '1', 'evaluate': '1'}
+
+TARGET_COLUMN = 'target_success'
+# Inputs with these suffixes are read as spreadsheets, anything else as CSV
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm', '.xls')
+REQUIRED_COLUMNS = (TARGET_COLUMN, 'title', 'description')
+MIN_RECORDS = 100
+# Raw fields behind the encoded categorical features
+CATEGORICAL_FIELDS = tuple(name[:-len('_encoded')] for name in CATEGORICAL_FEATURES)
+
+# Gradient Boosting settings of the exported best_model.pkl (notebook 03)
+DEFAULT_MODEL_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 6, 'random_state': 42}
+
+EVALUATION_METRICS = ('accuracy', 'auc', 'precision', 'recall', 'npv', 'specificity')
+
+
+# ============================================================================
+# STAGE CACHE
+# ============================================================================
+def stage_key(stage: str, *inputs: Any) -> str:
+    """Cache key for a stage: its code version plus everything it depends on"""
+    payload = json.dumps([stage, STAGE_VERSIONS[stage], *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class StageCache:
+    """Pickled stage outputs stored as <root>/<stage>/<key>.pkl"""
+
+    def __init__(self, root: Union[str, Path] = CACHE_DIR, enabled: bool = True):
+        self.root = Path(root)
+        self.enabled = enabled
+
+    def path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f'{key}.pkl'
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Cached output, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            with open(self.path(stage, key), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        """Store an output; written to a temp file first so readers never see partial files"""
+        if not self.enabled:
+            return
+        path = self.path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+def validate_dataset(df) -> List[str]:
+    """
+    Check the input data meets the minimum requirements for training
+
+    Returns:
+        List of issues; empty if the data is usable
+    """
+    issues = []
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        issues.append(f"Missing required columns: {missing}")
+    if len(df) < MIN_RECORDS:
+        issues.append(f"Only {len(df)} records; at least {MIN_RECORDS} are required")
+    if TARGET_COLUMN in df.columns:
+        values = set(df[TARGET_COLUMN].dropna().unique())
+        if not values <= {0, 1}:
+            issues.append(f"{TARGET_COLUMN} must be binary 0/1, found {sorted(values, key=str)[:10]}")
+        if df[TARGET_COLUMN].isna().any():
+            issues.append(f"{TARGET_COLUMN} has {int(df[TARGET_COLUMN].isna().sum())} missing values")
+    text_columns = [col for col in TEXT_COLUMNS if col in df.columns]
+    if not any(df[col].notna().any() for col in text_columns):
+        issues.append("No text columns with content")
+    return issues
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+class TrainingPipeline:
+    """
+    Staged, cached model training
+
+    Stages run on demand: asking for evaluate() runs or loads train(), which
+    runs or loads features(), and so on. Keys chain, so a stage is recomputed
+    exactly when one of its inputs or its code version changed.
+    """
+
+    def __init__(
+        self,
+        input_path: Union[str, Path] = INPUT_PATH,
+        features_path: Union[str, Path] = FEATURES_PATH,
+        keyword_matching: str = 'substring',
+        locale_variants: bool = False,
+        model_params: Optional[Dict[str, Any]] = None,
+        test_size: float = TEST_SIZE,
+        split_seed: int = SPLIT_SEED,
+        n_bootstrap: int = DEFAULT_BOOTSTRAP_SAMPLES,
+        cache: Optional[StageCache] = None,
+        feature_store: Optional[Union[str, Path]] = STORE_PATH,
+        feature_selection: bool = False,
+        selection_tolerance: float = DEFAULT_AUC_TOLERANCE,
+        cost_weight: float = DEFAULT_COST_WEIGHT,
+        log: Callable[[str], None] = print
+    ):
+        if keyword_matching not in KEYWORD_MATCHING_MODES:
+            raise ValueError(f"keyword_matching must be one of {KEYWORD_MATCHING_MODES}, got {keyword_matching!r}")
+        self.input_path = Path(input_path)
+        self.keyword_matching = keyword_matching
+        self.locale_variants = locale_variants
+        self.model_params = {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+        self.test_size = test_size
+        self.split_seed = split_seed
+        self.n_bootstrap = n_bootstrap
+        self.cache = cache if cache is not None else StageCache()
+        # Per-petition feature cache shared with batch scoring; None disables it
+        self.feature_store = feature_store
+        # Cost-weighted pruning of expensive feature families before training
+        self.feature_selection = feature_selection
+        self.selection_tolerance = selection_tolerance
+        self.cost_weight = cost_weight
+        self.log = log
+        with open(features_path, 'rb') as f:
+            self.model_features = list(pickle.load(f))
+        self.stage_keys: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self._outputs: Dict[str, Any] = {}
+
+    def _run(self, stage: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Return a stage output from memory, the disk cache, or by computing it"""
+        self.stage_keys[stage] = key
+        if stage in self._outputs:
+            return self._outputs[stage]
+        start = time.perf_counter()
+        output = self.cache.get(stage, key)
+        if output is None:
+            output = compute()
+            self.cache.put(stage, key, output)
+            status = 'done'
+        else:
+            status = 'cached'
+        self.timings[stage] = time.perf_counter() - start
+        self.log(f"[{stage}] {status} in {self.timings[stage]:.1f}s (key {key})")
+        self._outputs[stage] = output
+        return output
+
+    # -- load / validate ------------------------------------------------------
+    def load(self) -> Dict[str, Any]:
+        """Read and validate the input file; keeps only the fields extraction uses"""
+        key = stage_key('load', file_digest(self.input_path), REQUIRED_COLUMNS, MIN_RECORDS)
+        return self._run('load', key, self._load)
+
+    def _load(self) -> Dict[str, Any]:
+        import pandas as pd
+
+        if self.input_path.suffix in EXCEL_SUFFIXES:
+            df = pd.read_excel(self.input_path)
+        else:
+            df = pd.read_csv(self.input_path)
+        issues = validate_dataset(df)
+        if issues:
+            raise ValueError(f"{self.input_path} failed validation: " + '; '.join(issues))
+        columns = [col for col in ('petition_id',) + TEXT_COLUMNS + CATEGORICAL_FIELDS if col in df.columns]
+        return {
+            'records': df[columns].to_dict('records'),
+            'labels': df[TARGET_COLUMN].astype(int).to_numpy(np.int8),
+        }
+
+    # -- features -------------------------------------------------------------
+    def features(self) -> Dict[str, Any]:
+        """
+        Fit the categorical encoders and extract the full feature matrix
+
+        Raises RuntimeError if textstat or the NLTK data is unavailable, since
+        the readability and token features would all be extracted as 0.
+        """
+        data = self.load()
+        missing = missing_nlp_data()
+        if missing:
+            raise RuntimeError(f"Cannot extract training features without {', '.join(missing)}; "
+                               "install the missing data and train again")
+        # The lexicon hash changes with any edit to lexicon.json, locale variants included;
+        # the empty missing-data list keeps out stages cached before this check existed
+        key = stage_key(
+            'features', self.stage_keys['load'], PIPELINE_VERSION, self.keyword_matching, self.model_features,
+            lexicon_version_hash(), missing, self.locale_variants
+        )
+        return self._run('features', key, lambda: self._extract(data))
+
+    def _extract(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        from sklearn.preprocessing import LabelEncoder
+
+        from .pipeline import StreamlitPetitionPipeline
+
+        records = data['records']
+        # Fitted on the string form of the raw values, as in notebook 03
+        encoders = {
+            field: LabelEncoder().fit([str(record[field]) for record in records])
+            for field in CATEGORICAL_FIELDS if records and field in records[0]
+        }
+        schema = FeatureSchema.for_model(self.model_features)
+        pipeline = StreamlitPetitionPipeline(
+            keyword_matching=self.keyword_matching,
+            categorical_lookup=CategoricalLookup(encoders),
+            schema=schema,
+            locale_variants=self.locale_variants
+        )
+        if self.feature_store is None:
+            matrix = pipeline.extract_feature_matrix(records)
+        else:
+            store = FeatureStore(pipeline, self.feature_store)
+            matrix = store.extract_feature_matrix(records)
+            store.close()
+            self.log(f"[features] {store.hits} petitions from the feature store, {store.misses} extracted")
+        return {
+            'matrix': matrix,
+            'names': schema.names,
+            'encoders': encoders,
+        }
+
+    def model_matrix(self, feature_names: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Feature matrix restricted to the given features, by default the model's inputs"""
+        features = self.features()
+        names = self.selected_features() if feature_names is None else feature_names
+        return features['matrix'][:, FeatureSchema(features['names']).positions(names)]
+
+    # -- select ---------------------------------------------------------------
+    def select(self) -> Optional[Dict[str, Any]]:
+        """Feature selection report, or None when selection is off"""
+        if not self.feature_selection:
+            return None
+        self.features()
+        key = stage_key(
+            'select', self.stage_keys['features'], self.model_params, self.selection_tolerance,
+            self.cost_weight, self.test_size, self.split_seed
+        )
+        return self._run('select', key, self._select)
+
+    def _select(self) -> Dict[str, Any]:
+        labels = self.load()['labels']
+        records = self.load()['records']
+        # Selection only sees training rows; the holdout stays untouched
+        train_index, _ = self.split()
+        report = select_features(
+            self.model_matrix(self.model_features)[train_index], labels[train_index],
+            self.model_features, measure_family_costs(records), self.model_params,
+            tolerance=self.selection_tolerance, cost_weight=self.cost_weight, log=self.log
+        )
+        report['extraction_ms'] = {
+            'full': measure_extraction_ms(records),
+            'selected': measure_extraction_ms(records, report['dropped_families']),
+        }
+        self.log(format_selection(report, report['extraction_ms']))
+        return report
+
+    def selected_features(self) -> List[str]:
+        """Model input features after selection"""
+        report = self.select()
+        return report['features'] if report else self.model_features
+
+    def disabled_families(self) -> List[str]:
+        """Feature families the exported model no longer needs"""
+        report = self.select()
+        return report['dropped_families'] if report else []
+
+    # -- train ----------------------------------------------------------------
+    def train(self) -> Dict[str, Any]:
+        """Stratified split and Gradient Boosting fit on the training rows"""
+        import sklearn
+
+        self.features()
+        key = stage_key(
+            'train', self.stage_keys['features'], self.selected_features(), self.model_params,
+            self.test_size, self.split_seed, sklearn.__version__
+        )
+        return self._run('train', key, self._train)
+
+    def split(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Train and holdout row indices: the notebook's stratified split"""
+        from sklearn.model_selection import train_test_split
+
+        labels = self.load()['labels']
+        return train_test_split(
+            np.arange(len(labels)), test_size=self.test_size,
+            random_state=self.split_seed, stratify=labels
+        )
+
+    def validation_split(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Training rows split again into fit and validation rows, as feature selection splits them"""
+        from sklearn.model_selection import train_test_split
+
+        labels = self.load()['labels']
+        train_index, _ = self.split()
+        return train_test_split(
+            train_index, test_size=VALIDATION_FRACTION, random_state=SELECTION_SEED, stratify=labels[train_index]
+        )
+
+    def _train(self) -> Dict[str, Any]:
+        from sklearn.ensemble import GradientBoostingClassifier
+
+        labels = self.load()['labels']
+        train_index, test_index = self.split()
+        X = self.model_matrix()
+        model = GradientBoostingClassifier(**self.model_params)
+        model.fit(X[train_index], labels[train_index])
+        return {'model': model, 'train_index': train_index, 'test_index': test_index}
+
+    # -- evaluate -------------------------------------------------------------
+    def evaluate(self) -> Dict[str, Any]:
+        """Holdout predictions and bootstrap confidence intervals"""
+        self.train()
+        key = stage_key('evaluate', self.stage_keys['train'], self.n_bootstrap)
+        return self._run('evaluate', key, self._evaluate)
+
+    def _evaluate(self) -> Dict[str, Any]:
+        trained = self.train()
+        test_index = trained['test_index']
+        X_test = self.model_matrix()[test_index]
+        y_true = self.load()['labels'][test_index]
+        y_score = trained['model'].predict_proba(X_test)[:, 1]
+        y_pred = trained['model'].predict(X_test)
+        metrics = bootstrap_metrics(
+            y_true, y_score, y_pred=y_pred, metrics=EVALUATION_METRICS, n_bootstrap=self.n_bootstrap
+        )
+        return {'y_true': y_true, 'y_score': y_score, 'y_pred': y_pred, 'metrics': metrics}
+
+    # -- export ---------------------------------------------------------------
+    def export(self, out_dir: Union[str, Path] = BUNDLE_DIR) -> Path:
+        """
+        Write a model bundle the app can load from its models directory
+
+        The bundle holds best_model.pkl, model_features.pkl,
+        categorical_encoders.pkl, the holdout predictions and a bundle.json
+        manifest recording how it was produced.
+        """
+        import sklearn
+
+        evaluation = self.evaluate()
+        trained = self.train()
+        features = self.features()
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        # A compact model left from an earlier bundle would shadow the new one
+        (out_dir / COMPACT_MODEL_FILE).unlink(missing_ok=True)
+        for name, value in (
+            (MODEL_FILE, trained['model']),
+            ('model_features.pkl', self.selected_features()),
+            ('categorical_encoders.pkl', features['encoders']),
+        ):
+            with open(out_dir / name, 'wb') as f:
+                pickle.dump(value, f)
+        model_name = type(trained['model']).__name__
+        save_evaluation_predictions(
+            evaluation['y_true'], evaluation['y_score'], evaluation['y_pred'],
+            out_dir / 'evaluation_predictions.npz',
+            model=model_name,
+            model_file=MODEL_FILE,
+            model_digest=file_digest(out_dir / MODEL_FILE),
+            test_size=self.test_size,
+            split_seed=self.split_seed,
+            keyword_matching=self.keyword_matching,
+        )
+        manifest = {
+            # A fresh training run starts a new lineage; utils.model_update bumps it
+            'version': 1,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'input': self.input_path.name,
+            'input_digest': file_digest(self.input_path),
+            'n_records': len(self.load()['labels']),
+            'model': model_name,
+            'model_params': self.model_params,
+            'sklearn_version': sklearn.__version__,
+            'pipeline_version': PIPELINE_VERSION,
+            'keyword_matching': self.keyword_matching,
+            'locale_variants': self.locale_variants,
+            'disabled_families': self.disabled_families(),
+            'test_size': self.test_size,
+            'split_seed': self.split_seed,
+            'stage_keys': dict(self.stage_keys),
+            'metrics': evaluation['metrics'],
+        }
+        with open(out_dir / MANIFEST_FILE, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        self.timings['export'] = time.perf_counter() - start
+        self.log(f"[export] wrote {out_dir} in {self.timings['export']:.1f}s")
+        return out_dir
+
+    def run(self, until: str = 'export', out_dir: Union[str, Path] = BUNDLE_DIR) -> Any:
+        """Run every stage up to and including `until`"""
+        if until == 'export':
+            return self.export(out_dir)
+        return getattr(self, until)()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Train the petition success model in cached stages")
+    parser.add_argument('--input', default=str(INPUT_PATH), help="Petition data (xlsx or csv)")
+    parser.add_argument('--features', default=str(FEATURES_PATH), help="Pickled model feature list")
+    parser.add_argument('--keyword-matching', choices=KEYWORD_MATCHING_MODES, default='substring')
+    parser.add_argument('--locale-variants', action='store_true',
+                        help="Count keywords with each petition locale's lexicon variants")
+    parser.add_argument('--n-estimators', type=int, default=DEFAULT_MODEL_PARAMS['n_estimators'])
+    parser.add_argument('--learning-rate', type=float, default=DEFAULT_MODEL_PARAMS['learning_rate'])
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MODEL_PARAMS['max_depth'])
+    parser.add_argument('--random-state', type=int, default=DEFAULT_MODEL_PARAMS['random_state'])
+    parser.add_argument('--test-size', type=float, default=TEST_SIZE)
+    parser.add_argument('--split-seed', type=int, default=SPLIT_SEED)
+    parser.add_argument('--n-bootstrap', type=int, default=DEFAULT_BOOTSTRAP_SAMPLES)
+    parser.add_argument('--stage', choices=STAGES, default='export', help="Last stage to run")
+    parser.add_argument('--out', default=str(BUNDLE_DIR), help="Bundle directory for the export stage")
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR))
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every stage")
+    parser.add_argument('--feature-store', default=str(STORE_PATH), help="SQLite per-petition feature store")
+    parser.add_argument('--no-feature-store', action='store_true', help="Extract every petition")
+    parser.add_argument('--select-features', action='store_true',
+                        help="Drop expensive feature families that do not pay for their extraction time")
+    parser.add_argument('--selection-tolerance', type=float, default=DEFAULT_AUC_TOLERANCE,
+                        help="Largest accepted validation AUC drop from feature selection")
+    parser.add_argument('--cost-weight', type=float, default=DEFAULT_COST_WEIGHT,
+                        help="AUC a family must contribute per ms of extraction time to rank as worth keeping")
+    args = parser.parse_args(argv)
+
+    pipeline = TrainingPipeline(
+        input_path=args.input,
+        features_path=args.features,
+        keyword_matching=args.keyword_matching,
+        locale_variants=args.locale_variants,
+        model_params={
+            'n_estimators': args.n_estimators,
+            'learning_rate': args.learning_rate,
+            'max_depth': args.max_depth,
+            'random_state': args.random_state,
+        },
+        test_size=args.test_size,
+        split_seed=args.split_seed,
+        n_bootstrap=args.n_bootstrap,
+        cache=StageCache(args.cache_dir, enabled=not args.no_cache),
+        feature_store=None if args.no_feature_store else args.feature_store,
+        feature_selection=args.select_features,
+        selection_tolerance=args.selection_tolerance,
+        cost_weight=args.cost_weight,
+    )
+    try:
+        pipeline.run(args.stage, args.out)
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if 'evaluate' in pipeline.stage_keys:
+        for metric, result in pipeline.evaluate()['metrics'].items():
+            print(f"  {metric:<12}{result['value']:.3f}  95% CI [{result['ci_lower']:.3f}, {result['ci_upper']:.3f}]")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Visualization Utilities
+Process-wide cache for the Plotly figures on the insight pages. Page scripts
+rerun for every session and interaction; building a figure from constants
+costs tens of milliseconds, so each one is built once per process and served
+from memory afterwards.
+"""
+
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Bump when the constants behind the static methodology, roadmap, model guide
+# and messaging insight charts change
+STATIC_FIGURES_VERSION = '1'
+
+# Upper bound on cached figures; the oldest are dropped first when data
+# versions change over the life of the process
+MAX_CACHED_FIGURES = 64
+
+_figures: Dict[Tuple[Hashable, ...], Any] = {}
+_figures_lock = threading.Lock()
+
+
+def cached_figure(name: str, version: str = STATIC_FIGURES_VERSION) -> Callable:
+    """
+    Decorator that builds a figure once per process and reuses it
+
+    Args:
+        name: Cache key for the figure, unique across pages
+        version: Version of the data the figure is built from; figures built
+            from loaded data should pass a data hash as an argument instead
+
+    Call arguments are part of the key and must be hashable. The returned
+    figure is shared between sessions, so callers must not modify it.
+    """
+    def decorator(builder: Callable) -> Callable:
+        @wraps(builder)
+        def wrapper(*args, **kwargs):
+            key = (name, version, args, tuple(sorted(kwargs.items())))
+            figure = _figures.get(key)
+            if figure is None:
+                with _figures_lock:
+                    figure = _figures.get(key)
+                    if figure is None:
+                        figure = builder(*args, **kwargs)
+                        while len(_figures) >= MAX_CACHED_FIGURES:
+                            del _figures[next(iter(_figures))]
+                        _figures[key] = figure
+            return figure
+        return wrapper
+    return decorator
+
+
+def clear_figure_cache() -> None:
+    """Drop all cached figures, e.g. after the underlying data changed"""
+    with _figures_lock:
+        _figures.clear()
+
+
+def cached_figure_count() -> int:
+    """Number of figures currently held in memory"""
+    return len(_figures)